@@ -0,0 +1,80 @@
+# Wall time of the command line interface on a large catalog, measured as
+# a user sees it: a fresh interpreter per command.
+#
+#     python -m benchmarks.cli [--projects 10000] [--runs 20] [--limit 50]
+#
+# The commands run against a throwaway HOME, so the real database and
+# config are not touched. Exits with an error if a command's median is
+# over --limit milliseconds.
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.synthetic import fill, home_db_path
+
+ENTRY_POINT = "from code_compass.startup import run; run()"
+
+DEFAULT_PROJECTS = 10_000
+DEFAULT_CATEGORIES = 20
+DEFAULT_LIMIT = 50.0
+
+COMMANDS = [
+    ["open", "--print", "project-4242"],
+    ["open", "--print", "zzz-no-match"],
+    ["ls", "--category", "category-7"],
+    ["ls", "--sort", "name"],
+]
+
+
+def measure(argv: list, env: dict, runs: int) -> float:
+    # Median wall time in milliseconds
+    durations = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(
+            argv,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        durations.append((time.perf_counter() - started) * 1000)
+    return statistics.median(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--projects", type=int, default=DEFAULT_PROJECTS)
+    parser.add_argument("--categories", type=int, default=DEFAULT_CATEGORIES)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--limit", type=float, default=DEFAULT_LIMIT)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as home:
+        env = dict(os.environ, HOME=home)
+        fill(home_db_path(Path(home)), args.projects, args.categories)
+
+        interpreter = measure([sys.executable, "-c", "pass"], env, args.runs)
+
+        print(f"{args.projects} projects, limit {args.limit:.0f} ms")
+        print(f"interpreter startup: {interpreter:.1f} ms")
+        slow = []
+        for command in COMMANDS:
+            median = measure(
+                [sys.executable, "-c", ENTRY_POINT, *command], env, args.runs
+            )
+            print(f"{' '.join(command):<36}{median:>8.1f} ms")
+            if median > args.limit:
+                slow.append(command)
+
+    if slow:
+        sys.exit(f"{len(slow)} commands over {args.limit:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# Path health checks against simulated slow mounts: a stand-in check
+# function sleeps for the paths of "slow" projects and blocks for good on
+# the ones of a "dead" mount, the way stat() does on a stale NFS export.
+#
+#     python -m benchmarks.health [--projects 2000] [--slow 50] [--dead 40]
+#         [--timeout 0.5]
+#
+# Fails unless every path gets the expected status, hung paths time out
+# within their timeout, a second refresh comes from the cache and a later
+# one doesn't start another thread for a path that is still hung.
+
+import argparse
+import random
+import sys
+import threading
+import time
+
+from code_compass.health import MISSING, OK, TIMED_OUT, PathHealthService
+
+
+class SimulatedPaths:
+    # check stand-in. Paths under /dead never return, until release().
+    def __init__(self, slow: set, missing: set, delay: float):
+        self.slow = slow
+        self.missing = missing
+        self.delay = delay
+        self.released = threading.Event()
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, path: str) -> str:
+        with self.lock:
+            self.calls += 1
+        if path.startswith("/dead/"):
+            self.released.wait()
+            return MISSING
+        if path in self.slow:
+            time.sleep(self.delay)
+        return MISSING if path in self.missing else OK
+
+    def release(self):
+        self.released.set()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--projects", type=int, default=2000)
+    parser.add_argument("--slow", type=int, default=50)
+    parser.add_argument("--dead", type=int, default=40)
+    parser.add_argument("--timeout", type=float, default=0.5)
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    healthy = [f"/mnt/projects/project-{i}" for i in range(args.projects)]
+    dead = [f"/dead/project-{i}" for i in range(args.dead)]
+    paths = healthy + dead
+    rng.shuffle(paths)
+    slow = set(rng.sample(healthy, args.slow))
+    missing = set(rng.sample(healthy, args.projects // 10))
+
+    simulated = SimulatedPaths(slow, missing, args.timeout / 4)
+    service = PathHealthService(
+        timeout=args.timeout, workers=args.workers, check=simulated
+    )
+
+    failures = []
+    started = time.perf_counter()
+    results = service.refresh(paths)
+    elapsed = time.perf_counter() - started
+    print(f"first refresh of {len(paths)} paths: {elapsed:.2f}s")
+
+    expected = {path: OK for path in healthy}
+    expected.update((path, MISSING) for path in missing)
+    expected.update((path, TIMED_OUT) for path in dead)
+    wrong = [path for path in paths if results.get(path) != expected[path]]
+    if wrong:
+        failures.append(f"{len(wrong)} paths with a wrong status")
+    # The dead paths time out together, whatever their number
+    if elapsed > args.timeout * 2 + len(slow) * args.timeout / 4:
+        failures.append("hung paths held up the others")
+
+    started = time.perf_counter()
+    calls = simulated.calls
+    service.refresh(paths)
+    cached = time.perf_counter() - started
+    print(f"cached refresh: {cached * 1000:.1f} ms")
+    if simulated.calls != calls:
+        failures.append("fresh results were checked again")
+
+    service.invalidate(paths)
+    threads = threading.active_count()
+    started = time.perf_counter()
+    results = service.refresh(dead)
+    print(f"refresh of hung paths: {time.perf_counter() - started:.2f}s")
+    if threading.active_count() != threads:
+        failures.append("a hung path was checked twice at once")
+    if set(results.values()) != {TIMED_OUT}:
+        failures.append("hung paths didn't time out")
+
+    simulated.release()
+    time.sleep(0.1)
+    if any(service.cached(path) != MISSING for path in dead):
+        failures.append("late results didn't replace TIMED_OUT")
+
+    if failures:
+        sys.exit("\n".join(failures))
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# Query and commit latency of the SQLite storage on a large catalog, before
+# and after the schema migrations.
+#
+#     python -m benchmarks.storage [--projects 100000] [--categories 50]
+#
+# A database with the original schema (no primary key, no indexes, rollback
+# journal) is filled and measured, then opened through DB, which upgrades
+# it in place, and measured again.
+
+import argparse
+import datetime
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from code_compass.category import Category
+from code_compass.db import DB
+from code_compass.migrations import initial_schema
+from code_compass.project import Project
+
+CATEGORY_QUERY = """
+    SELECT p.name, p.path, p.last_opened, c.id, c.name, c.is_active
+    FROM projects p
+    JOIN categories c ON c.id = p.category_id
+    WHERE p.category_id = ? ORDER BY p.name ASC;
+    """
+RECENT_QUERY = """
+    SELECT name, path FROM projects ORDER BY last_opened DESC LIMIT 20;
+    """
+PATH_QUERY = """
+    SELECT name FROM projects WHERE path = ?;
+    """
+
+
+def fill_legacy(path: Path, projects: int, categories: int) -> None:
+    con = sqlite3.connect(path)
+    initial_schema(con)
+    con.executemany(
+        "INSERT INTO categories (name) VALUES (?);",
+        ((f"category-{i}",) for i in range(categories)),
+    )
+    now = datetime.datetime.now()
+    con.executemany(
+        """
+        INSERT INTO projects (name, path, last_opened, category_id)
+        VALUES (?, ?, ?, ?);
+        """,
+        (
+            (
+                f"project-{i}",
+                f"/home/user/projects/project-{i}",
+                now - datetime.timedelta(minutes=random.randrange(10**6)),
+                random.randrange(categories) + 1,
+            )
+            for i in range(projects)
+        ),
+    )
+    con.commit()
+    con.close()
+
+
+def measure(func, runs: int) -> float:
+    # Median wall time in milliseconds
+    durations = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - started) * 1000)
+    return statistics.median(durations)
+
+
+def run_queries(con: sqlite3.Connection, projects: int, categories: int):
+    def by_category():
+        category_id = random.randrange(categories) + 1
+        con.execute(CATEGORY_QUERY, (category_id,)).fetchall()
+
+    def recent():
+        con.execute(RECENT_QUERY).fetchall()
+
+    def by_path():
+        i = random.randrange(projects)
+        con.execute(PATH_QUERY, (f"/home/user/projects/project-{i}",))
+
+    return {
+        "category load": measure(by_category, 20),
+        "20 most recent": measure(recent, 20),
+        "lookup by path": measure(by_path, 200),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--projects", type=int, default=100_000)
+    parser.add_argument("--categories", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "data.db"
+        fill_legacy(path, args.projects, args.categories)
+
+        # Same timestamp conversion as DB, so the loads compare fairly
+        con = sqlite3.connect(
+            path,
+            detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+        )
+        before = run_queries(con, args.projects, args.categories)
+
+        def legacy_commit():
+            con.execute(
+                "UPDATE projects SET last_opened = ? WHERE path = ?;",
+                (datetime.datetime.now(), "/home/user/projects/project-1"),
+            )
+            con.commit()
+
+        before["save + commit"] = measure(legacy_commit, 50)
+        con.close()
+
+        started = time.perf_counter()
+        db = DB(path)
+        migration = (time.perf_counter() - started) * 1000
+        after = run_queries(db.con, args.projects, args.categories)
+
+        category = Category.get(db, 1)
+        project = Project.all_by_category(db, category)[0]
+        after["save + commit"] = measure(lambda: project.save(db), 50)
+        db.close()
+
+    print(f"{args.projects} projects, {args.categories} categories")
+    print(f"in-place migration: {migration:.0f} ms")
+    print(f"{'median ms':<16}{'before':>10}{'after':>10}")
+    for name in before:
+        print(f"{name:<16}{before[name]:>10.3f}{after[name]:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
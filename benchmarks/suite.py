@@ -0,0 +1,226 @@
+# Regression benchmarks of the storage, the tables and startup on synthetic
+# databases of several sizes.
+#
+#     python -m benchmarks.suite [--sizes 1000,10000,100000]
+#         [--output results.json] [--baseline baseline.json]
+#
+# Results are medians in milliseconds, written as JSON. Given a baseline (a
+# results file of an earlier run on the same machine) every measurement is
+# compared with it and the run fails if one got slower than --tolerance
+# times its baseline value.
+#
+# Table population runs on Qt's offscreen platform and is skipped when
+# PySide6 isn't installed.
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from benchmarks.synthetic import fill, home_db_path
+from code_compass.category import Category
+from code_compass.db import DB
+from code_compass.project import Project
+
+DEFAULT_SIZES = "1000,10000,100000"
+DEFAULT_CATEGORIES = 50
+
+# Modules imported by a fresh interpreter for the cold import measurements
+IMPORTS = {
+    "import cli": "code_compass.cli",
+    "import app": "code_compass.app",
+}
+
+
+def measure(func: Callable, runs: int) -> float:
+    # Median wall time in milliseconds
+    durations = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - started) * 1000)
+    return statistics.median(durations)
+
+
+def bench_storage(path: Path, projects: int, categories: int, runs: int):
+    results = {}
+    rng = random.Random(1)
+
+    def open_db():
+        DB(path).close()
+
+    results["db open"] = measure(open_db, runs)
+
+    db = DB(path)
+    results["Category.all"] = measure(lambda: Category.all(db), runs)
+
+    def category_load():
+        category = Category(id=rng.randrange(categories) + 1, name="")
+        Project.all_by_category(db, category)
+
+    results["category load"] = measure(category_load, runs)
+    results["Project.all"] = measure(
+        lambda: Project.all(db), max(runs // 4, 1)
+    )
+
+    project = Project.get(db, "/synthetic/projects/project-1")
+    results["save"] = measure(lambda: project.save(db), runs)
+
+    victims = iter(
+        Project.get(db, f"/synthetic/projects/project-{i}")
+        for i in rng.sample(range(2, projects), runs)
+    )
+    results["delete"] = measure(lambda: next(victims).delete(db), runs)
+    db.close()
+    return results
+
+
+def bench_table(path: Path, runs: int) -> Dict[str, float]:
+    # Filling and sorting the model of a category table, then laying the
+    # view out, as rerender_table does
+    try:
+        from PySide6.QtWidgets import QApplication, QTableView
+    except ImportError:
+        return {}
+    from code_compass.table_model import FRECENCY, NAME, ProjectTableModel
+
+    app = QApplication.instance() or QApplication(["benchmark"])
+    db = DB(path)
+    category = Category(id=1, name="")
+    projects = Project.all_by_category(db, category)
+    everything = Project.all(db)
+    db.close()
+
+    view = QTableView()
+    model = ProjectTableModel(view)
+    view.setModel(model)
+    view.resize(1000, 700)
+    view.show()
+
+    def populate(rows):
+        model.set_projects(rows)
+        model.sort(FRECENCY)
+        app.processEvents()
+
+    results = {
+        "table category": measure(lambda: populate(projects), runs),
+        "table all": measure(lambda: populate(everything), runs),
+        "table sort name": measure(lambda: model.sort(NAME), runs),
+    }
+    view.close()
+    return results
+
+
+def run_python(args: list, env: dict, runs: int) -> Optional[float]:
+    # Median wall time of a fresh interpreter, None if it fails (e.g.
+    # PySide6 isn't installed)
+    argv = [sys.executable, *args]
+    if subprocess.run(argv, env=env, capture_output=True).returncode:
+        return None
+    return measure(
+        lambda: subprocess.run(argv, env=env, capture_output=True), runs
+    )
+
+
+def bench_imports(runs: int) -> Dict[str, float]:
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    results = {"interpreter": run_python(["-c", "pass"], env, runs)}
+    for name, module in IMPORTS.items():
+        results[name] = run_python(["-c", f"import {module}"], env, runs)
+    return {key: value for key, value in results.items() if value is not None}
+
+
+def bench_cli(home: Path, runs: int) -> Dict[str, float]:
+    # HOME points the command at the synthetic database
+    env = dict(os.environ, HOME=str(home))
+    entry_point = "from code_compass.startup import run; run()"
+    return {
+        "cli ls": run_python(["-c", entry_point, "ls"], env, runs),
+        "cli open": run_python(
+            ["-c", entry_point, "open", "--print", "project-7"], env, runs
+        ),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    # Print every measurement next to its baseline, return the regressions
+    regressions = []
+    print(f"{'':<32}{'baseline':>10}{'now':>10}{'ratio':>8}")
+    for key, value in results.items():
+        before = baseline.get(key)
+        if before is None:
+            print(f"{key:<32}{'-':>10}{value:>10.2f}")
+            continue
+        ratio = value / before if before else float("inf")
+        flag = "  SLOWER" if ratio > tolerance else ""
+        print(f"{key:<32}{before:>10.2f}{value:>10.2f}{ratio:>8.2f}{flag}")
+        if ratio > tolerance:
+            regressions.append(key)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default=DEFAULT_SIZES)
+    parser.add_argument("--categories", type=int, default=DEFAULT_CATEGORIES)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--baseline", type=Path)
+    parser.add_argument("--tolerance", type=float, default=1.3)
+    args = parser.parse_args()
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    results = {
+        f"startup/{name}": round(value, 3)
+        for name, value in bench_imports(args.runs).items()
+    }
+    for size in (int(size) for size in args.sizes.split(",")):
+        with tempfile.TemporaryDirectory() as home:
+            home = Path(home)
+            path = home_db_path(home)
+            started = time.perf_counter()
+            fill(path, size, args.categories)
+            print(
+                f"{size} projects generated in "
+                f"{time.perf_counter() - started:.1f}s",
+                file=sys.stderr,
+            )
+
+            measurements = bench_storage(
+                path, size, args.categories, args.runs
+            )
+            measurements.update(bench_table(path, args.runs))
+            measurements.update(bench_cli(home, args.runs))
+            for name, value in measurements.items():
+                results[f"{size}/{name}"] = round(value, 3)
+
+    if args.output:
+        args.output.write_text(
+            json.dumps(
+                {
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "results": results,
+                },
+                indent=2,
+            )
+        )
+
+    baseline = {}
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())["results"]
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        sys.exit(f"{len(regressions)} measurements regressed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# Synthetic data.db files for the benchmarks: projects spread over
+# categories, with random last opened times and matching frecency scores.
+
+import datetime
+import random
+from pathlib import Path
+
+from code_compass.category import Category
+from code_compass.db import DB
+from code_compass.frecency import launch_score
+
+
+def home_db_path(home: Path) -> Path:
+    # Where DB() looks for the database when HOME is set to home
+    return home / ".config" / "code_compass" / "data.db"
+
+
+def fill(path: Path, projects: int, categories: int, seed: int = 0) -> None:
+    # Categories are named category-0..N-1 and get the ids 1..N, projects
+    # are named project-0..M-1 and live under /synthetic/projects
+    rng = random.Random(seed)
+    db = DB(path)
+    for i in range(categories):
+        Category.create(db, f"category-{i}")
+
+    now = datetime.datetime.now()
+    rows = []
+    for i in range(projects):
+        last_opened = now - datetime.timedelta(minutes=rng.randrange(10**6))
+        rows.append(
+            (
+                f"project-{i}",
+                f"/synthetic/projects/project-{i}",
+                last_opened,
+                launch_score(last_opened),
+                rng.randrange(categories) + 1,
+            )
+        )
+    db.cur.executemany(
+        """
+        INSERT INTO projects (name, path, last_opened, frecency, category_id)
+        VALUES (?, ?, ?, ?, ?);
+        """,
+        rows,
+    )
+    db.commit()
+    db.close()
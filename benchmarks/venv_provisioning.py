@@ -0,0 +1,65 @@
+# Compares creating a project venv with venv.create(..., with_pip=True)
+# against cloning the prepared base environment.
+#
+#     python -m benchmarks.venv_provisioning [--runs N]
+
+import argparse
+import subprocess
+import tempfile
+import time
+import venv
+from pathlib import Path
+
+from code_compass.venvs import BIN_DIR, VenvProvisioner
+
+
+def timed(func) -> float:
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def check(venv_path: Path) -> None:
+    # Make sure the environment is usable, not just present
+    subprocess.run(
+        [str(venv_path / BIN_DIR / "python"), "-m", "pip", "--version"],
+        check=True,
+        capture_output=True,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        provisioner = VenvProvisioner(tmp / "base")
+        prepare = timed(provisioner.ensure_base)
+        print(f"base environment prepared once in {prepare:.2f}s")
+
+        results = {"venv.create": [], "clone": []}
+        method = None
+        for run in range(args.runs):
+            path = tmp / f"venv-create-{run}"
+            results["venv.create"].append(
+                timed(lambda: venv.create(path, with_pip=True))
+            )
+            check(path)
+
+            path = tmp / f"clone-{run}"
+            started = time.perf_counter()
+            method = provisioner.clone(path)
+            results["clone"].append(time.perf_counter() - started)
+            check(path)
+
+    for name, durations in results.items():
+        best = min(durations)
+        mean = sum(durations) / len(durations)
+        print(f"{name:<12} best {best:.3f}s  mean {mean:.3f}s")
+    print(f"clone used {method}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,20 @@
 import subprocess
 import sys
-import venv
+import threading
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
 
 from PySide6 import QtWidgets
-from PySide6.QtCore import Qt
+from PySide6.QtCore import QFileSystemWatcher, Qt, QThreadPool, QTimer
 from PySide6.QtGui import QCursor, QGuiApplication
+from PySide6.QtNetwork import QLocalServer
 from PySide6.QtWidgets import (
     QApplication,
     QDialog,
     QVBoxLayout,
     QTabWidget,
-    QTableWidget,
-    QTableWidgetItem,
+    QTableView,
     QComboBox,
     QPushButton,
     QHBoxLayout,
@@ -24,19 +25,101 @@ from PySide6.QtWidgets import (
     QFileDialog,
     QAbstractItemView,
     QHeaderView,
+    QMessageBox,
+    QProgressDialog,
+    QSpinBox,
+    QListWidget,
+    QListWidgetItem,
 )
-from cookiecutter.main import cookiecutter
 
+from code_compass import config, contents, fingerprints
+from code_compass.cache import GenerationCache
 from code_compass.category import Category
-from code_compass.config import IDE_COMMANDS, COOKIECUTTER, PROJECTS_PATH
+from code_compass.creator import (
+    REGISTER,
+    STAGE_LABELS,
+    STAGES,
+    ProjectCreation,
+)
 from code_compass.db import DB
+from code_compass.events import ChangeSet
+from code_compass.frecency import AccessLog
+from code_compass.health import MISSING, PathHealthService
+from code_compass.metadata import ProjectMetadata
 from code_compass.project import Project
+from code_compass.resident import OK, SHOW, is_running
+from code_compass.scan import DEFAULT_DEPTH
+from code_compass.table_model import FRECENCY, PATH, ProjectTableModel
+from code_compass.templates import TemplateCache
+from code_compass.tracing import span, start_span, traced, traced_slot
+from code_compass.vcs import VcsStatusService
+from code_compass.venvs import VenvProvisioner
+from code_compass.watcher import CatalogWatch, parent_directories
+from code_compass.workers import (
+    BuildSearchIndexTask,
+    CreateProjectTask,
+    EnrichTask,
+    GitStatusTask,
+    IndexContentsTask,
+    PathHealthTask,
+    PrefetchTemplateTask,
+    RelocateTask,
+    ScanTask,
+    WatchTask,
+)
+
+# How many category tables are kept alive when switching between tabs
+MAX_RENDERED_TABS = 5
+
+# Projects per metadata task and threads walking project directories
+ENRICH_BATCH = 25
+ENRICH_THREADS = 4
+
+# git status and path health tasks, the refresh and the prefetch of each
+STATUS_THREADS = 4
+
+# Milliseconds without another database change before the collected ones
+# are applied to the tables
+CHANGE_DELAY = 50
+
+# Milliseconds of pause in typing before searching, and after the shown
+# table last changed before its rows are enriched and refreshed
+SEARCH_DELAY = 50
+REFRESH_DELAY = 200
+# Rows above and below the viewport refreshed along with the visible ones
+VISIBLE_MARGIN = 20
+# Milliseconds after startup before the statuses of every project are
+# checked in one pass
+PREFETCH_DELAY = 2000
+
+# Directories watched through inotify at most, the others are polled every
+# POLL_INTERVAL ms. Changes are looked at once none came for WATCH_DELAY
+# ms.
+MAX_WATCHED_DIRS = 4096
+POLL_INTERVAL = 10_000
+WATCH_DELAY = 500
+
+# Pause after the last project was found missing before looking for where
+# it went
+RELOCATE_DELAY = 1000
+
+# Search results found by name or path, as many as the search index gives
+SEARCH_LIMIT = 100
+# Search results found in project contents, after the name matches
+CONTENT_MATCHES = 20
 
 
 class ProjectManager(QDialog):
-    def __init__(self):
+    def __init__(self, profile=None):
         super().__init__()
 
+        # Startup profile, reported and dropped after the first paint
+        self.profile = profile
+
+        # In resident mode closing only hides the window and the database
+        # stays open for the next show
+        self.resident = False
+
         # Calculate the width based on the current screen resolution
         cursor_position = QCursor.pos()
         current_screen = QGuiApplication.screenAt(cursor_position)
@@ -49,9 +132,117 @@ class ProjectManager(QDialog):
         # Initialize the database
         self.db = DB()
         Category.create_default_if_db_is_empty(self.db)
-
-        # Set the table headers
-        self.table_headers = ["Name", "Path", "Days Since Last Access"]
+        if self.profile:
+            self.profile.mark("db open")
+
+        # Writes reach the tables as row-level changes. They are collected
+        # until no other one came for CHANGE_DELAY ms, so a burst of them is
+        # applied in one go.
+        self.changes = ChangeSet()
+        self.change_timer = QTimer(self)
+        self.change_timer.setSingleShot(True)
+        self.change_timer.setInterval(CHANGE_DELAY)
+        self.change_timer.timeout.connect(self.apply_changes)
+        self.db.listeners.append(self.on_change)
+
+        # Typing and switching tabs only fill the tables, the background
+        # work for their rows waits until they settle
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY)
+        self.search_timer.timeout.connect(self.search_typed)
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(REFRESH_DELAY)
+        self.refresh_timer.timeout.connect(self.refresh_shown)
+        # Scrolling only brings other rows' statuses up to date
+        self.status_timer = QTimer(self)
+        self.status_timer.setSingleShot(True)
+        self.status_timer.setInterval(REFRESH_DELAY)
+        self.status_timer.timeout.connect(self.refresh_statuses)
+
+        # The search index is built in the background once the window is
+        # shown. Changes made meanwhile are collected and replayed on it,
+        # searches fall back to SQL until it is ready.
+        self.search_index = None
+        self.index_build = 0
+        self.index_changes = None
+        self.contents_indexed = False
+
+        # Tables are built on the first visit of a tab, only the most
+        # recently used ones are kept. Loaded projects are cached until the
+        # next database write.
+        self.rendered_tabs = OrderedDict()
+        self.projects_cache = GenerationCache(self.db)
+
+        # Project creations running in the background
+        self.creations = set()
+
+        # Metadata is computed on its own pool, so walking large projects
+        # doesn't hold up creations and scans. Setting the event cancels
+        # the tasks of the previous table.
+        self.enrich_pool = QThreadPool(self)
+        self.enrich_pool.setMaxThreadCount(ENRICH_THREADS)
+        self.enrich_stop = threading.Event()
+        # Contents are indexed along with the search index, on the same
+        # pool
+        self.contents_stop = threading.Event()
+
+        # git status of the projects, checked on a thread that runs many
+        # git processes at once. Those of the rows on screen are refreshed
+        # as they are shown, those of every project once at startup, like
+        # their path health. Both run on a pool of their own, which
+        # on_close() can empty.
+        self.vcs = VcsStatusService(config.GIT_CONCURRENCY, config.GIT_TIMEOUT)
+        self.status_pool = QThreadPool(self)
+        self.status_pool.setMaxThreadCount(STATUS_THREADS)
+        self.git_stop = threading.Event()
+        self.prefetch_stop = threading.Event()
+        QTimer.singleShot(PREFETCH_DELAY, self.prefetch_statuses)
+
+        # Whether project paths exist, checked off the GUI thread since a
+        # stale network mount can block any access to them
+        self.path_health = PathHealthService(config.PATH_TIMEOUT)
+        self.health_stop = threading.Event()
+
+        # Missing projects are looked for under projects_path by their
+        # fingerprints, each path once
+        self.missing_paths = set()
+        self.searched_paths = set()
+        self.relocate_stop = threading.Event()
+        self.relocate_timer = QTimer(self)
+        self.relocate_timer.setSingleShot(True)
+        self.relocate_timer.setInterval(RELOCATE_DELAY)
+        self.relocate_timer.timeout.connect(self.relocate_missing)
+
+        # Renames and moves of project directories, see watcher.py. The
+        # directories containing projects are watched, changes are looked
+        # at on a pool of one thread that owns the watch.
+        self.watch = CatalogWatch()
+        self.watch_pool = QThreadPool(self)
+        self.watch_pool.setMaxThreadCount(1)
+        self.watch_pending = False
+        self.fs_watcher = QFileSystemWatcher(self)
+        self.fs_watcher.directoryChanged.connect(self.on_directory_changed)
+        self.changed_dirs = set()
+        self.polled_dirs = []
+        # Registered paths not handed to the watch yet
+        self.tracked_paths = None
+        self.watch_timer = QTimer(self)
+        self.watch_timer.setSingleShot(True)
+        self.watch_timer.setInterval(WATCH_DELAY)
+        self.watch_timer.timeout.connect(self.detect_moves)
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(POLL_INTERVAL)
+        self.poll_timer.timeout.connect(self.detect_moves)
+        # Listing every registered path waits until the window is shown
+        QTimer.singleShot(0, self.watch_projects)
+        self.poll_timer.start()
+
+        self.template_cache = None
+        if config.TEMPLATE_CACHE:
+            self.template_cache = TemplateCache()
+            self.prefetch_template()
 
         # Initialize the main window
         self.setWindowTitle("Code Compass")
@@ -59,6 +250,8 @@ class ProjectManager(QDialog):
 
         # Render sections
         self.render_left_section()
+        if self.profile:
+            self.profile.mark("first query")
         self.render_right_section()
 
         # add on close event
@@ -66,6 +259,9 @@ class ProjectManager(QDialog):
 
         # Render the data
         self.rerender_table()
+        if self.profile:
+            self.profile.mark("widgets")
+        QTimer.singleShot(0, self.build_search_index)
 
     # HELPERS
 
@@ -81,30 +277,50 @@ class ProjectManager(QDialog):
         current_tab_name = self.tabs.tabText(current_tab_index)
         return current_tab_name
 
-    def get_selected_projects(self):
-        selected_table = self.tabs.currentWidget()
-        selected_items = selected_table.selectedItems()
+    def get_current_table(self):
+        if not self.search_results.isHidden():
+            return self.search_results
+        page = self.tabs.currentWidget()
+        if page is None:
+            return None
+        return page.table
 
-        if not selected_items:
+    def get_selected_projects(self):
+        selected_table = self.get_current_table()
+        if selected_table is None:
             return []
 
-        projects = []
-        for item in selected_items:
-            row = item.row()
-            project_name = selected_table.item(row, 0).text()
-            project_path = selected_table.item(row, 1).text()
-            project = Project(
-                name=project_name,
-                path=project_path,
-                last_opened=datetime.now(),
-                category=Category(id=None, name=self.get_current_tab_name()),
-            )
-            projects.append(project)
-        return projects
+        # Copies of the rows, Project.save stamps last_opened when a project
+        # is opened
+        model = selected_table.model()
+        return [
+            model.project_at(index.row())
+            for index in selected_table.selectionModel().selectedRows()
+        ]
 
     def update_categories(self):
         self.categories = Category.all(self.db)
 
+    def reload(self):
+        # Drop everything cached in this process, another process may have
+        # changed the database or the config while the window was hidden
+        if self.search_index is not None:
+            self.db.listeners.remove(self.search_index.on_change)
+            self.search_index = None
+        self.build_search_index()
+        self.projects_cache.clear()
+        self.db.identity.clear()
+        # The tables are rebuilt from scratch
+        self.changes = ChangeSet()
+        self.watch_projects()
+        self.search_edit.clear()
+
+        self.ide_selector.clear()
+        for ide_command in config.IDE_COMMANDS:
+            self.ide_selector.addItem(ide_command)
+
+        self.rerender_categories()
+
     # RENDERS
 
     def render_left_section(self):
@@ -115,6 +331,21 @@ class ProjectManager(QDialog):
         wrapper.setFixedWidth(wrapper_width)
 
         self.left_layout = QVBoxLayout()
+
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("Search")
+        self.search_edit.setClearButtonEnabled(True)
+        self.search_edit.textChanged.connect(self.on_search_edited)
+        self.left_layout.addWidget(self.search_edit)
+
+        # Results keep the rank of the index until a header is clicked
+        self.search_results = self.create_table()
+        header = self.search_results.horizontalHeader()
+        header.setSortIndicatorClearable(True)
+        header.setSortIndicator(-1, Qt.AscendingOrder)
+        self.search_results.hide()
+        self.left_layout.addWidget(self.search_results)
+
         self.tabs = QTabWidget()
         self.tabs.currentChanged.connect(self.rerender_table)
         self.left_layout.addWidget(self.tabs)
@@ -137,7 +368,7 @@ class ProjectManager(QDialog):
 
     def render_ide_selector(self):
         self.ide_selector = QComboBox()
-        for ide_command in IDE_COMMANDS:
+        for ide_command in config.IDE_COMMANDS:
             self.ide_selector.addItem(ide_command)
         self.right_layout.addWidget(self.ide_selector)
 
@@ -155,9 +386,20 @@ class ProjectManager(QDialog):
             self.show_create_project_dialog,
             parent_layout=self.right_layout,
         )
+        self.add_button(
+            "Move", self.move_projects, parent_layout=self.right_layout
+        )
+        self.add_button(
+            "Scan", self.show_scan_dialog, parent_layout=self.right_layout
+        )
         self.add_button(
             "Delete", self.delete_projects, parent_layout=self.right_layout
         )
+        self.add_button(
+            "Prune Missing",
+            self.prune_missing,
+            parent_layout=self.right_layout,
+        )
         self.add_button(
             "Run", self.run_projects, parent_layout=self.right_layout
         )
@@ -177,40 +419,78 @@ class ProjectManager(QDialog):
         self.right_layout.addWidget(line)
 
     def render_category(self, name):
-        table = self.create_table()
-        self.tabs.addTab(table, name)
-
+        # The table itself is created when the tab is visited
+        page = QWidget()
+        page.setLayout(QVBoxLayout())
+        page.layout().setContentsMargins(0, 0, 0, 0)
+        page.table = None
+        page.generation = None
+        self.tabs.addTab(page, name)
+
+    def render_tab_table(self, page):
+        if page.table is None:
+            page.table = self.create_table()
+            page.layout().addWidget(page.table)
+
+        self.rendered_tabs[page] = True
+        self.rendered_tabs.move_to_end(page)
+
+        # Free the tables of the tabs that were not used recently
+        while len(self.rendered_tabs) > MAX_RENDERED_TABS:
+            old_page, _ = self.rendered_tabs.popitem(last=False)
+            old_page.table.deleteLater()
+            old_page.table = None
+            old_page.generation = None
+
+        return page.table
+
+    @traced()
     def rerender_categories(self):
-        self.tabs.clear()
+        # Rebuild all the tabs at once, without rendering every tab that
+        # becomes current on the way
+        self.tabs.blockSignals(True)
+        while self.tabs.count():
+            page = self.tabs.widget(0)
+            self.tabs.removeTab(0)
+            page.deleteLater()
+        self.rendered_tabs.clear()
+
         self.update_categories()
 
         for category in self.categories:
             self.render_category(category.name)
 
-        self.rerender_table()
-
         # select active category if there is one
-        self.update_categories()
         active_category = Category.get_active(self.db)
         if active_category:
             self.tabs.setCurrentIndex(self.categories.index(active_category))
+        self.tabs.blockSignals(False)
+
+        self.rerender_table()
 
     def create_table(self):
-        table = QTableWidget(0, 3)
-        table.setHorizontalHeaderLabels(self.table_headers)
+        table = QTableView()
+        table.setModel(ProjectTableModel(table))
         table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        table.setSortingEnabled(True)
+        table.verticalScrollBar().valueChanged.connect(self.on_table_scrolled)
+        # Most used projects first
+        table.sortByColumn(FRECENCY, Qt.DescendingOrder)
         table.horizontalHeader().setSectionResizeMode(
             QtWidgets.QHeaderView.Stretch
         )
 
-        # Make the path column as big as content
+        # Make the path column as big as content, measuring only a sample
+        # of rows so large categories don't stall the layout
         table.horizontalHeader().setSectionResizeMode(
             1, QHeaderView.ResizeToContents
         )
+        table.horizontalHeader().setResizeContentsPrecision(100)
+        table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         table.verticalHeader().setVisible(False)
 
         # Make cell non-editable
-        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        table.setEditTriggers(QAbstractItemView.NoEditTriggers)
 
         # Add double click event
         table.doubleClicked.connect(self.run_projects)
@@ -220,40 +500,434 @@ class ProjectManager(QDialog):
 
         return table
 
+    @traced_slot()
     def rerender_table(self):
-        selected_table = self.tabs.currentWidget()
-        if selected_table is not None:
-            selected_table.clear()
-            category = Category.get_by_name(
-                self.db, self.get_current_tab_name()
-            )
+        if self.search_edit.text():
+            self.search(self.search_edit.text())
+
+        page = self.tabs.currentWidget()
+        if page is None:
+            return
+
+        selected_table = self.render_tab_table(page)
+        if page.generation == self.db.generation:
+            # Nothing was written since this table was filled
+            return
+
+        category_name = self.get_current_tab_name()
+        projects = self.projects_cache.get(category_name)
+        if projects is None:
+            projects = []
+            category = Category.get_by_name(self.db, category_name)
             if category:
-                projects = Project.all_by_category(
-                    self.db,
-                    category=Category.get_by_name(
-                        self.db, self.get_current_tab_name()
-                    ),
+                projects = Project.all_by_category(self.db, category=category)
+            self.projects_cache.set(category_name, projects)
+
+        model = selected_table.model()
+        model.set_projects(projects)
+        header = selected_table.horizontalHeader()
+        model.sort(header.sortIndicatorSection(), header.sortIndicatorOrder())
+        page.generation = self.db.generation
+        self.refresh_timer.start()
+
+    def on_change(self, action, obj):
+        if self.index_changes is not None:
+            self.index_changes.append((action, obj))
+        self.changes.add(action, obj)
+        self.change_timer.start()
+
+    def apply_changes(self):
+        # Patch the rendered tables with the changes collected since the
+        # last time instead of rebuilding them, selection and scroll
+        # position stay where they are
+        changes, self.changes = self.changes, ChangeSet()
+        if not changes:
+            return
+        if changes.reloaded:
+            self.reload()
+            return
+        with span("apply_changes", projects=len(changes)):
+            if changes.inserted or changes.deleted:
+                self.watch_projects()
+
+            if changes.categories_changed:
+                names = [category.name for category in Category.all(self.db)]
+                if names != [category.name for category in self.categories]:
+                    # Tabs were added or removed, they are all rebuilt
+                    self.rerender_categories()
+                    return
+
+            current = self.tabs.currentWidget()
+            for page in self.rendered_tabs:
+                category = self.categories[self.tabs.indexOf(page)]
+                shown = []
+                removed = set(changes.deleted)
+                for project in changes.projects.values():
+                    if project.category.id == category.id:
+                        shown.append(project)
+                    else:
+                        # Moved to another category, if it was here
+                        removed.add(project.id)
+
+                model = page.table.model()
+                added = model.apply_changes(shown, removed)
+                page.generation = self.db.generation
+                if not added:
+                    continue
+                header = page.table.horizontalHeader()
+                model.sort(
+                    header.sortIndicatorSection(), header.sortIndicatorOrder()
                 )
+                if page is current:
+                    self.refresh_timer.start()
+
+            if self.search_results.isHidden():
+                return
+            if changes.inserted:
+                # New projects may match the search
+                self.search(self.search_edit.text())
+                return
+            model = self.search_results.model()
+            listed = {row[-1] for row in model.rows}
+            model.apply_changes(
+                [
+                    project
+                    for project in changes.projects.values()
+                    if project.id in listed
+                ],
+                changes.deleted,
+            )
+
+    @traced_slot()
+    def search(self, text):
+        if not text.strip():
+            self.search_results.hide()
+            self.tabs.show()
+            return
+
+        if not self.contents_indexed:
+            self.contents_indexed = True
+            self.index_contents()
+
+        if self.search_index is None:
+            # Still being built
+            projects = Project.find(self.db, text, SEARCH_LIMIT)
+        else:
+            projects = self.search_index.search(text, SEARCH_LIMIT)
+        found = {project.id for project in projects}
+        snippets = {}
+        for match in contents.search(self.db, text, CONTENT_MATCHES):
+            snippets[match.project.id] = f"{match.file}: {match.snippet}"
+            if match.project.id not in found:
+                projects.append(match.project)
+        model = self.search_results.model()
+        model.set_projects(projects)
+        model.set_snippets(snippets)
+        header = self.search_results.horizontalHeader()
+        model.sort(header.sortIndicatorSection(), header.sortIndicatorOrder())
+        self.refresh_timer.start()
+        self.tabs.hide()
+        self.search_results.show()
+
+    def on_search_edited(self, text):
+        self.search_timer.start()
+
+    def search_typed(self):
+        self.search(self.search_edit.text())
+
+    @traced_slot()
+    def refresh_shown(self):
+        # Metadata, git status and health of the table on screen
+        table = self.get_current_table()
+        if table is None:
+            return
+        model = table.model()
+        # The stored metadata and cached statuses of every row, for sorting
+        # by them, but enriching, git and the path checks run only for the
+        # rows on screen
+        stored = ProjectMetadata.get_many(
+            self.db, [row[-1] for row in model.rows]
+        )
+        model.set_metadata(
+            {project_id: data for project_id, (_, data) in stored.items()}
+        )
+        paths = [row[PATH] for row in model.rows]
+        git = {path: self.vcs.cached(path) for path in paths}
+        model.set_git_status(
+            {path: status for path, status in git.items() if status}
+        )
+        health = {path: self.path_health.cached(path) for path in paths}
+        model.set_path_health(
+            {path: status for path, status in health.items() if status}
+        )
+        self.refresh_statuses()
+
+    def on_table_scrolled(self, value):
+        self.status_timer.start()
+
+    def refresh_statuses(self):
+        table = self.get_current_table()
+        if table is None:
+            return
+        paths = self.shown_paths(table)
+        self.enrich(table.model(), paths)
+        self.refresh_git_status(table.model(), paths)
+        self.refresh_path_health(table.model(), paths)
+
+    def shown_paths(self, table):
+        # Paths of the rows in the viewport and VISIBLE_MARGIN around it
+        rows = table.model().rows
+        first = max(table.rowAt(0), 0)
+        last = table.rowAt(table.viewport().height() - 1)
+        if last < 0:
+            last = len(rows) - 1
+        start = max(first - VISIBLE_MARGIN, 0)
+        return [row[PATH] for row in rows[start : last + VISIBLE_MARGIN + 1]]
+
+    def prefetch_statuses(self):
+        # Every project in one pass, so the tables of the other categories
+        # and rows scrolled to later start out with cached statuses, and
+        # missing projects are found and can be pruned in any category
+        paths = [path for _, path in Project.ids_and_paths(self.db)]
+        task = GitStatusTask(self.vcs, paths, self.prefetch_stop)
+        task.signals.updated.connect(self.on_git_status)
+        self.status_pool.start(task)
+        task = PathHealthTask(self.path_health, paths, self.prefetch_stop)
+        task.signals.checked.connect(self.on_path_health)
+        self.status_pool.start(task)
+
+    def build_search_index(self):
+        # A new build drops the result of any earlier one
+        self.index_build += 1
+        self.index_changes = []
+        task = BuildSearchIndexTask(self.db.path, self.index_build)
+        task.signals.built.connect(self.on_search_index_built)
+        QThreadPool.globalInstance().start(task)
+
+    def on_search_index_built(self, build, index):
+        if build != self.index_build:
+            return
+        for action, obj in self.index_changes:
+            index.on_change(action, obj)
+        self.index_changes = None
+        self.search_index = index
+        self.db.listeners.append(index.on_change)
+        text = self.search_edit.text()
+        if text.strip():
+            self.search(text)
+
+    def enrich(self, model, paths):
+        # Recompute the metadata of the rows at paths that is missing or
+        # stale in the background, in the order of the rows
+        shown = set(paths)
+        rows = [row for row in model.rows if row[PATH] in shown]
+        ids = [row[-1] for row in rows]
+        stored = ProjectMetadata.get_many(self.db, ids)
+
+        self.enrich_stop.set()
+        self.enrich_stop = threading.Event()
+        # Projects without fingerprints, enriched before they were
+        # recorded, are enriched again
+        fingerprinted = fingerprints.get_many(self.db, ids)
+        projects = [
+            (
+                row[-1],
+                row[PATH],
+                stored.get(row[-1], (None, None))[0]
+                if row[-1] in fingerprinted
+                else None,
+            )
+            for row in rows
+        ]
+        for i in range(0, len(projects), ENRICH_BATCH):
+            task = EnrichTask(
+                projects[i : i + ENRICH_BATCH],
+                self.enrich_stop,
+                config.GIT_TIMEOUT,
+            )
+            task.signals.enriched.connect(self.on_enriched)
+            self.enrich_pool.start(task)
+
+    def on_enriched(self, results):
+        with self.db.transaction():
+            ProjectMetadata.save_many(
+                self.db, (result[:3] for result in results)
+            )
+            fingerprints.save(
+                self.db,
+                ((project_id, values) for project_id, *_, values in results),
+            )
+
+        metadata = {project_id: data for project_id, _, data, _ in results}
+        for page in self.rendered_tabs:
+            page.table.model().set_metadata(metadata)
+        self.search_results.model().set_metadata(metadata)
+
+    def index_contents(self):
+        # Bring the full-text index up to date in the background, only
+        # files that changed since they were indexed are read
+        known = contents.stamps(self.db)
+        projects = [
+            (project_id, path, known.get(project_id, {}))
+            for project_id, path in Project.ids_and_paths(self.db)
+        ]
+        self.contents_stop.set()
+        self.contents_stop = threading.Event()
+        task = IndexContentsTask(projects, self.contents_stop)
+        task.signals.indexed.connect(self.on_contents_indexed)
+        self.enrich_pool.start(task)
+
+    def on_contents_indexed(self, results):
+        contents.save(self.db, results)
+
+    def refresh_git_status(self, model, paths):
+        # Known statuses of paths right away, then git for those of
+        # repositories that changed
+        cached = {path: self.vcs.cached(path) for path in paths}
+        model.set_git_status(
+            {path: status for path, status in cached.items() if status}
+        )
+
+        self.git_stop.set()
+        self.git_stop = threading.Event()
+        task = GitStatusTask(self.vcs, paths, self.git_stop)
+        task.signals.updated.connect(self.on_git_status)
+        self.status_pool.start(task)
+
+    def on_git_status(self, statuses):
+        for page in self.rendered_tabs:
+            page.table.model().set_git_status(statuses)
+        self.search_results.model().set_git_status(statuses)
+
+    def refresh_path_health(self, model, paths):
+        # Known statuses of paths right away, then a check of those
+        # without a fresh one
+        cached = {path: self.path_health.cached(path) for path in paths}
+        model.set_path_health(
+            {path: status for path, status in cached.items() if status}
+        )
+
+        self.health_stop.set()
+        self.health_stop = threading.Event()
+        task = PathHealthTask(self.path_health, paths, self.health_stop)
+        task.signals.checked.connect(self.on_path_health)
+        self.status_pool.start(task)
+
+    def on_path_health(self, statuses):
+        for page in self.rendered_tabs:
+            page.table.model().set_path_health(statuses)
+        self.search_results.model().set_path_health(statuses)
+
+        missing = {
+            path for path, status in statuses.items() if status == MISSING
+        }
+        missing -= self.searched_paths
+        if missing:
+            self.missing_paths |= missing
+            self.relocate_timer.start()
+
+    def relocate_missing(self):
+        paths, self.missing_paths = self.missing_paths, set()
+        self.searched_paths |= paths
+        rows = Project.ids_and_paths(self.db)
+        missing = {
+            project_id: path for project_id, path in rows if path in paths
+        }
+        # Only the ones fingerprinted before they went missing can be found
+        known = fingerprints.get_many(self.db, missing)
+        missing = {
+            project_id: path
+            for project_id, path in missing.items()
+            if project_id in known
+        }
+        if not missing:
+            return
+        task = RelocateTask(
+            missing,
+            config.PROJECTS_PATH,
+            {path for _, path in rows},
+            config.GIT_TIMEOUT,
+            self.relocate_stop,
+        )
+        task.signals.found.connect(self.on_relocation_found)
+        QThreadPool.globalInstance().start(task)
+
+    @traced_slot()
+    def on_relocation_found(self, missing, found):
+        # Projects may have been moved, deleted or added meanwhile
+        rows = dict(Project.ids_and_paths(self.db))
+        missing = {
+            project_id: path
+            for project_id, path in missing.items()
+            if rows.get(project_id) == path
+        }
+        registered = set(rows.values())
+        found = [item for item in found if item[0] not in registered]
+        moves = fingerprints.match(self.db, missing, found)
+        if moves:
+            # The tables follow through the change events
+            fingerprints.relocate(self.db, moves, found)
+            self.watch_projects()
+
+    def watch_projects(self):
+        # Watch the directories containing projects and projects_path, the
+        # ones over MAX_WATCHED_DIRS or that can't be watched are polled
+        with span("watch_projects"):
+            paths = [path for _, path in Project.ids_and_paths(self.db)]
+            directories = parent_directories(paths)
+            directories.add(config.PROJECTS_PATH)
+
+            watched = set(self.fs_watcher.directories())
+            stale = watched - directories
+            if stale:
+                self.fs_watcher.removePaths(list(stale))
+            room = MAX_WATCHED_DIRS - len(watched - stale)
+            new = sorted(directories - watched)[: max(room, 0)]
+            if new:
+                self.fs_watcher.addPaths(new)
+            self.polled_dirs = sorted(
+                directories - set(self.fs_watcher.directories())
+            )
 
-                updated_data = [
-                    [
-                        project.name,
-                        project.path,
-                        str((datetime.now() - project.last_opened).days),
-                    ]
-                    for project in projects
-                ]
-
-                selected_table.setRowCount(len(updated_data))
-                selected_table.setHorizontalHeaderLabels(self.table_headers)
-                for row, data_row in enumerate(updated_data):
-                    for col, data in enumerate(data_row):
-                        selected_table.setItem(
-                            row, col, QTableWidgetItem(data)
-                        )
+        self.tracked_paths = paths
+        self.detect_moves()
+
+    def on_directory_changed(self, directory):
+        self.changed_dirs.add(directory)
+        self.watch_timer.start()
+
+    def detect_moves(self):
+        if self.watch_pending:
+            # The last look isn't done yet, e.g. on a slow mount
+            self.watch_timer.start()
+            return
+        changed, self.changed_dirs = list(self.changed_dirs), set()
+        task = WatchTask(
+            self.watch, self.tracked_paths, self.polled_dirs, changed
+        )
+        self.tracked_paths = None
+        task.signals.detected.connect(self.on_moves_detected)
+        task.signals.finished.connect(self.on_watch_finished)
+        self.watch_pending = True
+        self.watch_pool.start(task)
+
+    def on_watch_finished(self):
+        self.watch_pending = False
+
+    @traced_slot()
+    def on_moves_detected(self, moved, vanished):
+        if vanished:
+            statuses = dict.fromkeys(vanished, MISSING)
+            self.path_health.record(statuses)
+            self.on_path_health(statuses)
+        if moved:
+            # The tables follow through the change events
+            Project.relocate_many(self.db, moved)
+            self.watch_projects()
 
     # DIALOGS
     def show_add_project_dialog(self):
+        shown = start_span("dialog.add_project")
         add_dialog = QDialog(self)
         add_dialog.setWindowTitle("Add Project")
         add_dialog.setLayout(QVBoxLayout())
@@ -273,7 +947,7 @@ class ProjectManager(QDialog):
 
         def browse_directory():
             directory = QFileDialog.getExistingDirectory(
-                self, "Select Project Directory", PROJECTS_PATH
+                self, "Select Project Directory", config.PROJECTS_PATH
             )
             project_path_edit.setText(directory)
 
@@ -318,11 +992,11 @@ class ProjectManager(QDialog):
         cancel_button.clicked.connect(add_dialog.reject)
         add_dialog.layout().addWidget(cancel_button)
 
+        shown()
         add_dialog.exec()
 
-        self.rerender_table()
-
     def show_create_project_dialog(self):
+        shown = start_span("dialog.create_project")
         create_dialog = QDialog(self)
         create_dialog.setWindowTitle("Create Project")
         create_dialog.setLayout(QVBoxLayout())
@@ -342,7 +1016,7 @@ class ProjectManager(QDialog):
 
         def browse_directory():
             directory = QFileDialog.getExistingDirectory(
-                self, "Select Project Directory", PROJECTS_PATH
+                self, "Select Project Directory", config.PROJECTS_PATH
             )
             project_path_edit.setText(directory)
 
@@ -364,22 +1038,9 @@ class ProjectManager(QDialog):
         def create_project():
             path = Path(project_path_edit.text())
             project_name = project_name_edit.text() or path.name
-            cookiecutter(
-                COOKIECUTTER,
-                no_input=True,
-                output_dir=str(path.absolute().parent),
-                extra_context={"project_name": project_name},
-                overwrite_if_exists=True,
+            self.start_project_creation(
+                path, project_name, category_combo.currentText()
             )
-            venv.create(path.absolute() / "venv", with_pip=True)
-            category = Category(id=None, name=category_combo.currentText())
-            project = Project(
-                name=project_name,
-                path=str(path.absolute()),
-                last_opened=datetime.now(),
-                category=category,
-            )
-            project.save(self.db)
             create_dialog.accept()
 
         create_button.clicked.connect(create_project)
@@ -391,21 +1052,84 @@ class ProjectManager(QDialog):
         cancel_button.clicked.connect(create_dialog.reject)
         create_dialog.layout().addWidget(cancel_button)
 
+        shown()
         create_dialog.exec()
 
-        self.rerender_table()
+    def prefetch_template(self):
+        source = config.COOKIECUTTER
+        if config.OFFLINE or not source:
+            return
+        if TemplateCache.is_remote(source):
+            task = PrefetchTemplateTask(self.template_cache, source)
+            QThreadPool.globalInstance().start(task)
+
+    def start_project_creation(self, path, project_name, category_name):
+        # The project is generated on the thread pool, several creations
+        # can run at once, each with its own progress dialog
+        creation = ProjectCreation(
+            path,
+            project_name,
+            config.COOKIECUTTER,
+            template_cache=self.template_cache,
+            offline=config.OFFLINE,
+            provisioner=VenvProvisioner() if config.VENV_CLONE else None,
+        )
+        task = CreateProjectTask(creation)
+        self.creations.add(task)
+
+        progress = QProgressDialog(
+            STAGE_LABELS[STAGES[0]], "Cancel", 0, len(STAGES), self
+        )
+        progress.setWindowTitle(f"Create {project_name}")
+        progress.setWindowModality(Qt.NonModal)
+        progress.setMinimumDuration(0)
+        progress.setValue(0)
+        progress.canceled.connect(creation.cancel)
+
+        def on_progress(stage):
+            progress.setLabelText(STAGE_LABELS[stage])
+            progress.setValue(STAGES.index(stage))
+
+        def done():
+            self.creations.discard(task)
+            progress.canceled.disconnect(creation.cancel)
+            progress.hide()
+            progress.deleteLater()
+
+        def on_finished():
+            on_progress(REGISTER)
+            project = Project(
+                name=project_name,
+                path=str(creation.path),
+                last_opened=datetime.now(),
+                category=Category(id=None, name=category_name),
+            )
+            project.save(self.db)
+            done()
+
+        def on_failed(message):
+            done()
+            QMessageBox.warning(
+                self,
+                "Create Project",
+                f"Creating {project_name} failed:\n{message}",
+            )
+
+        task.signals.progress.connect(on_progress)
+        task.signals.finished.connect(on_finished)
+        task.signals.cancelled.connect(done)
+        task.signals.failed.connect(on_failed)
+        QThreadPool.globalInstance().start(task)
 
     def show_edit_project_dialog(self):
-        selected_table = self.tabs.currentWidget()
-        selected_items = selected_table.selectedItems()
+        selected_projects = self.get_selected_projects()
 
-        if not selected_items:
+        if not selected_projects:
             return
 
-        row = selected_items[0].row()
-
-        project_name = selected_table.item(row, 0).text()
-        project_path = selected_table.item(row, 1).text()
+        shown = start_span("dialog.edit_project")
+        project_name = selected_projects[0].name
+        project_path = selected_projects[0].path
 
         edit_dialog = QDialog(self)
         edit_dialog.setWindowTitle("Edit Project")
@@ -426,7 +1150,7 @@ class ProjectManager(QDialog):
 
         def browse_directory():
             directory = QFileDialog.getExistingDirectory(
-                self, "Select Project Directory", PROJECTS_PATH
+                self, "Select Project Directory", config.PROJECTS_PATH
             )
             project_path_edit.setText(directory)
 
@@ -438,8 +1162,7 @@ class ProjectManager(QDialog):
         for i in range(self.tabs.count()):
             category_combo.addItem(self.tabs.tabText(i))
 
-        current_category = self.get_current_tab_name()
-        category_combo.setCurrentText(current_category)
+        category_combo.setCurrentText(selected_projects[0].category.name)
 
         edit_dialog.layout().addWidget(category_label)
         edit_dialog.layout().addWidget(category_combo)
@@ -465,9 +1188,113 @@ class ProjectManager(QDialog):
         cancel_button.clicked.connect(edit_dialog.reject)
         edit_dialog.layout().addWidget(cancel_button)
 
+        shown()
         edit_dialog.exec()
 
-        self.rerender_table()
+    def show_scan_dialog(self):
+        shown = start_span("dialog.scan")
+        scan_dialog = QDialog(self)
+        scan_dialog.setWindowTitle("Scan for Projects")
+        scan_dialog.setLayout(QVBoxLayout())
+
+        root_label = QLabel("Directory:")
+        root_edit = QLineEdit(config.PROJECTS_PATH)
+        scan_dialog.layout().addWidget(root_label)
+        scan_dialog.layout().addWidget(root_edit)
+
+        browse_button = QPushButton("Browse")
+        scan_dialog.layout().addWidget(browse_button)
+
+        def browse_directory():
+            directory = QFileDialog.getExistingDirectory(
+                self, "Select Directory to Scan", root_edit.text()
+            )
+            if directory:
+                root_edit.setText(directory)
+
+        browse_button.clicked.connect(browse_directory)
+
+        depth_label = QLabel("Depth:")
+        depth_spin = QSpinBox()
+        depth_spin.setRange(1, 10)
+        depth_spin.setValue(DEFAULT_DEPTH)
+        scan_dialog.layout().addWidget(depth_label)
+        scan_dialog.layout().addWidget(depth_spin)
+
+        category_label = QLabel("Category:")
+        category_combo = QComboBox()
+        for category in Category.all(self.db):
+            category_combo.addItem(category.name)
+        category_combo.setCurrentText(self.get_current_tab_name())
+        scan_dialog.layout().addWidget(category_label)
+        scan_dialog.layout().addWidget(category_combo)
+
+        # Found projects show up here while the scan is still running
+        found_list = QListWidget()
+        status_label = QLabel()
+        scan_dialog.layout().addWidget(found_list)
+        scan_dialog.layout().addWidget(status_label)
+
+        scan_button = QPushButton("Scan")
+        import_button = QPushButton("Import")
+        import_button.setEnabled(False)
+        scan_dialog.layout().addWidget(scan_button)
+        scan_dialog.layout().addWidget(import_button)
+
+        task = None
+
+        def stop_scan():
+            if task is not None:
+                task.stop.set()
+                task.signals.found.disconnect(on_found)
+                task.signals.finished.disconnect(on_finished)
+
+        def on_found(paths):
+            for path in paths:
+                item = QListWidgetItem(path)
+                item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+                item.setCheckState(Qt.Checked)
+                found_list.addItem(item)
+            import_button.setEnabled(True)
+            status_label.setText(f"Scanning, {found_list.count()} found")
+
+        def on_finished():
+            status_label.setText(f"{found_list.count()} projects found")
+
+        def start_scan():
+            nonlocal task
+            stop_scan()
+            found_list.clear()
+            import_button.setEnabled(False)
+            status_label.setText("Scanning")
+
+            task = ScanTask(root_edit.text(), depth_spin.value())
+            task.signals.found.connect(on_found)
+            task.signals.finished.connect(on_finished)
+            QThreadPool.globalInstance().start(task)
+
+        def import_projects():
+            paths = []
+            for i in range(found_list.count()):
+                item = found_list.item(i)
+                if item.checkState() == Qt.Checked:
+                    paths.append(item.text())
+            # The category may have been deleted while the dialog was open
+            category = Category.resolve(self.db, category_combo.currentText())
+            Project.insert_many(self.db, paths, category)
+            scan_dialog.accept()
+
+        scan_button.clicked.connect(start_scan)
+        import_button.clicked.connect(import_projects)
+
+        # Add Cancel button
+        cancel_button = QPushButton("Cancel")
+        cancel_button.clicked.connect(scan_dialog.reject)
+        scan_dialog.layout().addWidget(cancel_button)
+
+        shown()
+        scan_dialog.exec()
+        stop_scan()
 
     def show_create_category_dialog(self):
         category_name, ok = QInputDialog.getText(
@@ -483,6 +1310,13 @@ class ProjectManager(QDialog):
 
     # Event handlers
 
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.profile:
+            self.profile.mark("first paint")
+            print(self.profile.report(), file=sys.stderr)
+            self.profile = None
+
     def run_projects_on_enter(self, event):
         if event.key() == Qt.Key_Return:
             self.run_projects()
@@ -494,36 +1328,161 @@ class ProjectManager(QDialog):
         )
         current_category.set_active(self.db)
 
-        self.db.close()
+        if not self.resident:
+            self.relocate_timer.stop()
+            self.change_timer.stop()
+            self.search_timer.stop()
+            self.refresh_timer.stop()
+            self.status_timer.stop()
+            self.watch_timer.stop()
+            self.poll_timer.stop()
+
+            # The pools wait for their tasks when they are destroyed: the
+            # running ones are stopped and the queued ones dropped, or
+            # closing would wait for every directory walk and git process
+            for stop in (
+                self.enrich_stop,
+                self.contents_stop,
+                self.git_stop,
+                self.prefetch_stop,
+                self.health_stop,
+                self.relocate_stop,
+            ):
+                stop.set()
+            for pool in (self.enrich_pool, self.status_pool, self.watch_pool):
+                pool.clear()
+            self.db.close()
+
+    def show_again(self):
+        self.reload()
+        self.show()
+        self.raise_()
+        self.activateWindow()
 
     # Button press handlers
 
+    @traced_slot()
     def delete_category(self):
         category_name = self.get_current_tab_name()
         category = Category.get_by_name(self.db, category_name)
         category.delete(self.db)
         self.rerender_categories()
 
+    @traced_slot()
     def run_projects(self):
         projects = self.get_selected_projects()
-        arguments = []
-        for project in projects:
-            arguments.append(project.path)
-            project.save(self.db)
+        with self.db.transaction():
+            Project.save_many(self.db, projects)
+            AccessLog.record(self.db, projects)
+        arguments = [project.path for project in projects]
         selected_ide = self.ide_selector.currentText()
-        subprocess.Popen([selected_ide, *arguments])
+        with span("launch ide", ide=selected_ide):
+            subprocess.Popen([selected_ide, *arguments])
         self.close()
 
+    @traced_slot()
     def delete_projects(self):
         projects = self.get_selected_projects()
-        for project in projects:
-            project.delete(self.db)
-        self.rerender_table()
+        Project.delete_many(self.db, projects)
+
+    def prune_missing(self):
+        # Delete the projects whose directory was found missing, in one
+        # transaction. Unreachable and timed out paths are kept, their
+        # mount may come back.
+        with span("prune_missing"):
+            missing = [
+                project
+                for project in Project.all(self.db)
+                if self.path_health.cached(project.path) == MISSING
+            ]
+        if not missing:
+            QMessageBox.information(
+                self, "Prune Missing", "No project directory is missing."
+            )
+            return
 
+        listed = "\n".join(project.path for project in missing[:20])
+        if len(missing) > 20:
+            listed += f"\n… and {len(missing) - 20} more"
+        answer = QMessageBox.question(
+            self,
+            "Prune Missing",
+            f"Delete {len(missing)} projects whose directory no longer "
+            f"exists?\n\n{listed}",
+        )
+        if answer != QMessageBox.Yes:
+            return
+        with span("prune_missing.delete", projects=len(missing)):
+            Project.delete_many(self.db, missing)
 
-def run():
+    @traced_slot()
+    def move_projects(self):
+        projects = self.get_selected_projects()
+        if not projects:
+            return
+
+        category_names = [category.name for category in self.categories]
+        category_name, ok = QInputDialog.getItem(
+            self,
+            "Move Projects",
+            "Category:",
+            category_names,
+            category_names.index(projects[0].category.name),
+            False,
+        )
+        if ok:
+            category = Category.get_by_name(self.db, category_name)
+            Project.move_many(self.db, projects, category)
+
+
+class ResidentServer(QLocalServer):
+    # Listens for later code-compass invocations asking the resident
+    # process to show the window again
+
+    def __init__(self, project_manager):
+        super().__init__(project_manager)
+        self.project_manager = project_manager
+        self.setSocketOptions(QLocalServer.UserAccessOption)
+        self.newConnection.connect(self.accept_connections)
+
+    def start(self):
+        # Another instance may be running, e.g. one that didn't answer
+        # request_show() in time or when it was skipped for a startup
+        # profile. Its socket is left alone, only a stale one is removed.
+        if is_running():
+            return False
+        QLocalServer.removeServer(str(config.SOCKET_PATH))
+        return self.listen(str(config.SOCKET_PATH))
+
+    def accept_connections(self):
+        while self.hasPendingConnections():
+            connection = self.nextPendingConnection()
+            connection.readyRead.connect(
+                lambda connection=connection: self.handle(connection)
+            )
+            connection.disconnected.connect(connection.deleteLater)
+
+    def handle(self, connection):
+        if not connection.canReadLine():
+            return
+        if bytes(connection.readLine()) == SHOW:
+            self.project_manager.show_again()
+            connection.write(OK)
+            connection.flush()
+        connection.disconnectFromServer()
+
+
+def run(profile=None, resident=False):
     app = QApplication(sys.argv)
-    project_manager = ProjectManager()
+    if profile:
+        profile.mark("qt init")
+    project_manager = ProjectManager(profile)
+
+    # Keep running with the window hidden after it is closed
+    if resident and ResidentServer(project_manager).start():
+        project_manager.resident = True
+        app.setQuitOnLastWindowClosed(False)
+
     app.setStyleSheet(
         f"""
         QWidget {{
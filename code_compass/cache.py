@@ -0,0 +1,24 @@
+from typing import Any, Dict, Hashable, Optional
+
+from code_compass.db import DB
+
+
+class GenerationCache:
+    # Query results that stay valid until the next write to the database
+
+    def __init__(self, db: DB):
+        self.db = db
+        self.data: Dict[Hashable, tuple] = {}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        generation, value = self.data.get(key, (None, None))
+        if generation != self.db.generation:
+            self.data.pop(key, None)
+            return None
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self.data[key] = (self.db.generation, value)
+
+    def clear(self) -> None:
+        self.data.clear()
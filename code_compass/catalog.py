@@ -0,0 +1,81 @@
+from typing import List, Optional, Tuple
+
+from code_compass.db import DB
+from code_compass.tracing import traced
+
+# Queries of the projects that return plain values instead of Project
+# instances. The commands run the most, ls and open, use these, so they
+# don't import the models: their dataclasses import inspect, about 10 ms of
+# a command line.
+
+# Orderings of the projects p, accepted by listing(), Project.all and
+# Project.all_by_category
+ORDER_BY = {
+    "name": "p.name ASC",
+    "frecency": "p.frecency DESC",
+    "last_opened": "p.last_opened DESC",
+}
+
+
+def find_clause(query: str, limit: int) -> Tuple[str, dict]:
+    # WHERE, ORDER BY and LIMIT of the projects p whose name or path
+    # contains the query, with their parameters. The same ranking as the
+    # search index without having to build it: exact name, name prefix,
+    # name substring, path substring, then frecency.
+    pattern = query.replace("\\", "\\\\")
+    pattern = pattern.replace("%", "\\%").replace("_", "\\_")
+    clause = """
+        WHERE p.name LIKE :contains ESCAPE '\\'
+            OR p.path LIKE :contains ESCAPE '\\'
+        ORDER BY
+            p.name = :query COLLATE NOCASE DESC,
+            p.name LIKE :prefix ESCAPE '\\' DESC,
+            p.name LIKE :contains ESCAPE '\\' DESC,
+            p.frecency DESC
+        LIMIT :limit
+        """
+    params = {
+        "query": query,
+        "prefix": f"{pattern}%",
+        "contains": f"%{pattern}%",
+        "limit": limit,
+    }
+    return clause, params
+
+
+@traced()
+def find_paths(db: DB, query: str, limit: int = 20) -> List[str]:
+    # Paths of Project.find(db, query, limit)
+    clause, params = find_clause(query, limit)
+    db.cur.execute(f"SELECT p.path FROM projects p {clause};", params)
+    return [path for path, in db.cur.fetchall()]
+
+
+@traced()
+def listing(
+    db: DB, category: Optional[str] = None, order_by: str = "name"
+) -> Optional[str]:
+    # "name<tab>path" lines of the projects of the category of this name,
+    # or of all of them, put together by SQLite: a listing of all of them
+    # is a single string instead of a tuple and two strings per project.
+    # None if there is no such category.
+    where = ""
+    params: tuple = ()
+    if category is not None:
+        db.cur.execute(
+            "SELECT id FROM categories WHERE name = ?;", (category,)
+        )
+        row = db.cur.fetchone()
+        if row is None:
+            return None
+        where = "WHERE p.category_id = ?"
+        params = row
+    q = f"""
+        SELECT group_concat(p.name || char(9) || p.path || char(10), '')
+        FROM (
+            SELECT p.name, p.path FROM projects p
+            {where} ORDER BY {ORDER_BY[order_by]}
+        ) p;
+        """
+    db.cur.execute(q, params)
+    return db.cur.fetchone()[0] or ""
@@ -2,6 +2,8 @@ from dataclasses import dataclass
 from typing import Optional, List
 
 from code_compass.db import DB
+from code_compass.events import CATEGORY_DELETED, CATEGORY_SAVED
+from code_compass.tracing import traced
 
 
 @dataclass
@@ -10,15 +12,45 @@ class Category:
     name: str
     is_active: bool = True
 
+    # IDENTITY MAP
+
+    def remember(self, db: DB) -> None:
+        keys = ("id", self.id), ("name", self.name)
+        db.identity.add("category", self, *keys)
+
+    @classmethod
+    def load(cls, db: DB, id: int, name: str, is_active) -> "Category":
+        # The mapped instance of a row, updated from it
+        category = db.identity.get("category", ("id", id))
+        if category is None:
+            category = cls(id=id, name=name)
+        elif category.name != name:
+            db.identity.discard("category", ("name", category.name))
+        category.name = name
+        category.is_active = bool(is_active)
+        category.remember(db)
+        return category
+
     # CREATE CATEGORY
 
     @classmethod
+    @traced()
     def create(cls, db: DB, name: str) -> "Category":
         category = cls(id=None, name=name)
         category.save(db)
         return category
 
     @classmethod
+    @traced()
+    def resolve(cls, db: DB, name: str) -> "Category":
+        # Existing category with this name, created if there is none
+        category = cls.get_by_name(db, name)
+        if category is None:
+            category = cls.create(db, name)
+        return category
+
+    @classmethod
+    @traced()
     def create_default_if_db_is_empty(cls, db: DB) -> None:
         q = """
             SELECT * FROM categories;
@@ -28,30 +60,32 @@ class Category:
         if not data:
             cls.create(db, "Default")
 
+    @traced()
     def save(self, db: DB) -> None:
-        # Insert category if it doesn't exist or update it if it does
-        q_find = """
-            SELECT * FROM categories WHERE name = ?;
+        # Insert category if it doesn't exist. Only set_active changes
+        # which category is active: an existing one keeps its flag and a
+        # new one is only active if no other one is.
+        q = """
+            INSERT INTO categories (name, is_active)
+            SELECT ?, ? AND NOT EXISTS (
+                SELECT 1 FROM categories WHERE is_active
+            )
+            -- Needed to parse the ON CONFLICT of an INSERT ... SELECT
+            WHERE true
+            ON CONFLICT (name) DO UPDATE SET name = excluded.name
+            RETURNING id, is_active;
             """
-        db.cur.execute(q_find, (self.name,))
-        data = db.cur.fetchone()
-        if data:
-            q = """
-                UPDATE categories SET name = ?, is_active = ? WHERE id = ?;
-                """
-            db.cur.execute(q, (self.name, self.is_active, self.id))
-            db.con.commit()
-        else:
-            q = """
-                INSERT INTO categories (name, is_active) VALUES (?, ?);
-                """
-            db.cur.execute(q, (self.name, self.is_active))
-        db.con.commit()
-        self.id = db.cur.lastrowid
+        db.cur.execute(q, (self.name, self.is_active))
+        self.id, is_active = db.cur.fetchone()
+        self.is_active = bool(is_active)
+        db.commit()
+        self.remember(db)
+        db.notify(CATEGORY_SAVED, self)
 
     # ALL CATEGORIES
 
     @classmethod
+    @traced()
     def all(cls, db: DB) -> List["Category"]:
         q = """
             SELECT * FROM categories ORDER BY name COLLATE NOCASE ASC;
@@ -60,22 +94,31 @@ class Category:
         data = db.cur.fetchall()
         res = []
         for i in data:
-            res.append(cls(id=i[0], name=i[1], is_active=i[2]))
+            res.append(cls.load(db, *i))
+        db.identity.complete.add("category")
         return res
 
     # GET CATEGORY
 
     @classmethod
+    @traced()
     def get(cls, db: DB, category_id: int) -> "Category":
+        category = db.identity.get("category", ("id", category_id))
+        if category is not None:
+            return category
         q = """ 
             SELECT * FROM categories WHERE id = ?;
             """
         db.cur.execute(q, (category_id,))
         data = db.cur.fetchone()
-        return cls(id=data[0], name=data[1])
+        return cls.load(db, *data)
 
     @classmethod
+    @traced()
     def get_by_name(cls, db: DB, category_name: str) -> Optional["Category"]:
+        category = db.identity.get("category", ("name", category_name))
+        if category is not None or "category" in db.identity.complete:
+            return category
         q = """ 
             SELECT * FROM categories WHERE name = ?;
             """
@@ -83,44 +126,52 @@ class Category:
         data = db.cur.fetchone()
         if not data:
             return None
-        return cls(id=data[0], name=data[1])
+        return cls.load(db, *data)
 
     # ACTIVE CATEGORY
 
     @classmethod
+    @traced()
     def get_active(cls, db: DB) -> Optional["Category"]:
+        if "category" in db.identity.complete:
+            active = [
+                category
+                for category in db.identity.values("category")
+                if category.is_active
+            ]
+            return min(active, key=lambda category: category.id, default=None)
         q = """
-            SELECT * FROM categories WHERE is_active = 1;
+            SELECT * FROM categories WHERE is_active = 1 ORDER BY id;
             """
         db.cur.execute(q)
         data = db.cur.fetchone()
         if data:
-            return Category(id=data[0], name=data[1])
+            return cls.load(db, *data)
         return None
 
+    @traced()
     def set_active(self, db: DB) -> None:
         q = """
-            UPDATE categories SET is_active = 0;
-            """
-        db.cur.execute(q)
-        q = """
-            UPDATE categories SET is_active = 1 WHERE id = ?;
+            UPDATE categories SET is_active = (id = ?);
             """
         db.cur.execute(q, (self.id,))
-        db.con.commit()
+        db.commit()
+        self.is_active = True
+        for category in db.identity.values("category"):
+            category.is_active = category.id == self.id
 
     # DELETE CATEGORY
 
+    @traced()
     def delete(self, db: DB) -> None:
-        # delete category and all projects that belong to it
-
+        # delete category, its projects are removed by the foreign key
         q = """
-            DELETE FROM projects WHERE category_id = ?;
+            DELETE FROM categories WHERE id = ?;
             """
         db.cur.execute(q, (self.id,))
-
-        q = """
-                    DELETE FROM categories WHERE id = ?;
-                    """
-        db.cur.execute(q, (self.id,))
-        db.con.commit()
+        db.commit()
+        db.identity.discard("category", ("id", self.id), ("name", self.name))
+        for project in list(db.identity.values("project")):
+            if project.category.id == self.id:
+                project.forget(db)
+        db.notify(CATEGORY_DELETED, self)
@@ -0,0 +1,385 @@
+import argparse
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+from code_compass import catalog, config
+from code_compass.catalog import ORDER_BY
+from code_compass.db import DB
+from code_compass.scan import (
+    DEFAULT_DEPTH,
+    DEFAULT_WORKERS,
+    IGNORED,
+    scan_projects,
+)
+
+# Command line interface, works without Qt. `code-compass` without one of
+# these commands starts the application window. Every command starts a
+# fresh interpreter, so modules only some of them need are imported where
+# they are used (see benchmarks/cli.py). ls and open go through catalog.py
+# and leave out even the models.
+
+
+def scan(db: DB, args: argparse.Namespace) -> None:
+    from code_compass.category import Category
+    from code_compass.project import Project
+
+    category = Category.resolve(db, args.category)
+
+    found = []
+    for path in scan_projects(
+        args.root or config.PROJECTS_PATH,
+        max_depth=args.depth,
+        ignore=args.ignore,
+        workers=args.workers,
+    ):
+        found.append(path)
+        print(path)
+
+    if args.dry_run:
+        return
+    from code_compass import fingerprints
+
+    added = Project.insert_many(db, found, category)
+    computed = fingerprints.compute_many(
+        (project.path for project in added), config.GIT_TIMEOUT, args.workers
+    )
+    fingerprints.save(
+        db,
+        (
+            (project.id, values)
+            for project, (_, values) in zip(added, computed)
+        ),
+    )
+    print(
+        f"{len(found)} projects found, {len(added)} added to {category.name}",
+        file=sys.stderr,
+    )
+
+
+def open_project(db: DB, args: argparse.Namespace) -> None:
+    paths = catalog.find_paths(db, args.query, limit=1)
+    if not paths:
+        sys.exit(f"No project matches {args.query!r}")
+
+    if args.print:
+        print(paths[0])
+        return
+
+    ide_commands = config.IDE_COMMANDS
+    ide = args.ide or ide_commands[0]
+    if ide not in ide_commands:
+        sys.exit(f"{ide!r} is not one of the ide_commands in the config")
+
+    import subprocess
+
+    from code_compass.frecency import AccessLog
+    from code_compass.project import Project
+
+    project = Project.get(db, paths[0])
+    try:
+        subprocess.Popen([ide, project.path])
+    except OSError as e:
+        sys.exit(f"Could not run {ide}: {e}")
+
+    # Logged as a launch, like running the project from the window
+    with db.transaction():
+        project.save(db)
+        AccessLog.record(db, [project])
+
+
+def list_projects(db: DB, args: argparse.Namespace) -> None:
+    listing = catalog.listing(db, args.category, order_by=args.sort)
+    if listing is None:
+        sys.exit(f"No category named {args.category!r}")
+    sys.stdout.write(listing)
+
+
+def add_project(db: DB, args: argparse.Namespace) -> None:
+    path = Path(args.path).expanduser().resolve()
+    if not path.is_dir():
+        sys.exit(f"{args.path} is not a directory")
+
+    from code_compass.category import Category
+    from code_compass.project import Project
+
+    category = Category.resolve(db, args.category)
+    project = Project(
+        name=args.name or path.name,
+        path=str(path),
+        last_opened=None,
+        category=category,
+    )
+    from code_compass import fingerprints
+
+    with db.transaction():
+        project.save(db)
+        values = fingerprints.compute(project.path, config.GIT_TIMEOUT)
+        fingerprints.save(db, [(project.id, values)])
+    print(f"{project.name} added to {category.name}", file=sys.stderr)
+
+
+def prune(db: DB, args: argparse.Namespace) -> None:
+    from code_compass.health import MISSING, OK, PathHealthService
+    from code_compass.project import Project
+
+    projects = Project.all(db)
+    service = PathHealthService(config.PATH_TIMEOUT)
+    statuses = service.refresh(project.path for project in projects)
+    missing = []
+    for project in projects:
+        status = statuses[project.path]
+        if status == MISSING:
+            missing.append(project)
+            print(project.path)
+        elif status != OK:
+            print(f"{project.path}: {status}, kept", file=sys.stderr)
+
+    if args.dry_run:
+        return
+    Project.delete_many(db, missing)
+    print(f"{len(missing)} missing projects deleted", file=sys.stderr)
+
+
+def relocate(db: DB, args: argparse.Namespace) -> None:
+    from code_compass import fingerprints
+    from code_compass.health import MISSING, PathHealthService
+    from code_compass.project import Project
+
+    rows = Project.ids_and_paths(db)
+    service = PathHealthService(config.PATH_TIMEOUT)
+    statuses = service.refresh(path for _, path in rows)
+    missing = {
+        project_id: path
+        for project_id, path in rows
+        if statuses[path] == MISSING
+    }
+    # Only the ones fingerprinted before they went missing can be found
+    known = fingerprints.get_many(db, missing)
+    for project_id in missing.keys() - known.keys():
+        print(f"{missing.pop(project_id)}: no fingerprint", file=sys.stderr)
+    if not missing:
+        print("No missing project to look for", file=sys.stderr)
+        return
+
+    found = fingerprints.candidates(
+        args.root or config.PROJECTS_PATH,
+        {path for _, path in rows},
+        max_depth=args.depth,
+        git_timeout=config.GIT_TIMEOUT,
+    )
+    moves = fingerprints.match(db, missing, found)
+    for old, new in moves.items():
+        print(f"{old}\t{new}")
+
+    if args.dry_run:
+        return
+    relocated = fingerprints.relocate(db, moves, found)
+    print(
+        f"{len(relocated)} of {len(missing)} missing projects relocated",
+        file=sys.stderr,
+    )
+
+
+def search_contents(db: DB, args: argparse.Namespace) -> None:
+    from code_compass import contents
+    from code_compass.project import Project
+
+    if not args.cached:
+        contents.index(db, Project.ids_and_paths(db))
+    for match in contents.search(db, args.query, limit=args.limit):
+        print(
+            f"{match.project.name}\t{match.project.path}\t"
+            f"{match.file}: {match.snippet}"
+        )
+
+
+def export_catalog(db: DB, args: argparse.Namespace) -> None:
+    from code_compass import transfer
+
+    fmt = args.format or transfer.format_for(args.file)
+    if args.file == "-":
+        count = transfer.export(db, sys.stdout, fmt)
+    else:
+        with open(args.file, "w", newline="") as out:
+            count = transfer.export(db, out, fmt)
+    print(f"{count} records exported", file=sys.stderr)
+
+
+def import_catalog(db: DB, args: argparse.Namespace) -> None:
+    from code_compass import transfer
+
+    fmt = args.format or transfer.format_for(args.file)
+    try:
+        if args.file == "-":
+            records = transfer.read(sys.stdin, fmt)
+            count = transfer.import_records(db, records, args.on_conflict)
+        else:
+            with open(args.file, newline="") as source:
+                records = transfer.read(source, fmt)
+                count = transfer.import_records(db, records, args.on_conflict)
+    except transfer.TransferError as e:
+        sys.exit(f"Nothing imported, {args.file}: {e}")
+    print(f"{count} project records read", file=sys.stderr)
+
+
+def add_scan_command(commands) -> None:
+    parser = commands.add_parser(
+        "scan", help="find projects under a directory and add them"
+    )
+    parser.add_argument(
+        "root", nargs="?", help="directory to scan, projects_path by default"
+    )
+    parser.add_argument("--category", default="Default")
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument(
+        "--ignore",
+        action="append",
+        default=sorted(IGNORED),
+        help="directory name to skip, can be repeated",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="only list the projects"
+    )
+    parser.set_defaults(handler=scan)
+
+
+def add_open_command(commands) -> None:
+    parser = commands.add_parser(
+        "open", help="open the best matching project in the IDE"
+    )
+    parser.add_argument("query", help="part of a project name or path")
+    parser.add_argument(
+        "--ide", help="one of ide_commands, the first one by default"
+    )
+    parser.add_argument(
+        "--print",
+        action="store_true",
+        help="print the path of the project instead of opening it",
+    )
+    parser.set_defaults(handler=open_project)
+
+
+def add_ls_command(commands) -> None:
+    parser = commands.add_parser("ls", help="list projects")
+    parser.add_argument("--category", help="all categories by default")
+    parser.add_argument("--sort", choices=sorted(ORDER_BY), default="frecency")
+    parser.set_defaults(handler=list_projects)
+
+
+def add_add_command(commands) -> None:
+    parser = commands.add_parser("add", help="add a project directory")
+    parser.add_argument("path")
+    parser.add_argument("--name", help="the directory name by default")
+    parser.add_argument("--category", default="Default")
+    parser.set_defaults(handler=add_project)
+
+
+def add_prune_command(commands) -> None:
+    parser = commands.add_parser(
+        "prune", help="delete the projects whose directory is gone"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="only list them"
+    )
+    parser.set_defaults(handler=prune)
+
+
+def add_relocate_command(commands) -> None:
+    parser = commands.add_parser(
+        "relocate", help="find the projects whose directory was moved"
+    )
+    parser.add_argument(
+        "root", nargs="?", help="where to look, projects_path by default"
+    )
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH)
+    parser.add_argument(
+        "--dry-run", action="store_true", help="only list the moves"
+    )
+    parser.set_defaults(handler=relocate)
+
+
+def add_search_command(commands) -> None:
+    parser = commands.add_parser(
+        "search",
+        help="find projects by their README, description and docstrings",
+    )
+    parser.add_argument("query")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument(
+        "--cached",
+        action="store_true",
+        help="don't look for changed files before searching",
+    )
+    parser.set_defaults(handler=search_contents)
+
+
+def add_export_command(commands) -> None:
+    parser = commands.add_parser(
+        "export", help="write all projects and categories to a file"
+    )
+    parser.add_argument("file", help=".jsonl or .csv, - for stdout")
+    parser.add_argument("--format", choices=["jsonl", "csv"])
+    parser.set_defaults(handler=export_catalog)
+
+
+def add_import_command(commands) -> None:
+    parser = commands.add_parser(
+        "import", help="add the projects of an exported file"
+    )
+    parser.add_argument("file", help=".jsonl or .csv, - for stdin")
+    parser.add_argument("--format", choices=["jsonl", "csv"])
+    parser.add_argument(
+        "--on-conflict",
+        choices=["skip", "overwrite", "newest"],
+        default="skip",
+        help="what to do with projects that are already registered",
+    )
+    parser.set_defaults(handler=import_catalog)
+
+
+# Subcommand name -> function adding its parser
+COMMANDS = {
+    "scan": add_scan_command,
+    "open": add_open_command,
+    "ls": add_ls_command,
+    "add": add_add_command,
+    "prune": add_prune_command,
+    "relocate": add_relocate_command,
+    "search": add_search_command,
+    "export": add_export_command,
+    "import": add_import_command,
+}
+
+
+def build_parser(command: Optional[str] = None) -> argparse.ArgumentParser:
+    # Parser of all the subcommands, or only of command if it is one, which
+    # is all a command line starting with it needs
+    parser = argparse.ArgumentParser(
+        prog="code-compass",
+        description="Without a command, opens the window.",
+        epilog=(
+            "window options: --resident keeps it running when closed, "
+            "--startup-profile prints how long starting it took, "
+            "--refresh-template updates the cached project template"
+        ),
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    if command in COMMANDS:
+        COMMANDS[command](commands)
+    else:
+        for add_command in COMMANDS.values():
+            add_command(commands)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    if argv is None:
+        argv = sys.argv[1:]
+    args = build_parser(argv[0] if argv else None).parse_args(argv)
+    db = DB()
+    try:
+        args.handler(db, args)
+    finally:
+        db.close()
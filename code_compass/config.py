@@ -1,29 +1,139 @@
-import shutil
 from pathlib import Path
 
-import yaml
+from code_compass.tracing import traced
 
 BASE_DIR = Path.home() / ".config" / "code_compass"
 DB_PATH = BASE_DIR / "data.db"
 CONFIG_PATH = BASE_DIR / "config.yaml"
+CONFIG_CACHE_PATH = BASE_DIR / "config.cache.json"
+SOCKET_PATH = BASE_DIR / "code_compass.sock"
 TEMPLATE_CONFIG_PATH = Path(__file__).parent / "config.yaml"
 
+# Parsed config and the (mtime, size) of the file it was parsed from
+_config_src = None
+_config_stamp = None
 
-config_src = {}
-if not CONFIG_PATH.is_file():
-    BASE_DIR.mkdir(parents=True, exist_ok=True)
-    shutil.copyfile(TEMPLATE_CONFIG_PATH, CONFIG_PATH)
 
-with CONFIG_PATH.open() as f:
-    config_src = yaml.safe_load(f.read())
+@traced()
+def load_config() -> dict:
+    # The config is parsed lazily and re-parsed only when the file changes.
+    # The parsed result is also kept on disk, so an unchanged config doesn't
+    # even need yaml to be imported.
+    global _config_src, _config_stamp
 
-IDE_COMMANDS = config_src.get("ide_commands", ["pycharm"])
+    if not CONFIG_PATH.is_file():
+        import shutil
 
-projects_path = config_src.get("projects_path", Path.home())
-if projects_path in ["~", "HOME"]:
-    projects_path = Path.home()
-else:
-    projects_path = Path(projects_path)
+        BASE_DIR.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(TEMPLATE_CONFIG_PATH, CONFIG_PATH)
 
-PROJECTS_PATH = str(projects_path)
-COOKIECUTTER = config_src.get("cookiecutter")
+    stat = CONFIG_PATH.stat()
+    stamp = [stat.st_mtime_ns, stat.st_size]
+    if stamp == _config_stamp:
+        return _config_src
+
+    config_src = _read_config_cache(stamp)
+    if config_src is None:
+        import yaml
+
+        with CONFIG_PATH.open() as f:
+            config_src = yaml.safe_load(f.read()) or {}
+        _write_config_cache(stamp, config_src)
+
+    _config_src, _config_stamp = config_src, stamp
+    return config_src
+
+
+def _read_config_cache(stamp: list):
+    # json is imported here and in _write_config_cache(), commands that
+    # don't read the config are spared it
+    import json
+
+    try:
+        with CONFIG_CACHE_PATH.open() as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cached.get("stamp") != stamp:
+        return None
+    return cached.get("config")
+
+
+def _write_config_cache(stamp: list, config_src: dict) -> None:
+    import json
+
+    try:
+        data = json.dumps({"stamp": stamp, "config": config_src})
+    except (TypeError, ValueError):
+        # Not representable as JSON, parse the yaml next time as well
+        return
+    try:
+        CONFIG_CACHE_PATH.write_text(data)
+    except OSError:
+        pass
+
+
+def get_ide_commands() -> list:
+    return load_config().get("ide_commands", ["pycharm"])
+
+
+def get_projects_path() -> str:
+    projects_path = load_config().get("projects_path")
+    # "~" is parsed by yaml as null
+    if projects_path in [None, "~", "HOME"]:
+        return str(Path.home())
+    return str(Path(projects_path).expanduser())
+
+
+def get_cookiecutter() -> str:
+    return load_config().get("cookiecutter")
+
+
+def get_template_cache() -> bool:
+    return bool(load_config().get("template_cache", True))
+
+
+def get_offline() -> bool:
+    return bool(load_config().get("offline", False))
+
+
+def get_venv_clone() -> bool:
+    return bool(load_config().get("venv_clone", True))
+
+
+def get_resident() -> bool:
+    return bool(load_config().get("resident", False))
+
+
+def get_git_concurrency() -> int:
+    return max(1, int(load_config().get("git_concurrency", 8)))
+
+
+def get_git_timeout() -> float:
+    return float(load_config().get("git_timeout", 5))
+
+
+def get_path_timeout() -> float:
+    return float(load_config().get("path_timeout", 2))
+
+
+_LAZY_SETTINGS = {
+    "IDE_COMMANDS": get_ide_commands,
+    "PROJECTS_PATH": get_projects_path,
+    "COOKIECUTTER": get_cookiecutter,
+    "TEMPLATE_CACHE": get_template_cache,
+    "OFFLINE": get_offline,
+    "VENV_CLONE": get_venv_clone,
+    "RESIDENT": get_resident,
+    "GIT_CONCURRENCY": get_git_concurrency,
+    "GIT_TIMEOUT": get_git_timeout,
+    "PATH_TIMEOUT": get_path_timeout,
+}
+
+
+def __getattr__(name):
+    # Keep the settings importable as module constants, but only read the
+    # config when one of them is actually used
+    if name in _LAZY_SETTINGS:
+        return _LAZY_SETTINGS[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,317 @@
+import configparser
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from code_compass import pyproject
+from code_compass.db import DB
+from code_compass.project import MAX_VARIABLES, Project
+from code_compass.scan import IGNORED
+from code_compass.tracing import traced
+
+# Full-text search over what projects say about themselves: their README,
+# the description in pyproject.toml or setup.cfg and the docstrings of
+# their top-level modules. Every such file is a row of the SQLite FTS5
+# table content_index, stored with the mtime and size it had when it was
+# read. Indexing runs on the thread pool (see workers.IndexContentsTask)
+# and only reads the files whose stamp changed.
+
+# Bytes read of a README and of the head of a module
+MAX_README_BYTES = 256 * 1024
+MAX_MODULE_BYTES = 64 * 1024
+
+# Package directories whose __init__.py is a top-level module, besides the
+# ones directly in the project
+SOURCE_DIRS = ("src",)
+
+# Markers around the query terms in snippets
+SNIPPET_START, SNIPPET_END = "[", "]"
+SNIPPET_TOKENS = 12
+
+DOCSTRING = re.compile(
+    r"""\A(?:[ \t]*(?:#[^\n]*)?\n)*[ \t]*[rRuU]?(\"\"\"|''')(.*?)\1""",
+    re.DOTALL,
+)
+# description of pyproject.toml without tomllib, see pyproject.py
+PYPROJECT_DESCRIPTION = re.compile(
+    r"""^\s*description\s*=\s*["']([^"'\n]*)["']""", re.MULTILINE
+)
+QUERY_WORD = re.compile(r"\w+")
+# Shorter query words match too much of the index to rank it quickly
+MIN_WORD_LENGTH = 2
+
+# (mtime_ns, size) of a file
+Stamp = Tuple[int, int]
+
+
+@dataclass
+class ContentMatch:
+    project: Project
+    # Path of the matching file relative to the project
+    file: str
+    snippet: str
+
+
+# FILES
+
+
+def candidate_files(path: str) -> Iterator[Tuple[str, os.stat_result]]:
+    # (relative path, stat) of the files of a project that are indexed.
+    # Only the project directory and its top-level packages are listed.
+    directories = [""]
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not (
+                            entry.name in IGNORED or entry.name.startswith(".")
+                        ):
+                            directories.append(entry.name)
+                        continue
+                    if not entry.is_file():
+                        continue
+                    name = entry.name.lower()
+                    if (
+                        name.startswith("readme")
+                        or name in ("pyproject.toml", "setup.cfg")
+                        or name.endswith(".py")
+                    ):
+                        yield entry.name, entry.stat()
+                except OSError:
+                    continue
+    except OSError:
+        return
+
+    for directory in directories[1:]:
+        if directory in SOURCE_DIRS:
+            yield from _packages(path, directory)
+        else:
+            yield from _init(path, directory)
+
+
+def _packages(path: str, directory: str):
+    try:
+        with os.scandir(os.path.join(path, directory)) as entries:
+            names = [
+                entry.name
+                for entry in entries
+                if not entry.name.startswith(".")
+                and entry.is_dir(follow_symlinks=False)
+            ]
+    except OSError:
+        return
+    for name in names:
+        yield from _init(path, f"{directory}/{name}")
+
+
+def _init(path: str, directory: str):
+    file = f"{directory}/__init__.py"
+    try:
+        yield file, os.stat(os.path.join(path, file))
+    except OSError:
+        pass
+
+
+def read_text(path: str, file: str) -> str:
+    # The indexed text of a file, empty if it has none or can't be read
+    name = os.path.basename(file).lower()
+    limit = MAX_MODULE_BYTES if name.endswith(".py") else MAX_README_BYTES
+    try:
+        with open(os.path.join(path, file), "rb") as f:
+            content = f.read(limit).decode(errors="replace")
+    except OSError:
+        return ""
+
+    if name == "pyproject.toml":
+        return pyproject_description(content)
+    if name == "setup.cfg":
+        parser = configparser.ConfigParser(interpolation=None)
+        try:
+            parser.read_string(content)
+        except configparser.Error:
+            return ""
+        return parser.get("metadata", "description", fallback="")
+    if name.endswith(".py"):
+        match = DOCSTRING.match(content.lstrip("\ufeff"))
+        return match.group(2).strip() if match else ""
+    return content
+
+
+def pyproject_description(content: str) -> str:
+    description = pyproject.field(
+        content,
+        (("project", "description"), ("tool", "poetry", "description")),
+        PYPROJECT_DESCRIPTION,
+    )
+    return description or ""
+
+
+def changes(
+    path: str, known: Dict[str, Stamp]
+) -> Tuple[List[Tuple[str, Stamp, str]], List[str]]:
+    # What changed in a project since its files had the known stamps:
+    # (file, stamp, text) of the new and modified files, which are the
+    # only ones read, and the files that are gone
+    updated = []
+    seen = set()
+    for file, stat in candidate_files(path):
+        seen.add(file)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if known.get(file) != stamp:
+            updated.append((file, stamp, read_text(path, file)))
+    removed = [file for file in known if file not in seen]
+    return updated, removed
+
+
+# STORAGE
+
+
+@traced()
+def stamps(
+    db: DB, project_ids: Optional[Iterable[int]] = None
+) -> Dict[int, Dict[str, Stamp]]:
+    # {project id: {file: stamp}} of the indexed files, of every project
+    # by default
+    q = "SELECT project_id, file, mtime_ns, size FROM content_files"
+    if project_ids is None:
+        chunks = [()]
+    else:
+        project_ids = list(project_ids)
+        chunks = [
+            project_ids[i : i + MAX_VARIABLES]
+            for i in range(0, len(project_ids), MAX_VARIABLES)
+        ]
+    result: Dict[int, Dict[str, Stamp]] = {}
+    for chunk in chunks:
+        where = ""
+        if chunk:
+            where = f"WHERE project_id IN ({', '.join('?' * len(chunk))})"
+        db.cur.execute(f"{q} {where};", chunk)
+        for project_id, file, mtime_ns, size in db.cur.fetchall():
+            result.setdefault(project_id, {})[file] = (mtime_ns, size)
+    return result
+
+
+@traced()
+def save(
+    db: DB,
+    results: Iterable[Tuple[int, List[Tuple[str, Stamp, str]], List[str]]],
+) -> None:
+    # Store (project id, updated, removed) results of changes()
+    upsert = """
+        INSERT INTO content_files (project_id, file, mtime_ns, size)
+        SELECT :id, :file, :mtime_ns, :size
+        -- The project may have been deleted in the meantime
+        WHERE EXISTS (SELECT 1 FROM projects WHERE id = :id)
+        ON CONFLICT (project_id, file) DO UPDATE SET
+            mtime_ns = excluded.mtime_ns,
+            size = excluded.size
+        RETURNING id;
+        """
+    with db.transaction():
+        for project_id, updated, removed in results:
+            db.cur.executemany(
+                "DELETE FROM content_files WHERE project_id = ? AND file = ?;",
+                ((project_id, file) for file in removed),
+            )
+            for file, (mtime_ns, size), text in updated:
+                row = db.cur.execute(
+                    upsert,
+                    {
+                        "id": project_id,
+                        "file": file,
+                        "mtime_ns": mtime_ns,
+                        "size": size,
+                    },
+                ).fetchone()
+                if row is None:
+                    break
+                db.cur.execute(
+                    "DELETE FROM content_index WHERE rowid = ?;", row
+                )
+                if text:
+                    db.cur.execute(
+                        "INSERT INTO content_index (rowid, text) "
+                        "VALUES (?, ?);",
+                        (row[0], text),
+                    )
+
+
+def index(db: DB, projects: Iterable[Tuple[int, str]]) -> int:
+    # Bring the index of (id, path) projects up to date on this thread,
+    # returns the number of files read
+    known = stamps(db)
+    results = []
+    for project_id, path in projects:
+        updated, removed = changes(path, known.get(project_id, {}))
+        if updated or removed:
+            results.append((project_id, updated, removed))
+    save(db, results)
+    return sum(len(updated) for _, updated, _ in results)
+
+
+# QUERY
+
+
+def match_expression(query: str) -> Optional[str]:
+    # Every word of the query as a prefix, so "deploy" finds "deployment"
+    # and a word that is still being typed matches. Quoting keeps FTS5
+    # operators literal.
+    words = [
+        word
+        for word in QUERY_WORD.findall(query)
+        if len(word) >= MIN_WORD_LENGTH
+    ]
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+@traced()
+def search(db: DB, query: str, limit: int = 20) -> List[ContentMatch]:
+    # Projects whose contents match the query, best first by bm25 of their
+    # best matching file. Snippets are only made for the results.
+    expression = match_expression(query)
+    if expression is None:
+        return []
+
+    q = """
+        SELECT f.project_id, f.id, f.file
+        FROM content_index
+        JOIN content_files f ON f.id = content_index.rowid
+        WHERE content_index MATCH ?
+        ORDER BY rank;
+        """
+    best: Dict[int, Tuple[int, str]] = {}
+    for project_id, rowid, file in db.cursor().execute(q, (expression,)):
+        if project_id not in best:
+            best[project_id] = (rowid, file)
+            if len(best) == limit:
+                break
+    if not best:
+        return []
+
+    rowids = [rowid for rowid, _ in best.values()]
+    q = f"""
+        SELECT rowid, snippet(content_index, 0, ?, ?, '…', ?)
+        FROM content_index
+        WHERE content_index MATCH ?
+            AND rowid IN ({", ".join("?" * len(rowids))});
+        """
+    db.cur.execute(
+        q,
+        (SNIPPET_START, SNIPPET_END, SNIPPET_TOKENS, expression, *rowids),
+    )
+    snippets = dict(db.cur.fetchall())
+    projects = Project.get_many(db, best)
+    return [
+        ContentMatch(
+            project=projects[project_id],
+            file=file,
+            snippet=" ".join(snippets.get(rowid, "").split()),
+        )
+        for project_id, (rowid, file) in best.items()
+        if project_id in projects
+    ]
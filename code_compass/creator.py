@@ -0,0 +1,150 @@
+import os
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+from typing import Callable, Optional
+
+from code_compass.templates import TemplateCache
+from code_compass.venvs import VenvProvisioner
+
+# Stages of a project creation, in order
+STAGES = ("template", "venv", "pip", "register")
+TEMPLATE, VENV, PIP, REGISTER = STAGES
+
+STAGE_LABELS = {
+    TEMPLATE: "Rendering the template",
+    VENV: "Creating the virtual environment",
+    PIP: "Installing pip",
+    REGISTER: "Registering the project",
+}
+
+
+class CreationCancelled(Exception):
+    pass
+
+
+class ProjectCreation:
+    # Renders the cookiecutter template and prepares the virtual
+    # environment of a new project. Runs off the GUI thread, can be
+    # cancelled from any thread and removes whatever it created if it
+    # doesn't finish. Registering the project in the database is left to
+    # the caller, as the connection belongs to the GUI thread.
+
+    def __init__(
+        self,
+        path: Path,
+        name: str,
+        template: str,
+        template_cache: Optional[TemplateCache] = None,
+        offline: bool = False,
+        provisioner: Optional[VenvProvisioner] = None,
+    ):
+        self.path = path.absolute()
+        self.name = name
+        self.template = template
+        self.template_cache = template_cache
+        self.offline = offline
+        self.provisioner = provisioner
+        self.venv_cloned = False
+
+        self.cancelled = threading.Event()
+        self.process: Optional[subprocess.Popen] = None
+        self.lock = threading.Lock()
+
+    @property
+    def venv_path(self) -> Path:
+        return self.path / "venv"
+
+    def cancel(self) -> None:
+        with self.lock:
+            self.cancelled.set()
+            if self.process is not None:
+                self.process.terminate()
+
+    def check_cancelled(self) -> None:
+        if self.cancelled.is_set():
+            raise CreationCancelled()
+
+    def run(self, progress: Callable[[str], None]) -> None:
+        path_existed = self.path.exists()
+        venv_existed = self.venv_path.exists()
+        try:
+            self.check_cancelled()
+            progress(TEMPLATE)
+            self.render_template()
+
+            self.check_cancelled()
+            progress(VENV)
+            self.create_venv()
+
+            self.check_cancelled()
+            progress(PIP)
+            self.bootstrap_pip()
+            self.check_cancelled()
+        except BaseException:
+            self.rollback(path_existed, venv_existed)
+            raise
+
+    # STAGES
+
+    def render_template(self) -> None:
+        from cookiecutter.main import cookiecutter
+
+        template = self.template
+        if self.template_cache is not None:
+            template = self.template_cache.resolve(template, self.offline)
+
+        cookiecutter(
+            template,
+            no_input=True,
+            output_dir=str(self.path.parent),
+            extra_context={"project_name": self.name},
+            overwrite_if_exists=True,
+        )
+
+    def create_venv(self) -> None:
+        import venv
+
+        if self.provisioner is not None:
+            try:
+                self.provisioner.clone(self.venv_path)
+                self.venv_cloned = True
+                return
+            except (OSError, subprocess.CalledProcessError):
+                # Fall back to a regular environment
+                shutil.rmtree(self.venv_path, ignore_errors=True)
+
+        # pip is bootstrapped as a separate stage, so it can be cancelled
+        venv.create(self.venv_path, with_pip=False)
+
+    def bootstrap_pip(self) -> None:
+        if self.venv_cloned:
+            # The base environment already has pip
+            return
+
+        bin_dir = "Scripts" if os.name == "nt" else "bin"
+        python = self.venv_path / bin_dir / "python"
+        with self.lock:
+            self.check_cancelled()
+            self.process = subprocess.Popen(
+                [str(python), "-m", "ensurepip", "--upgrade", "--default-pip"],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+            )
+        _, stderr = self.process.communicate()
+        self.check_cancelled()
+        if self.process.returncode != 0:
+            raise subprocess.CalledProcessError(
+                self.process.returncode, self.process.args, stderr=stderr
+            )
+
+    # ROLLBACK
+
+    def rollback(self, path_existed: bool, venv_existed: bool) -> None:
+        # Only remove what this creation added, an existing directory the
+        # template was rendered over is kept
+        if not path_existed:
+            shutil.rmtree(self.path, ignore_errors=True)
+        elif not venv_existed:
+            shutil.rmtree(self.venv_path, ignore_errors=True)
@@ -1,39 +1,127 @@
+import math
 import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
 
-from code_compass.config import BASE_DIR, DB_PATH
+from code_compass import tracing
+from code_compass.config import DB_PATH
+from code_compass.identity import IdentityMap
+from code_compass.migrations import migrate
+
+# Applied on every connection. WAL lets readers run next to a writer and
+# makes commits cheap, NORMAL sync is safe with WAL.
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL;",
+    "PRAGMA synchronous = NORMAL;",
+    "PRAGMA foreign_keys = ON;",
+    "PRAGMA temp_store = MEMORY;",
+    "PRAGMA cache_size = -16000;",
+    "PRAGMA mmap_size = 268435456;",
+)
+
+
+def logaddexp(a: float, b: float) -> float:
+    # log(exp(a) + exp(b)) without overflowing, registered as an SQL
+    # function for the frecency scores
+    if a < b:
+        a, b = b, a
+    if b == -math.inf:
+        # exp(b) is 0, and b - a would be nan if a is -inf too
+        return a
+    return a + math.log1p(math.exp(b - a))
+
+
+class TracedCursor(sqlite3.Cursor):
+    # Records every statement as a span, used when tracing is enabled
+
+    def execute(self, sql, parameters=()):
+        with tracing.span(tracing.SQL_SPAN, statement=" ".join(sql.split())):
+            return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        with tracing.span(tracing.SQL_SPAN, statement=" ".join(sql.split())):
+            return super().executemany(sql, seq_of_parameters)
 
 
 class DB:
-    def __init__(self):
-        BASE_DIR.mkdir(parents=True, exist_ok=True)
+    def __init__(self, path: Path = DB_PATH):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Background tasks open connections of their own to it
+        self.path = path
         self.con = sqlite3.connect(
-            DB_PATH,
+            path,
             detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
         )
-        self.cur = self.con.cursor()
-
-        q_create_categories = """
-            CREATE TABLE IF NOT EXISTS
-                categories (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name VARCHAR UNIQUE,
-                    is_active BOOLEAN DEFAULT 0
-                );
-            """
-
-        q = """
-            CREATE TABLE IF NOT EXISTS
-                projects (
-                    name VARCHAR,
-                    path VARCHAR UNIQUE,
-                    last_opened TIMESTAMP,
-                    category_id INTEGER
-                );
-            """
-
-        self.con.execute(q_create_categories)
-        self.con.execute(q)
+        self.cur = self.cursor()
+        self.con.create_function("logaddexp", 2, logaddexp, deterministic=True)
+
+        # Foreign keys have to be enabled after the migrations, they
+        # rebuild tables
+        migrate(self.con)
+        for pragma in PRAGMAS:
+            self.con.execute(pragma)
+
+        # Bumped by every change of projects or categories, lets callers
+        # cache what they loaded of them. Writes of derived data (metadata,
+        # fingerprints, the access log, the contents index) leave it alone.
+        self.generation = 0
+
+        # Callbacks notified about persisted changes, e.g. the search index
+        self.listeners = []
+
+        # Category and Project instances of this connection, see identity.py
+        self.identity = IdentityMap()
+
+        # Open transaction() blocks and the notifications held back until
+        # their changes are committed
+        self.depth = 0
+        self.pending = []
+
+    def cursor(self) -> sqlite3.Cursor:
+        # A cursor of its own, for results iterated over while other
+        # statements run on self.cur. Traced like self.cur.
+        if tracing.ENABLED:
+            return self.con.cursor(TracedCursor)
+        return self.con.cursor()
+
+    @contextmanager
+    def transaction(self):
+        # Unit of work: the commits of everything saved inside the block
+        # are merged into a single one at the end of the outermost block,
+        # an exception rolls all of it back
+        self.depth += 1
+        try:
+            yield self
+        except BaseException:
+            self.depth -= 1
+            if not self.depth:
+                self.con.rollback()
+                self.pending.clear()
+                # Mapped instances may hold the rolled back changes
+                self.identity.clear()
+            raise
+        self.depth -= 1
+        self.commit()
+
+    def commit(self) -> None:
+        if self.depth:
+            return
         self.con.commit()
 
+        pending, self.pending = self.pending, []
+        for action, obj in pending:
+            self.notify(action, obj)
+
+    def notify(self, action: str, obj) -> None:
+        if self.depth:
+            self.pending.append((action, obj))
+            return
+        # Every change of projects and categories is announced
+        self.generation += 1
+        for listener in self.listeners:
+            listener(action, obj)
+
     def close(self):
+        # Let SQLite refresh the statistics the query planner uses
+        self.con.execute("PRAGMA optimize;")
         self.con.close()
@@ -0,0 +1,76 @@
+from typing import Any, Dict, Set
+
+# Changes announced by the persistence methods of Project and Category
+# through DB.notify(action, obj), once they are committed. obj is the
+# Project, or the Category for the category actions.
+INSERTED = "inserted"
+UPDATED = "updated"
+DELETED = "deleted"
+# Same project in another category, obj.category is the new one
+MOVED = "moved"
+CATEGORY_SAVED = "category_saved"
+CATEGORY_DELETED = "category_deleted"
+# Projects written in bulk without a notification each, by an import. obj
+# is None, listeners load again whatever they hold.
+RELOADED = "reloaded"
+
+
+class ChangeSet:
+    # Changes accumulated since the last time they were applied, reduced to
+    # the net effect per project: a project saved several times is updated
+    # once, one inserted and deleted again is not there at all. Listeners
+    # that are slow to apply a change collect them in one of these and
+    # apply them in one go.
+
+    def __init__(self):
+        # Latest state of the inserted, updated and moved projects by id
+        self.projects: Dict[int, Any] = {}
+        # Ids of the projects that were already there before
+        self.existing: Set[int] = set()
+        self.deleted: Set[int] = set()
+        self.deleted_categories: Set[int] = set()
+        self.categories_changed = False
+        # Everything has to be loaded again, see RELOADED
+        self.reloaded = False
+
+    def __bool__(self):
+        return bool(
+            self.projects
+            or self.deleted
+            or self.categories_changed
+            or self.reloaded
+        )
+
+    def __len__(self):
+        return len(self.projects) + len(self.deleted)
+
+    def add(self, action: str, obj) -> None:
+        if action == RELOADED:
+            self.reloaded = True
+            return
+        if action in (CATEGORY_SAVED, CATEGORY_DELETED):
+            self.categories_changed = True
+            if action == CATEGORY_DELETED:
+                self.deleted_categories.add(obj.id)
+            return
+
+        project_id = obj.id
+        if action == DELETED:
+            inserted = (
+                project_id in self.projects and project_id not in self.existing
+            )
+            self.projects.pop(project_id, None)
+            self.existing.discard(project_id)
+            if not inserted:
+                self.deleted.add(project_id)
+            return
+
+        if project_id not in self.projects and action != INSERTED:
+            self.existing.add(project_id)
+        self.deleted.discard(project_id)
+        self.projects[project_id] = obj
+
+    @property
+    def inserted(self) -> Set[int]:
+        # Ids of the projects that didn't exist before these changes
+        return self.projects.keys() - self.existing
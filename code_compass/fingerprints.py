@@ -0,0 +1,280 @@
+import json
+import os
+import re
+import subprocess
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from code_compass import pyproject
+from code_compass.db import DB
+from code_compass.project import MAX_VARIABLES, Project
+from code_compass.scan import DEFAULT_DEPTH, DEFAULT_WORKERS, scan_projects
+from code_compass.tracing import traced
+
+# What identifies a project wherever its directory is, to find it again
+# after it was moved. Every project has up to one value of each kind in
+# the project_fingerprints table, indexed by (kind, value). They are
+# computed on the thread pool along with the metadata (see
+# workers.EnrichTask) and when projects are added from the command line.
+#
+# A relocation search lists the project roots under projects_path that
+# aren't registered, fingerprints them and looks each value up in the
+# index, instead of comparing every directory with every missing project.
+
+# Hash of the first commit, shared by the clones of a repository
+GIT = "git"
+# (st_dev, st_ino) of the directory, kept by a rename or a move within a
+# file system
+INODE = "inode"
+# Package name from pyproject.toml or package.json
+NAME = "name"
+
+# Kinds in the order they are trusted. A value only identifies a project
+# when exactly one missing project and one candidate have it.
+MATCH_ORDER = (GIT, INODE, NAME)
+# Kinds that tell two directories apart when their values differ. The
+# inode changes whenever a directory is copied to another place or file
+# system, so it says nothing against a match of the others.
+DISTINCT_KINDS = (GIT, NAME)
+
+DEFAULT_GIT_TIMEOUT = 5.0
+
+# name of pyproject.toml without tomllib, the first one is the one of
+# [project] or [tool.poetry] in practice
+PYPROJECT_NAME = re.compile(
+    r"""^\s*name\s*=\s*["']([^"'\n]+)["']""", re.MULTILINE
+)
+# Runs of these are one separator in package names, see PEP 503
+NAME_SEPARATORS = re.compile(r"[-_.]+")
+
+Fingerprints = Dict[str, str]
+
+
+# COMPUTING
+
+
+def compute(
+    path: str, git_timeout: float = DEFAULT_GIT_TIMEOUT
+) -> Fingerprints:
+    # {kind: value} of a project directory, without the kinds it has no
+    # value of
+    fingerprints = {}
+    try:
+        info = os.stat(path)
+    except OSError:
+        return fingerprints
+    fingerprints[INODE] = f"{info.st_dev}:{info.st_ino}"
+    name = package_name(path)
+    if name:
+        fingerprints[NAME] = name
+    root = git_root_commit(path, git_timeout)
+    if root:
+        fingerprints[GIT] = root
+    return fingerprints
+
+
+def compute_many(
+    paths: Iterable[str],
+    git_timeout: float = DEFAULT_GIT_TIMEOUT,
+    workers: int = DEFAULT_WORKERS,
+) -> List[Tuple[str, Fingerprints]]:
+    # (path, fingerprints) of paths in their order, computed on a thread
+    # pool since most of the time is spent waiting for git
+    from concurrent.futures import ThreadPoolExecutor
+
+    paths = list(paths)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(lambda path: compute(path, git_timeout), paths)
+        return list(zip(paths, results))
+
+
+def git_root_commit(path: str, timeout: float) -> Optional[str]:
+    if not os.path.exists(os.path.join(path, ".git")):
+        return None
+    try:
+        result = subprocess.run(
+            ["git", "-C", path, "rev-list", "--max-parents=0", "HEAD"],
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    # A repository without commits fails, one whose history was merged
+    # from others has several roots
+    roots = result.stdout.split() if result.returncode == 0 else []
+    return min(roots) if roots else None
+
+
+def package_name(path: str) -> Optional[str]:
+    name = None
+    try:
+        with open(os.path.join(path, "pyproject.toml"), "rb") as f:
+            name = pyproject_name(f.read().decode(errors="replace"))
+    except OSError:
+        pass
+    if name is None:
+        try:
+            with open(os.path.join(path, "package.json"), "rb") as f:
+                data = json.loads(f.read())
+        except (OSError, ValueError):
+            data = None
+        if isinstance(data, dict) and isinstance(data.get("name"), str):
+            name = data["name"]
+    if not name:
+        return None
+    return NAME_SEPARATORS.sub("-", name.strip()).lower()
+
+
+def pyproject_name(content: str) -> Optional[str]:
+    return pyproject.field(
+        content,
+        (("project", "name"), ("tool", "poetry", "name")),
+        PYPROJECT_NAME,
+    )
+
+
+# STORAGE
+
+
+@traced()
+def get_many(db: DB, project_ids: Iterable[int]) -> Dict[int, Fingerprints]:
+    # {project id: fingerprints} of the projects that have any
+    project_ids = list(project_ids)
+    result: Dict[int, Fingerprints] = {}
+    for i in range(0, len(project_ids), MAX_VARIABLES):
+        chunk = project_ids[i : i + MAX_VARIABLES]
+        q = f"""
+            SELECT project_id, kind, value FROM project_fingerprints
+            WHERE project_id IN ({", ".join("?" * len(chunk))});
+            """
+        db.cur.execute(q, chunk)
+        for project_id, kind, value in db.cur.fetchall():
+            result.setdefault(project_id, {})[kind] = value
+    return result
+
+
+@traced()
+def save(db: DB, items: Iterable[Tuple[int, Fingerprints]]) -> None:
+    # Replace the fingerprints of (project id, fingerprints) pairs
+    insert = """
+        INSERT INTO project_fingerprints (project_id, kind, value)
+        SELECT :id, :kind, :value
+        -- The project may have been deleted in the meantime
+        WHERE EXISTS (SELECT 1 FROM projects WHERE id = :id);
+        """
+    with db.transaction():
+        for project_id, fingerprints in items:
+            db.cur.execute(
+                "DELETE FROM project_fingerprints WHERE project_id = ?;",
+                (project_id,),
+            )
+            db.cur.executemany(
+                insert,
+                (
+                    {"id": project_id, "kind": kind, "value": value}
+                    for kind, value in fingerprints.items()
+                ),
+            )
+
+
+def lookup(db: DB, kind: str, values: Iterable[str]) -> Dict[str, List[int]]:
+    # {value: ids of the projects that have it} of the values of one kind
+    # that belong to any project
+    values = list(values)
+    result: Dict[str, List[int]] = {}
+    for i in range(0, len(values), MAX_VARIABLES):
+        chunk = values[i : i + MAX_VARIABLES]
+        q = f"""
+            SELECT value, project_id FROM project_fingerprints
+            WHERE kind = ? AND value IN ({", ".join("?" * len(chunk))});
+            """
+        db.cur.execute(q, (kind, *chunk))
+        for value, project_id in db.cur.fetchall():
+            result.setdefault(value, []).append(project_id)
+    return result
+
+
+# RELOCATION
+
+
+def candidates(
+    root: str,
+    registered: Set[str],
+    max_depth: int = DEFAULT_DEPTH,
+    git_timeout: float = DEFAULT_GIT_TIMEOUT,
+    stop: Optional[threading.Event] = None,
+) -> List[Tuple[str, Fingerprints]]:
+    # (path, fingerprints) of the project roots under root that aren't
+    # registered, the only places a missing project can have gone to
+    paths = [
+        path
+        for path in scan_projects(root, max_depth=max_depth, stop=stop)
+        if path not in registered
+    ]
+    return compute_many(paths, git_timeout)
+
+
+@traced()
+def match(
+    db: DB,
+    missing: Dict[int, str],
+    found: List[Tuple[str, Fingerprints]],
+) -> Dict[str, str]:
+    # {old path: new path} of the missing projects, {id: path}, that one of
+    # the found candidates is identified as, one kind at a time. A pair
+    # that disagrees on a distinct kind both have a value of is no match:
+    # a directory given the inode of a deleted one, or a fork with the
+    # same package name, is another project.
+    moves = {}
+    taken = set()
+    known = get_many(db, missing)
+    candidates = dict(found)
+    for kind in MATCH_ORDER:
+        paths: Dict[str, List[str]] = {}
+        for path, fingerprints in found:
+            if path not in taken and kind in fingerprints:
+                paths.setdefault(fingerprints[kind], []).append(path)
+        for value, owners in lookup(db, kind, paths).items():
+            owners = [
+                project_id
+                for project_id in owners
+                if project_id in missing and missing[project_id] not in moves
+            ]
+            if len(owners) != 1 or len(paths[value]) != 1:
+                continue
+            path = paths[value][0]
+            if contradicts(known.get(owners[0], {}), candidates[path]):
+                continue
+            moves[missing[owners[0]]] = path
+            taken.add(path)
+    return moves
+
+
+def contradicts(a: Fingerprints, b: Fingerprints) -> bool:
+    return any(
+        kind in a and kind in b and a[kind] != b[kind]
+        for kind in DISTINCT_KINDS
+    )
+
+
+def relocate(
+    db: DB,
+    moves: Dict[str, str],
+    found: List[Tuple[str, Fingerprints]],
+) -> List[Project]:
+    # Apply the moves found by match(), keeping the projects' history, and
+    # store the fingerprints of their new directories
+    fingerprints = dict(found)
+    with db.transaction():
+        projects = Project.relocate_many(db, moves)
+        save(
+            db,
+            (
+                (project.id, fingerprints[project.path])
+                for project in projects
+                if project.path in fingerprints
+            ),
+        )
+    return projects
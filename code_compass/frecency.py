@@ -0,0 +1,85 @@
+import datetime
+import math
+from typing import Iterable, Optional
+
+from code_compass.db import DB
+from code_compass.tracing import traced
+
+# Frecency is the number of launches of a project, each one decaying by
+# half every HALF_LIFE_DAYS.
+#
+# Instead of the decayed value, the score stored in projects.frecency is
+# log(sum(2 ** (t / HALF_LIFE_DAYS))) over the launch times t (in days
+# since the epoch). It doesn't depend on the current time, so ordering by
+# the column is ordering by frecency, and a launch updates it in place with
+# logaddexp instead of a pass over the whole access log.
+
+HALF_LIFE_DAYS = 14.0
+EPOCH = datetime.datetime(1970, 1, 1)
+
+# Launches older than this are removed from the log by compact()
+LOG_RETENTION = datetime.timedelta(days=180)
+COMPACT_INTERVAL = datetime.timedelta(days=1)
+
+
+def launch_score(when: datetime.datetime) -> float:
+    days = (when - EPOCH).total_seconds() / 86400
+    return days * math.log(2) / HALF_LIFE_DAYS
+
+
+def current_frecency(score: float, now: Optional[datetime.datetime] = None):
+    # Decayed launch count as of now
+    return math.exp(score - launch_score(now or datetime.datetime.now()))
+
+
+class AccessLog:
+    # Append-only log of project launches
+
+    @classmethod
+    @traced()
+    def record(cls, db: DB, projects: Iterable, when=None) -> None:
+        when = when or datetime.datetime.now()
+        score = launch_score(when)
+        q_log = """
+            INSERT INTO access_log (project_id, opened_at) VALUES (?, ?);
+            """
+        q_score = """
+            UPDATE projects SET frecency = logaddexp(frecency, ?)
+            WHERE id = ?
+            RETURNING frecency;
+            """
+        with db.transaction():
+            for project in projects:
+                db.cur.execute(q_log, (project.id, when))
+                db.cur.execute(q_score, (score, project.id))
+                project.frecency = db.cur.fetchone()[0]
+            cls.compact_if_due(db, when)
+
+    @classmethod
+    def compact_if_due(cls, db: DB, now: datetime.datetime) -> None:
+        q = """
+            SELECT value FROM meta WHERE key = 'access_log_compacted';
+            """
+        db.cur.execute(q)
+        data = db.cur.fetchone()
+        if data and now - datetime.datetime.fromisoformat(data[0]) < (
+            COMPACT_INTERVAL
+        ):
+            return
+        cls.compact(db, now - LOG_RETENTION)
+
+        q = """
+            INSERT INTO meta (key, value) VALUES ('access_log_compacted', ?)
+            ON CONFLICT (key) DO UPDATE SET value = excluded.value;
+            """
+        db.cur.execute(q, (now.isoformat(),))
+
+    @classmethod
+    def compact(cls, db: DB, before: datetime.datetime) -> None:
+        # Old launches only matter through the scores, which already
+        # include them
+        q = """
+            DELETE FROM access_log WHERE opened_at < ?;
+            """
+        db.cur.execute(q, (before,))
+        db.commit()
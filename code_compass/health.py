@@ -0,0 +1,222 @@
+import os
+import queue
+import stat
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+# Whether project paths still exist and can be opened. On a stale NFS or
+# SSHFS mount a single stat() can block for minutes, so paths are only
+# touched on the threads of a PathHealthService and a check is given up on
+# after a timeout, never on the GUI thread.
+
+OK = "ok"
+MISSING = "missing"
+# Exists as far as we can tell but can't be opened: no permission, a
+# disconnected mount, an I/O error
+UNREACHABLE = "unreachable"
+TIMED_OUT = "timed out"
+
+DEFAULT_TIMEOUT = 2.0
+DEFAULT_TTL = 300.0
+DEFAULT_WORKERS = 16
+DEFAULT_MAX_THREADS = 64
+# Seconds a pool thread waits for a check before it ends
+IDLE_TIMEOUT = 10.0
+
+
+def check_path(path: str) -> str:
+    try:
+        info = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return MISSING
+    except OSError:
+        return UNREACHABLE
+    if not stat.S_ISDIR(info.st_mode):
+        return MISSING
+    if not os.access(path, os.R_OK | os.X_OK):
+        return UNREACHABLE
+    return OK
+
+
+class PathHealthService:
+    # Cached health of project paths, a result is reused for ttl seconds.
+    #
+    # Checks run on a pool of daemon threads, at most max_threads of them,
+    # started when needed and ended after IDLE_TIMEOUT seconds without
+    # work. A refresh runs up to workers checks at a time. One that takes
+    # longer than timeout is reported as TIMED_OUT and stops counting
+    # towards workers, so a hung mount doesn't hold up the other paths, but
+    # it keeps its thread (a blocked system call can't be interrupted).
+    # Until it finishes, the path isn't checked again and its late result
+    # replaces TIMED_OUT in the cache. Once every thread is stuck on a dead
+    # mount, further checks wait for one and time out meanwhile. Being
+    # daemons, the threads don't keep the process from exiting.
+    #
+    # check is called with a path and returns its status, check_path by
+    # default. Passing a stand-in makes slow and hung paths easy to
+    # simulate.
+
+    def __init__(
+        self,
+        timeout: float = DEFAULT_TIMEOUT,
+        ttl: float = DEFAULT_TTL,
+        workers: int = DEFAULT_WORKERS,
+        check: Callable[[str], str] = check_path,
+        max_threads: int = DEFAULT_MAX_THREADS,
+    ):
+        self.timeout = timeout
+        self.ttl = ttl
+        self.workers = workers
+        self.check = check
+        self.max_threads = max_threads
+        # path -> (time of the check, status)
+        self.cache: Dict[str, Tuple[float, str]] = {}
+        # Checks in progress: path -> (start time, callbacks of the result)
+        self.running: Dict[str, Tuple[float, List[Callable]]] = {}
+        self.lock = threading.Lock()
+        # Paths of the running checks no thread has taken yet, and the
+        # threads of the pool, all of them and the ones waiting for work
+        self.pending: Deque[str] = deque()
+        self.threads = 0
+        self.idle = 0
+        self.work = threading.Condition(self.lock)
+
+    def cached(self, path: str) -> Optional[str]:
+        with self.lock:
+            entry = self.cache.get(path)
+        return entry[1] if entry else None
+
+    def is_fresh(self, path: str) -> bool:
+        with self.lock:
+            entry = self.cache.get(path)
+        return entry is not None and time.monotonic() - entry[0] < self.ttl
+
+    def record(self, statuses: Dict[str, str]) -> None:
+        # Results learned elsewhere, e.g. from the directory watcher
+        now = time.monotonic()
+        with self.lock:
+            for path, status in statuses.items():
+                self.cache[path] = (now, status)
+
+    def invalidate(self, paths: Iterable[str]) -> None:
+        with self.lock:
+            for path in paths:
+                self.cache.pop(path, None)
+
+    def refresh(
+        self,
+        paths: Iterable[str],
+        on_result: Optional[Callable[[str, str], None]] = None,
+        stop: Optional[threading.Event] = None,
+    ) -> Dict[str, str]:
+        # Status of paths, checking the ones without a fresh result. Blocks
+        # until every path is known or timed out, call it on a worker
+        # thread. on_result is called as soon as each one is known, in the
+        # order they finish. Setting stop skips the checks that have not
+        # started yet.
+        results = {}
+        finished = queue.SimpleQueue()
+
+        def report(path: str, status: str) -> None:
+            results[path] = status
+            if on_result is not None:
+                on_result(path, status)
+
+        waiting = []
+        for path in dict.fromkeys(paths):
+            if self.is_fresh(path):
+                report(path, self.cached(path))
+            else:
+                waiting.append(path)
+        waiting.reverse()
+
+        # path -> start time of the checks this call waits for
+        active: Dict[str, float] = {}
+        while waiting or active:
+            stopped = stop is not None and stop.is_set()
+            while waiting and len(active) < self.workers and not stopped:
+                path = waiting.pop()
+                active[path] = self._start(path, finished.put)
+            if not active:
+                break
+
+            deadline = min(active.values()) + self.timeout
+            try:
+                path, status = finished.get(
+                    timeout=max(deadline - time.monotonic(), 0)
+                )
+            except queue.Empty:
+                pass
+            else:
+                if active.pop(path, None) is not None:
+                    report(path, status)
+
+            now = time.monotonic()
+            for path, started in list(active.items()):
+                if now - started < self.timeout:
+                    continue
+                del active[path]
+                with self.lock:
+                    if path in self.running:
+                        self.cache[path] = (now, TIMED_OUT)
+                report(path, TIMED_OUT)
+        return results
+
+    def _start(self, path: str, callback: Callable) -> float:
+        # Start checking path, or follow the check that is already running
+        with self.lock:
+            if path in self.running:
+                started, callbacks = self.running[path]
+                callbacks.append(callback)
+                return started
+            started = time.monotonic()
+            self.running[path] = (started, [callback])
+            self.pending.append(path)
+            if len(self.pending) <= self.idle:
+                self.work.notify()
+                return started
+            if self.threads >= self.max_threads:
+                return started
+            self.threads += 1
+        threading.Thread(target=self._work, daemon=True).start()
+        return started
+
+    def _work(self) -> None:
+        # The thread leaves the pool under the lock when it runs out of
+        # work, so that _start() never counts on it afterwards, or in the
+        # finally if anything else ends it
+        counted = True
+        try:
+            while True:
+                with self.lock:
+                    if not self.pending:
+                        self.idle += 1
+                        self.work.wait(IDLE_TIMEOUT)
+                        self.idle -= 1
+                    if not self.pending:
+                        self.threads -= 1
+                        counted = False
+                        return
+                    path = self.pending.popleft()
+                self._check(path)
+        finally:
+            if counted:
+                with self.lock:
+                    self.threads -= 1
+
+    def _check(self, path: str) -> None:
+        # A check that fails reports the path as UNREACHABLE, like an
+        # OSError of check_path(), instead of ending the thread
+        status = UNREACHABLE
+        try:
+            status = self.check(path)
+        except Exception:
+            pass
+        finally:
+            with self.lock:
+                self.cache[path] = (time.monotonic(), status)
+                _, callbacks = self.running.pop(path)
+            for callback in callbacks:
+                callback((path, status))
@@ -0,0 +1,44 @@
+from typing import Any, Dict, Hashable, Iterator, Set
+
+# Identity map of a DB session: the Category and Project instances loaded
+# or saved through a connection, by kind and by each of their keys (id,
+# name, path). A lookup of a key it holds doesn't need SQLite, and loading
+# a row that is already mapped updates and returns the mapped instance, so
+# one row is one object within the session.
+#
+# It is kept coherent by the model methods, which update it whenever they
+# write. Changes made by other processes aren't seen, clear() it when
+# they may have happened.
+
+
+class IdentityMap:
+    def __init__(self):
+        self.objects: Dict[str, Dict[Hashable, Any]] = {}
+        # Kinds whose every row is mapped, e.g. "category" after
+        # Category.all
+        self.complete: Set[str] = set()
+
+    def get(self, kind: str, key: Hashable):
+        return self.objects.get(kind, {}).get(key)
+
+    def add(self, kind: str, obj, *keys: Hashable) -> None:
+        objects = self.objects.setdefault(kind, {})
+        for key in keys:
+            objects[key] = obj
+
+    def discard(self, kind: str, *keys: Hashable) -> None:
+        objects = self.objects.get(kind, {})
+        for key in keys:
+            objects.pop(key, None)
+
+    def values(self, kind: str) -> Iterator:
+        # Each mapped instance once
+        seen = set()
+        for obj in self.objects.get(kind, {}).values():
+            if id(obj) not in seen:
+                seen.add(id(obj))
+                yield obj
+
+    def clear(self) -> None:
+        self.objects.clear()
+        self.complete.clear()
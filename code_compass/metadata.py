@@ -0,0 +1,188 @@
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from code_compass import pyproject
+from code_compass.db import DB
+from code_compass.project import MAX_VARIABLES
+from code_compass.scan import IGNORED
+
+# Extra project details shown in the tables. They are computed on the
+# thread pool (see workers.EnrichTask) and stored with the mtime of the
+# project directory, a project is only looked at again once it changes.
+
+LANGUAGES = {
+    ".py": "Python",
+    ".pyx": "Python",
+    ".js": "JavaScript",
+    ".jsx": "JavaScript",
+    ".mjs": "JavaScript",
+    ".ts": "TypeScript",
+    ".tsx": "TypeScript",
+    ".go": "Go",
+    ".rs": "Rust",
+    ".java": "Java",
+    ".kt": "Kotlin",
+    ".c": "C",
+    ".h": "C",
+    ".cc": "C++",
+    ".cpp": "C++",
+    ".hpp": "C++",
+    ".cs": "C#",
+    ".rb": "Ruby",
+    ".php": "PHP",
+    ".swift": "Swift",
+    ".scala": "Scala",
+    ".sh": "Shell",
+    ".lua": "Lua",
+    ".dart": "Dart",
+    ".ex": "Elixir",
+    ".hs": "Haskell",
+}
+
+VENV_DIRS = (".venv", "venv", "env")
+
+REQUIRES_PYTHON = re.compile(
+    r"""^\s*(?:requires-python|python)\s*=\s*["']([^"']+)["']""",
+    re.MULTILINE,
+)
+
+
+@dataclass
+class ProjectMetadata:
+    language: Optional[str] = None
+    size: Optional[int] = None
+    has_venv: Optional[bool] = None
+    python_version: Optional[str] = None
+
+    @classmethod
+    def get_many(
+        cls, db: DB, project_ids: Iterable[int]
+    ) -> Dict[int, Tuple[int, "ProjectMetadata"]]:
+        # {project id: (directory mtime, metadata)} of the projects that
+        # were enriched before
+        project_ids = list(project_ids)
+        result = {}
+        for i in range(0, len(project_ids), MAX_VARIABLES):
+            chunk = project_ids[i : i + MAX_VARIABLES]
+            q = f"""
+                SELECT project_id, mtime_ns, language, size, has_venv,
+                    python_version
+                FROM project_metadata
+                WHERE project_id IN ({", ".join("?" * len(chunk))});
+                """
+            db.cur.execute(q, chunk)
+            for row in db.cur.fetchall():
+                result[row[0]] = (row[1], cls(*row[2:]))
+        return result
+
+    @classmethod
+    def save_many(
+        cls, db: DB, items: Iterable[Tuple[int, int, "ProjectMetadata"]]
+    ) -> None:
+        # Store (project id, directory mtime, metadata) triples
+        q = """
+            INSERT INTO project_metadata (
+                project_id, mtime_ns, language, size, has_venv, python_version
+            )
+            SELECT :id, :mtime_ns, :language, :size, :has_venv, :python
+            -- The project may have been deleted in the meantime
+            WHERE EXISTS (SELECT 1 FROM projects WHERE id = :id)
+            ON CONFLICT (project_id) DO UPDATE SET
+                mtime_ns = excluded.mtime_ns,
+                language = excluded.language,
+                size = excluded.size,
+                has_venv = excluded.has_venv,
+                python_version = excluded.python_version;
+            """
+        with db.transaction():
+            db.cur.executemany(
+                q,
+                (
+                    {
+                        "id": project_id,
+                        "mtime_ns": mtime_ns,
+                        "language": metadata.language,
+                        "size": metadata.size,
+                        "has_venv": metadata.has_venv,
+                        "python": metadata.python_version,
+                    }
+                    for project_id, mtime_ns, metadata in items
+                ),
+            )
+
+
+def directory_mtime(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def compute(path: str) -> ProjectMetadata:
+    # Walks the whole project once. The size counts everything on disk,
+    # the language only the sources outside of ignored directories.
+    size = 0
+    language_bytes: Dict[str, int] = {}
+    stack: List[Tuple[str, bool]] = [(path, True)]
+    while stack:
+        directory, counted = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(
+                                (
+                                    entry.path,
+                                    counted
+                                    and entry.name not in IGNORED
+                                    and not entry.name.startswith("."),
+                                )
+                            )
+                            continue
+                        if not entry.is_file(follow_symlinks=False):
+                            continue
+                        stat = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    size += stat.st_blocks * 512
+                    if counted:
+                        language = LANGUAGES.get(
+                            os.path.splitext(entry.name)[1].lower()
+                        )
+                        if language:
+                            language_bytes[language] = (
+                                language_bytes.get(language, 0) + stat.st_size
+                            )
+        except OSError:
+            continue
+
+    return ProjectMetadata(
+        language=max(language_bytes, key=language_bytes.get, default=None),
+        size=size,
+        has_venv=any(
+            os.path.isfile(os.path.join(path, name, "pyvenv.cfg"))
+            for name in VENV_DIRS
+        ),
+        python_version=python_version(path),
+    )
+
+
+def python_version(path: str) -> Optional[str]:
+    # requires-python of the project table, or the python dependency of
+    # a poetry project
+    try:
+        with open(os.path.join(path, "pyproject.toml"), "rb") as f:
+            content = f.read().decode(errors="replace")
+    except OSError:
+        return None
+    return pyproject.field(
+        content,
+        (
+            ("project", "requires-python"),
+            ("tool", "poetry", "dependencies", "python"),
+        ),
+        REQUIRES_PYTHON,
+    )
@@ -0,0 +1,259 @@
+import math
+import sqlite3
+
+# Schema migrations. The position of a migration in MIGRATIONS is the
+# schema version it upgrades to, the current version of a database is
+# stored in PRAGMA user_version. Existing data.db files are upgraded in
+# place when they are opened.
+
+
+def initial_schema(con: sqlite3.Connection) -> None:
+    # The tables as they were created before migrations existed
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS
+            categories (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name VARCHAR UNIQUE,
+                is_active BOOLEAN DEFAULT 0
+            );
+        """
+    )
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS
+            projects (
+                name VARCHAR,
+                path VARCHAR UNIQUE,
+                last_opened TIMESTAMP,
+                category_id INTEGER
+            );
+        """
+    )
+
+
+def project_ids_and_indexes(con: sqlite3.Connection) -> None:
+    # Integer primary key, a cascading foreign key to the category and
+    # indexes for the per category and recency queries. SQLite can't add
+    # constraints to an existing table, so it is rebuilt. Projects of
+    # categories that no longer exist were never shown and are dropped.
+    con.execute(
+        """
+        CREATE TABLE
+            projects_new (
+                id INTEGER PRIMARY KEY,
+                name VARCHAR NOT NULL,
+                path VARCHAR NOT NULL UNIQUE,
+                last_opened TIMESTAMP,
+                category_id INTEGER NOT NULL
+                    REFERENCES categories (id) ON DELETE CASCADE
+            );
+        """
+    )
+    con.execute(
+        """
+        INSERT INTO projects_new (name, path, last_opened, category_id)
+        SELECT name, path, last_opened, category_id FROM projects
+        WHERE path IS NOT NULL
+            AND category_id IN (SELECT id FROM categories);
+        """
+    )
+    con.execute("DROP TABLE projects;")
+    con.execute("ALTER TABLE projects_new RENAME TO projects;")
+    con.execute(
+        """
+        CREATE INDEX projects_category_name
+        ON projects (category_id, name);
+        """
+    )
+    con.execute(
+        """
+        CREATE INDEX projects_last_opened
+        ON projects (last_opened);
+        """
+    )
+
+
+def access_log_and_frecency(con: sqlite3.Connection) -> None:
+    # Launch history and the frecency score kept from it, see frecency.py.
+    # Existing projects start with a single launch at last_opened, scored
+    # like frecency.launch_score() does.
+    from code_compass.frecency import EPOCH, HALF_LIFE_DAYS
+
+    con.execute(
+        """
+        ALTER TABLE projects
+        ADD COLUMN frecency REAL NOT NULL DEFAULT 0;
+        """
+    )
+    con.execute(
+        """
+        UPDATE projects
+        SET frecency = (julianday(last_opened) - julianday(?)) * ?
+        WHERE last_opened IS NOT NULL;
+        """,
+        (EPOCH.isoformat(" "), math.log(2) / HALF_LIFE_DAYS),
+    )
+    con.execute(
+        """
+        CREATE INDEX projects_frecency
+        ON projects (frecency);
+        """
+    )
+    con.execute(
+        """
+        CREATE TABLE
+            access_log (
+                id INTEGER PRIMARY KEY,
+                project_id INTEGER NOT NULL
+                    REFERENCES projects (id) ON DELETE CASCADE,
+                opened_at TIMESTAMP NOT NULL
+            );
+        """
+    )
+    con.execute(
+        """
+        CREATE INDEX access_log_project
+        ON access_log (project_id, opened_at);
+        """
+    )
+    con.execute(
+        """
+        CREATE INDEX access_log_opened_at
+        ON access_log (opened_at);
+        """
+    )
+    con.execute(
+        """
+        CREATE TABLE
+            meta (
+                key VARCHAR PRIMARY KEY,
+                value VARCHAR
+            );
+        """
+    )
+
+
+def project_metadata(con: sqlite3.Connection) -> None:
+    # Details computed in the background, see metadata.py
+    con.execute(
+        """
+        CREATE TABLE
+            project_metadata (
+                project_id INTEGER PRIMARY KEY
+                    REFERENCES projects (id) ON DELETE CASCADE,
+                mtime_ns INTEGER NOT NULL,
+                language VARCHAR,
+                size INTEGER,
+                has_venv BOOLEAN,
+                python_version VARCHAR
+            );
+        """
+    )
+
+
+def project_contents(con: sqlite3.Connection) -> None:
+    # Full-text index of READMEs, descriptions and module docstrings, see
+    # contents.py. content_files has a row per indexed file with its stamp,
+    # its id is the rowid of the file's text in content_index.
+    con.execute(
+        """
+        CREATE TABLE
+            content_files (
+                id INTEGER PRIMARY KEY,
+                project_id INTEGER NOT NULL
+                    REFERENCES projects (id) ON DELETE CASCADE,
+                file VARCHAR NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                UNIQUE (project_id, file)
+            );
+        """
+    )
+    con.execute(
+        """
+        CREATE VIRTUAL TABLE
+            content_index USING fts5 (
+                text,
+                tokenize = 'unicode61 remove_diacritics 2'
+            );
+        """
+    )
+    # Also fires for the rows deleted by the cascade of a project
+    con.execute(
+        """
+        CREATE TRIGGER content_files_delete
+        AFTER DELETE ON content_files
+        BEGIN
+            DELETE FROM content_index WHERE rowid = old.id;
+        END;
+        """
+    )
+
+
+def project_fingerprints(con: sqlite3.Connection) -> None:
+    # What identifies a project wherever its directory is, see
+    # fingerprints.py. A project has one value of each kind, the index
+    # finds the projects with a given value.
+    con.execute(
+        """
+        CREATE TABLE
+            project_fingerprints (
+                project_id INTEGER NOT NULL
+                    REFERENCES projects (id) ON DELETE CASCADE,
+                kind VARCHAR NOT NULL,
+                value VARCHAR NOT NULL,
+                PRIMARY KEY (project_id, kind)
+            ) WITHOUT ROWID;
+        """
+    )
+    con.execute(
+        """
+        CREATE INDEX project_fingerprints_value
+        ON project_fingerprints (kind, value);
+        """
+    )
+
+
+def dated_projects(con: sqlite3.Connection) -> None:
+    # Imports stored projects without last_opened as NULL, they count as
+    # opened now like the ones imported since. Local time, as launches are
+    # recorded in.
+    con.execute(
+        """
+        UPDATE projects SET last_opened = datetime('now', 'localtime')
+        WHERE last_opened IS NULL;
+        """
+    )
+
+
+MIGRATIONS = [
+    initial_schema,
+    project_ids_and_indexes,
+    access_log_and_frecency,
+    project_metadata,
+    project_contents,
+    project_fingerprints,
+    dated_projects,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_version(con: sqlite3.Connection) -> int:
+    return con.execute("PRAGMA user_version;").fetchone()[0]
+
+
+def migrate(con: sqlite3.Connection) -> None:
+    # Each migration runs in its own transaction together with the version
+    # bump, a failed one leaves the database at the previous version
+    version = get_version(con)
+    for number in range(version, SCHEMA_VERSION):
+        con.execute("BEGIN;")
+        try:
+            MIGRATIONS[number](con)
+            con.execute(f"PRAGMA user_version = {number + 1};")
+        except BaseException:
+            con.rollback()
+            raise
+        con.commit()
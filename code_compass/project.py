@@ -1,9 +1,16 @@
 import datetime
-from dataclasses import dataclass
-from typing import List
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
 
+from code_compass.catalog import ORDER_BY, find_clause
 from code_compass.category import Category
 from code_compass.db import DB
+from code_compass.events import DELETED, INSERTED, MOVED, UPDATED
+from code_compass.tracing import traced
+
+# Stay below SQLite's limit of bound parameters per statement
+MAX_VARIABLES = 900
 
 
 @dataclass
@@ -12,10 +19,63 @@ class Project:
     path: str
     last_opened: datetime.datetime
     category: Category
+    id: Optional[int] = None
+    # Log-space frecency score, see frecency.py
+    frecency: float = 0.0
+
+    # Projects are always loaded together with their category in one query
+    SELECT_WITH_CATEGORY = """
+        SELECT p.name, p.path, p.last_opened, c.id, c.name, c.is_active, p.id,
+            p.frecency
+        FROM projects p
+        JOIN categories c ON c.id = p.category_id
+        """
+
+    # Insert or update by path in one statement
+    UPSERT = """
+        INSERT INTO projects (name, path, last_opened, category_id)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (path) DO UPDATE SET
+            name = excluded.name,
+            last_opened = excluded.last_opened,
+            category_id = excluded.category_id
+        RETURNING id, frecency;
+        """
+
+    # IDENTITY MAP
+
+    def remember(self, db: DB) -> None:
+        mapped = db.identity.get("project", ("id", self.id))
+        if mapped is not None and mapped.path != self.path:
+            db.identity.discard("project", ("path", mapped.path))
+        keys = ("id", self.id), ("path", self.path)
+        db.identity.add("project", self, *keys)
+
+    def forget(self, db: DB) -> None:
+        mapped = db.identity.get("project", ("path", self.path))
+        if mapped is not None:
+            db.identity.discard("project", ("id", mapped.id))
+        db.identity.discard("project", ("id", self.id), ("path", self.path))
+
+    @classmethod
+    def load(cls, db: DB, row) -> "Project":
+        # The mapped instance of a projects/categories JOIN row, updated
+        # from it
+        project = db.identity.get("project", ("id", row[6]))
+        if project is None:
+            project = cls.from_row(row)
+        project.name = row[0]
+        project.path = row[1]
+        project.last_opened = row[2]
+        project.category = Category.load(db, row[3], row[4], row[5])
+        project.frecency = row[7]
+        project.remember(db)
+        return project
 
     # CREATE PROJECT
 
     @classmethod
+    @traced()
     def create(
         cls, db: DB, name: str, path: str, category: Category
     ) -> "Project":
@@ -23,117 +83,313 @@ class Project:
             INSERT INTO projects (name, path, last_opened, category_id)
             VALUES (?, ?, ?, ?);
             """
-        db.cur.execute(q, (name, path, datetime.datetime.now(), category.id))
-        db.con.commit()
-
-        return cls(
+        project = cls(
             name=name,
             path=path,
             last_opened=datetime.datetime.now(),
             category=category,
         )
+        db.cur.execute(q, (name, path, project.last_opened, category.id))
+        project.id = db.cur.lastrowid
+        db.commit()
+        project.remember(db)
+        db.notify(INSERTED, project)
 
-    def save(self, db: DB) -> None:
-        # Insert if project doesn't exist or update if it does
+        return project
 
-        if self.category.id is None:
-            category = Category.get_by_name(db, self.category.name)
-            if category:
-                self.category = category
-            else:
-                self.category.save(db)
+    @classmethod
+    @traced()
+    def insert_many(
+        cls, db: DB, paths: Iterable[str], category: Category
+    ) -> List["Project"]:
+        # Add many projects in one transaction, paths that are already
+        # registered are left untouched. Returns the added projects.
+        paths = list(dict.fromkeys(paths))
+        existing = set()
+        for i in range(0, len(paths), MAX_VARIABLES):
+            chunk = paths[i : i + MAX_VARIABLES]
+            q = f"""
+                SELECT path FROM projects
+                WHERE path IN ({", ".join("?" * len(chunk))});
+                """
+            db.cur.execute(q, chunk)
+            existing.update(row[0] for row in db.cur.fetchall())
+
+        now = datetime.datetime.now()
+        projects = [
+            cls(
+                name=Path(path).name,
+                path=path,
+                last_opened=now,
+                category=category,
+            )
+            for path in paths
+            if path not in existing
+        ]
+
+        q = """
+            SELECT COALESCE(MAX(id), 0) FROM projects;
+            """
+        db.cur.execute(q)
+        max_id = db.cur.fetchone()[0]
 
-        q_find = """
-            SELECT * FROM projects WHERE path = ?;
+        q = """
+            INSERT INTO projects (name, path, last_opened, category_id)
+            VALUES (?, ?, ?, ?);
             """
-        db.cur.execute(q_find, (self.path,))
-        data = db.cur.fetchone()
-        if data:
-            q = """
-                UPDATE projects SET name = ?, last_opened = ?, category_id = ?
-                WHERE path = ?;
-                """
-            db.cur.execute(
-                q,
-                (
-                    self.name,
-                    datetime.datetime.now(),
-                    self.category.id,
-                    self.path,
-                ),
+        db.cur.executemany(
+            q,
+            (
+                (project.name, project.path, now, category.id)
+                for project in projects
+            ),
+        )
+        # New rows get ids above the previous maximum
+        q = """
+            SELECT path, id FROM projects WHERE id > ?;
+            """
+        db.cur.execute(q, (max_id,))
+        ids = dict(db.cur.fetchall())
+        for project in projects:
+            project.id = ids[project.path]
+            project.remember(db)
+        db.commit()
+        for project in projects:
+            db.notify(INSERTED, project)
+
+        return projects
+
+    @traced()
+    def save(self, db: DB) -> None:
+        # Insert if project doesn't exist or update if it does
+        with db.transaction():
+            if self.category.id is None:
+                self.category = Category.resolve(db, self.category.name)
+
+            # The upsert doesn't tell whether it inserted. Loaded and mapped
+            # projects are known to exist, listeners treat an unknown id
+            # as new either way.
+            exists = self.id is not None or (
+                db.identity.get("project", ("path", self.path)) is not None
             )
-        else:
-            q = """
-                INSERT INTO projects (name, path, last_opened, category_id)
-                VALUES (?, ?, ?, ?);
-                """
 
+            self.last_opened = datetime.datetime.now()
             db.cur.execute(
-                q,
-                (
-                    self.name,
-                    self.path,
-                    datetime.datetime.now(),
-                    self.category.id,
-                ),
+                self.UPSERT,
+                (self.name, self.path, self.last_opened, self.category.id),
             )
-        db.con.commit()
+            self.id, self.frecency = db.cur.fetchone()
+            # A detached copy of a mapped project updates the mapped
+            # instance, the one the rest of the session holds
+            saved = db.identity.get("project", ("id", self.id))
+            if saved is None:
+                saved = self
+            elif saved is not self:
+                saved.name = self.name
+                saved.path = self.path
+                saved.last_opened = self.last_opened
+                saved.category = self.category
+                saved.frecency = self.frecency
+            saved.remember(db)
+            db.notify(UPDATED if exists else INSERTED, saved)
 
     @classmethod
+    @traced()
+    def save_many(cls, db: DB, projects: Iterable["Project"]) -> None:
+        # Save several projects with a single commit, categories given by
+        # name are looked up once per name
+        categories = {}
+        with db.transaction():
+            for project in projects:
+                if project.category.id is None:
+                    name = project.category.name
+                    if name not in categories:
+                        categories[name] = Category.resolve(db, name)
+                    project.category = categories[name]
+                project.save(db)
+
+    @classmethod
+    def from_row(cls, row) -> "Project":
+        # Build a project from a row of the projects/categories JOIN
+        return cls(
+            name=row[0],
+            path=row[1],
+            last_opened=row[2],
+            category=Category(id=row[3], name=row[4], is_active=row[5]),
+            id=row[6],
+            frecency=row[7],
+        )
+
+    @classmethod
+    @traced()
     def get(cls, db: DB, path: str) -> "Project":
-        q = """
-            SELECT * FROM projects WHERE path = ?;
+        project = db.identity.get("project", ("path", path))
+        if project is not None:
+            return project
+        q = f"""
+            {cls.SELECT_WITH_CATEGORY}
+            WHERE p.path = ?;
             """
         db.cur.execute(q, (path,))
         data = db.cur.fetchone()
-        return cls(
-            name=data[0],
-            path=data[1],
-            last_opened=data[2],
-            category=Category.get(db, data[3]),
-        )
+        return cls.load(db, data)
 
     @classmethod
-    def all(cls, db: DB) -> List["Project"]:
-        q = """
-            SELECT * FROM projects ORDER BY name ASC;
+    @traced()
+    def get_many(cls, db: DB, ids: Iterable[int]) -> Dict[int, "Project"]:
+        # Projects by id, mapped ones are not queried again. Ids of deleted
+        # projects are left out.
+        result = {}
+        missing = []
+        for project_id in dict.fromkeys(ids):
+            project = db.identity.get("project", ("id", project_id))
+            if project is None:
+                missing.append(project_id)
+            else:
+                result[project_id] = project
+        for i in range(0, len(missing), MAX_VARIABLES):
+            chunk = missing[i : i + MAX_VARIABLES]
+            q = f"""
+                {cls.SELECT_WITH_CATEGORY}
+                WHERE p.id IN ({", ".join("?" * len(chunk))});
+                """
+            db.cur.execute(q, chunk)
+            for row in db.cur.fetchall():
+                result[row[6]] = cls.load(db, row)
+        return result
+
+    @classmethod
+    @traced()
+    def all(cls, db: DB, order_by: str = "name") -> List["Project"]:
+        q = f"""
+            {cls.SELECT_WITH_CATEGORY}
+            ORDER BY {ORDER_BY[order_by]};
             """
         db.cur.execute(q)
-        data = db.cur.fetchall()
-        res = []
-        for i in data:
-            res.append(
-                cls(
-                    name=i[0],
-                    path=i[1],
-                    last_opened=i[2],
-                    category=Category.get(db, i[3]),
-                )
-            )
-        return res
+        return [cls.load(db, i) for i in db.cur.fetchall()]
 
     @classmethod
-    def all_by_category(cls, db: DB, category: Category) -> List["Project"]:
-        q = """
-            SELECT * FROM projects WHERE category_id = ? ORDER BY name ASC;
+    @traced()
+    def all_by_category(
+        cls, db: DB, category: Category, order_by: str = "name"
+    ) -> List["Project"]:
+        q = f"""
+            {cls.SELECT_WITH_CATEGORY}
+            WHERE p.category_id = ? ORDER BY {ORDER_BY[order_by]};
             """
         db.cur.execute(q, (category.id,))
-        data = db.cur.fetchall()
-        res = []
-        for i in data:
-            res.append(
-                cls(
-                    name=i[0],
-                    path=i[1],
-                    last_opened=i[2],
-                    category=Category.get(db, i[3]),
-                )
-            )
-        return res
+        return [cls.load(db, i) for i in db.cur.fetchall()]
+
+    @classmethod
+    @traced()
+    def ids_and_paths(cls, db: DB) -> List[Tuple[int, str]]:
+        db.cur.execute("SELECT id, path FROM projects;")
+        return db.cur.fetchall()
+
+    @classmethod
+    @traced()
+    def find(cls, db: DB, query: str, limit: int = 20) -> List["Project"]:
+        # Projects whose name or path contains the query, ranked as
+        # catalog.find_clause() says
+        clause, params = find_clause(query, limit)
+        db.cur.execute(f"{cls.SELECT_WITH_CATEGORY} {clause};", params)
+        return [cls.load(db, i) for i in db.cur.fetchall()]
 
+    @traced()
     def delete(self, db: DB) -> None:
         q = """
-            DELETE FROM projects WHERE path = ?;
+            DELETE FROM projects WHERE path = ? RETURNING id;
             """
         db.cur.execute(q, (self.path,))
-        db.con.commit()
+        rows = db.cur.fetchall()
+        db.commit()
+        self.forget(db)
+        if rows:
+            self.id = rows[0][0]
+            db.notify(DELETED, self)
+
+    @classmethod
+    @traced()
+    def delete_many(cls, db: DB, projects: Iterable["Project"]) -> None:
+        # Only the projects that were still there are announced
+        projects = list(projects)
+        paths = list(dict.fromkeys(project.path for project in projects))
+        deleted = {}
+        with db.transaction():
+            for i in range(0, len(paths), MAX_VARIABLES):
+                chunk = paths[i : i + MAX_VARIABLES]
+                q = f"""
+                    DELETE FROM projects
+                    WHERE path IN ({", ".join("?" * len(chunk))})
+                    RETURNING path, id;
+                    """
+                db.cur.execute(q, chunk)
+                deleted.update(db.cur.fetchall())
+            for project in projects:
+                project.forget(db)
+                if project.path in deleted:
+                    project.id = deleted.pop(project.path)
+                    db.notify(DELETED, project)
+
+    @classmethod
+    @traced()
+    def relocate_many(cls, db: DB, moves: Dict[str, str]) -> List["Project"]:
+        # Point projects at the directories they were moved to, {old path:
+        # new path}, keeping their history. A project named after its
+        # directory is renamed along. Paths that are registered already
+        # are skipped. Returns the relocated projects.
+        q = """
+            UPDATE OR IGNORE projects SET
+                path = :new,
+                name = CASE WHEN name = :old_name THEN :new_name ELSE name END
+            WHERE path = :old
+            RETURNING id;
+            """
+        ids = []
+        with db.transaction():
+            for old, new in moves.items():
+                db.cur.execute(
+                    q,
+                    {
+                        "old": old,
+                        "new": new,
+                        "old_name": Path(old).name,
+                        "new_name": Path(new).name,
+                    },
+                )
+                rows = db.cur.fetchall()
+                if not rows:
+                    continue
+                ids.append(rows[0][0])
+                # Mapped under the old path, loaded again below
+                mapped = db.identity.get("project", ("path", old))
+                if mapped is not None:
+                    mapped.forget(db)
+            projects = cls.get_many(db, ids)
+            for project in projects.values():
+                db.notify(UPDATED, project)
+        return list(projects.values())
+
+    @classmethod
+    @traced()
+    def move_many(
+        cls, db: DB, projects: Iterable["Project"], category: Category
+    ) -> None:
+        # Recategorize projects, keeping everything else as it is. Only
+        # mapped instances are changed, a project passed in that isn't
+        # mapped is copied since it may hold unsaved changes.
+        projects = list(projects)
+        q = """
+            UPDATE projects SET category_id = ? WHERE path = ?;
+            """
+        with db.transaction():
+            db.cur.executemany(
+                q, ((category.id, project.path) for project in projects)
+            )
+            for project in projects:
+                moved = db.identity.get("project", ("id", project.id))
+                if moved is None:
+                    moved = replace(project)
+                moved.category = category
+                moved.remember(db)
+                db.notify(MOVED, moved)
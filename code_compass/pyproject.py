@@ -0,0 +1,32 @@
+from typing import Optional, Pattern, Sequence
+
+# Fields of pyproject.toml files, read by the metadata, the contents index
+# and the fingerprints. tomllib is in the standard library from Python 3.11
+# on, before that a pattern finds the field in the text.
+
+
+def field(
+    content: str, keys: Sequence[Sequence[str]], pattern: Pattern
+) -> Optional[str]:
+    # The first string at one of the paths of keys, e.g. (("project",
+    # "name"), ("tool", "poetry", "name")), or the first group of pattern
+    # without tomllib. None if there is none or the file isn't valid TOML.
+    try:
+        import tomllib
+    except ImportError:
+        # Python 3.10
+        match = pattern.search(content)
+        return match.group(1) if match else None
+
+    try:
+        data = tomllib.loads(content)
+    except tomllib.TOMLDecodeError:
+        return None
+    for path in keys:
+        value = data
+        for key in path:
+            # Any table may be some other type in a malformed file
+            value = value.get(key) if isinstance(value, dict) else None
+        if isinstance(value, str):
+            return value
+    return None
@@ -0,0 +1,35 @@
+import socket
+
+from code_compass.config import SOCKET_PATH
+
+# Line based protocol spoken over SOCKET_PATH between a new invocation and
+# the resident process
+SHOW = b"show\n"
+OK = b"ok\n"
+
+
+def request_show(timeout: float = 2.0) -> bool:
+    # Ask an already running resident instance to show its window. Uses the
+    # plain socket module so that no Qt import is needed on this path.
+    if not SOCKET_PATH.exists():
+        return False
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(timeout)
+            client.connect(str(SOCKET_PATH))
+            client.sendall(SHOW)
+            return client.recv(len(OK)) == OK
+    except OSError:
+        return False
+
+
+def is_running(timeout: float = 0.5) -> bool:
+    # Whether a resident instance is listening on SOCKET_PATH, rather than
+    # the socket file being a leftover of one that crashed
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(timeout)
+            client.connect(str(SOCKET_PATH))
+            return True
+    except OSError:
+        return False
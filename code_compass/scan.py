@@ -0,0 +1,87 @@
+import os
+import threading
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# A directory containing any of these is a project root
+MARKERS = (".git", "pyproject.toml", "setup.py", "package.json")
+
+# Directories never descended into, hidden ones are skipped as well
+IGNORED = frozenset(
+    {
+        "venv",
+        "node_modules",
+        "__pycache__",
+        "site-packages",
+        "build",
+        "dist",
+    }
+)
+
+DEFAULT_DEPTH = 4
+DEFAULT_WORKERS = 8
+
+
+def scan_projects(
+    root: str,
+    max_depth: int = DEFAULT_DEPTH,
+    ignore: Iterable[str] = IGNORED,
+    markers: Iterable[str] = MARKERS,
+    workers: int = DEFAULT_WORKERS,
+    stop: Optional[threading.Event] = None,
+) -> Iterator[str]:
+    # Walk the tree under root on a thread pool and yield project roots as
+    # soon as they are found. Project roots are not descended into. Once
+    # stop is set, nothing more is yielded.
+    # Imported here, the command line interface loads this module for its
+    # defaults on every run
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+    ignore = frozenset(ignore)
+    markers = tuple(markers)
+    root = os.path.abspath(os.path.expanduser(root))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {pool.submit(_scan_dir, root, markers, ignore): 0}
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if stop is not None and stop.is_set():
+                        return
+                    depth = pending.pop(future)
+                    path, is_project, subdirs = future.result()
+                    if is_project:
+                        yield path
+                        continue
+                    if depth >= max_depth:
+                        continue
+                    for subdir in subdirs:
+                        child = pool.submit(_scan_dir, subdir, markers, ignore)
+                        pending[child] = depth + 1
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _scan_dir(
+    path: str, markers: Tuple[str, ...], ignore: frozenset
+) -> Tuple[str, bool, List[str]]:
+    names = set()
+    subdirs = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                names.add(entry.name)
+                if entry.name.startswith(".") or entry.name in ignore:
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                except OSError:
+                    pass
+    except OSError:
+        # Unreadable or vanished directory
+        return path, False, []
+
+    is_project = any(marker in names for marker in markers)
+    return path, is_project, subdirs
@@ -0,0 +1,207 @@
+import heapq
+import re
+from collections import defaultdict
+from functools import reduce
+from itertools import islice
+from typing import Dict, Iterable, List, Set
+
+from code_compass.events import (
+    CATEGORY_DELETED,
+    DELETED,
+    INSERTED,
+    MOVED,
+    UPDATED,
+)
+from code_compass.project import Project
+
+WORD_SPLIT = re.compile(r"[^0-9a-z]+")
+
+# Match quality tiers, higher is better
+FUZZY, PATH, NAME, NAME_PREFIX, NAME_EXACT = range(5)
+
+# How many candidates of a tier are verified before giving up on it
+MAX_VERIFIED = 1000
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def word_prefixes(name: str) -> Set[str]:
+    res = set()
+    for word in WORD_SPLIT.split(name):
+        res.add(word[:1])
+        res.add(word[:2])
+    res.discard("")
+    return res
+
+
+# In-memory index over project names and paths.
+#
+# Postings are sets of integer document ids, so a query is resolved with
+# set intersections instead of scanning every project. Document ids grow
+# monotonically and a project gets a fresh id every time it is saved, which
+# keeps them ordered by recency: the most recently opened match has the
+# largest id.
+class SearchIndex:
+    def __init__(self):
+        self.next_id = 0
+        self.docs: Dict[int, Project] = {}
+        self.ids: Dict[str, int] = {}
+        # Indexed path of each project id, a project saved under a new path
+        # replaces the old one
+        self.paths: Dict[int, str] = {}
+        self.name_grams: Dict[str, Set[int]] = defaultdict(set)
+        self.path_grams: Dict[str, Set[int]] = defaultdict(set)
+        self.name_prefixes: Dict[str, Set[int]] = defaultdict(set)
+
+    def __len__(self):
+        return len(self.docs)
+
+    # UPDATE
+
+    def rebuild(self, projects: Iterable[Project]) -> None:
+        self.__init__()
+        for project in sorted(projects, key=lambda p: p.last_opened):
+            self.add(project)
+
+    def add(self, project: Project) -> None:
+        self.remove(self.paths.get(project.id, project.path))
+        self.remove(project.path)
+
+        doc_id = self.next_id
+        self.next_id += 1
+        self.docs[doc_id] = project
+        self.ids[project.path] = doc_id
+        self.paths[project.id] = project.path
+
+        name = project.name.lower()
+        for gram in trigrams(name):
+            self.name_grams[gram].add(doc_id)
+        for gram in trigrams(project.path.lower()):
+            self.path_grams[gram].add(doc_id)
+        for prefix in word_prefixes(name):
+            self.name_prefixes[prefix].add(doc_id)
+
+    def remove(self, path: str) -> None:
+        doc_id = self.ids.pop(path, None)
+        if doc_id is None:
+            return
+        project = self.docs.pop(doc_id)
+        if self.paths.get(project.id) == path:
+            del self.paths[project.id]
+
+        name = project.name.lower()
+        self._discard(self.name_grams, trigrams(name), doc_id)
+        path = project.path.lower()
+        self._discard(self.path_grams, trigrams(path), doc_id)
+        self._discard(self.name_prefixes, word_prefixes(name), doc_id)
+
+    def on_change(self, action: str, obj) -> None:
+        # DB listener, keeps the index in sync with Project.save/delete.
+        # After a RELOADED the owner builds a new index instead.
+        if action in (INSERTED, UPDATED):
+            self.add(obj)
+        elif action == DELETED:
+            self.remove(obj.path)
+        elif action == MOVED and obj.path in self.ids:
+            # Same project in another category, its recency is unchanged
+            self.docs[self.ids[obj.path]] = obj
+        elif action == CATEGORY_DELETED:
+            for project in list(self.docs.values()):
+                if project.category.id == obj.id:
+                    self.remove(project.path)
+
+    @staticmethod
+    def _discard(postings: Dict[str, Set[int]], keys, doc_id: int) -> None:
+        for key in keys:
+            ids = postings.get(key)
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del postings[key]
+
+    # QUERY
+
+    def search(self, query: str, limit: int = 100) -> List[Project]:
+        query = query.strip().lower()
+        if not query:
+            return []
+
+        if len(query) < 3:
+            name_hits = self.name_prefixes.get(query, set())
+        else:
+            grams = trigrams(query)
+            name_hits = self._intersect(self.name_grams, grams)
+        res = heapq.nlargest(limit, self._verify(query, NAME, name_hits))
+
+        # Paths only matter if the names don't fill the page
+        if len(res) < limit and len(query) >= 3:
+            path_hits = self._intersect(self.path_grams, grams)
+            found = heapq.nlargest(
+                limit - len(res),
+                self._verify(query, PATH, path_hits, exclude=name_hits),
+            )
+            res.extend(found)
+
+        if len(res) < limit and len(query) >= 3:
+            seen = {doc_id for _, doc_id in res}
+            res.extend(self._fuzzy(query, limit - len(res), seen))
+
+        return [self.docs[doc_id] for _, doc_id in res]
+
+    @staticmethod
+    def _intersect(postings: Dict[str, Set[int]], grams: Set[str]):
+        sets = [postings.get(gram, set()) for gram in grams]
+        # Intersecting from the smallest set keeps every step cheap
+        sets.sort(key=len)
+        return reduce(set.intersection, sets[1:], sets[0])
+
+    def _verify(self, query: str, tier: int, ids: Set[int], exclude=()):
+        # Trigram hits are candidates only, confirm them starting from the
+        # most recent ones
+        for doc_id in self._most_recent(ids, MAX_VERIFIED):
+            if doc_id in exclude:
+                continue
+            project = self.docs[doc_id]
+            name = project.name.lower()
+            if tier == NAME:
+                if name == query:
+                    yield NAME_EXACT, doc_id
+                elif name.startswith(query):
+                    yield NAME_PREFIX, doc_id
+                elif query in name:
+                    yield NAME, doc_id
+            elif query in project.path.lower():
+                yield PATH, doc_id
+
+    def _most_recent(self, ids: Set[int], limit: int) -> Iterable[int]:
+        if len(ids) <= limit:
+            return ids
+        if len(ids) * 8 < self.next_id:
+            return sorted(ids, reverse=True)[:limit]
+        # Dense candidate set: walk the ids down from the newest one, which
+        # stops after roughly limit * next_id / len(ids) membership checks
+        return islice(
+            filter(ids.__contains__, range(self.next_id - 1, -1, -1)), limit
+        )
+
+    def _fuzzy(self, query: str, limit: int, seen: Set[int]):
+        # Typo tolerant fallback: rank by the number of shared trigrams. A
+        # name sharing threshold of the query's grams has one of its
+        # len(grams) - threshold + 1 rarest ones, so only the names with
+        # those are counted, the MAX_VERIFIED most recent of them.
+        grams = trigrams(query)
+        threshold = max(1, len(grams) // 2)
+        postings = sorted(
+            (self.name_grams.get(gram, set()) for gram in grams), key=len
+        )
+        candidates = set().union(*postings[: len(grams) - threshold + 1])
+        candidates -= seen
+        ranked = []
+        for doc_id in self._most_recent(candidates, MAX_VERIFIED):
+            count = sum(doc_id in ids for ids in postings)
+            if count >= threshold:
+                ranked.append((count, doc_id))
+        for _, doc_id in heapq.nlargest(limit, ranked):
+            yield FUZZY, doc_id
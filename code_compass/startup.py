@@ -0,0 +1,85 @@
+import sys
+import time
+from typing import List, Optional, Tuple
+
+
+class StartupProfile:
+    # Collects the duration of each launch stage for --startup-profile
+
+    def __init__(self, started: Optional[float] = None):
+        self.started = started or time.perf_counter()
+        self.last = self.started
+        self.stages: List[Tuple[str, float]] = []
+
+    def mark(self, stage: str) -> None:
+        now = time.perf_counter()
+        self.stages.append((stage, now - self.last))
+        self.last = now
+
+    def report(self) -> str:
+        lines = [f"{'stage':<16}{'ms':>10}{'total ms':>12}"]
+        total = 0.0
+        for stage, duration in self.stages:
+            total += duration
+            lines.append(
+                f"{stage:<16}{duration * 1000:>10.1f}{total * 1000:>12.1f}"
+            )
+        return "\n".join(lines)
+
+
+def refresh_template():
+    from code_compass import config
+    from code_compass.templates import TemplateCache, TemplateCacheError
+
+    try:
+        commit = TemplateCache().refresh(config.COOKIECUTTER)
+    except TemplateCacheError as e:
+        sys.exit(f"Could not refresh {config.COOKIECUTTER}: {e}")
+    print(f"{config.COOKIECUTTER} is cached at {commit}")
+
+
+def run():
+    # Entry point of the code-compass command. It stays tiny and imports
+    # the Qt application only once it knows it needs it.
+    started = time.perf_counter()
+
+    # Subcommands and help are handled by the Qt free command line
+    # interface
+    if len(sys.argv) > 1 and (
+        not sys.argv[1].startswith("-") or sys.argv[1] in ("-h", "--help")
+    ):
+        from code_compass import cli
+
+        cli.main(sys.argv[1:])
+        return
+
+    profile = None
+    if "--startup-profile" in sys.argv:
+        sys.argv.remove("--startup-profile")
+        profile = StartupProfile(started)
+
+    if "--refresh-template" in sys.argv:
+        refresh_template()
+        return
+
+    resident = "--resident" in sys.argv
+    if resident:
+        sys.argv.remove("--resident")
+    else:
+        from code_compass import config
+
+        resident = config.RESIDENT
+
+    # A resident instance is already running, just bring its window back
+    if resident and not profile:
+        from code_compass.resident import request_show
+
+        if request_show():
+            return
+
+    from code_compass import app
+
+    if profile:
+        profile.mark("import")
+
+    app.run(profile, resident=resident)
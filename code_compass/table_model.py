@@ -0,0 +1,307 @@
+from datetime import datetime
+from operator import itemgetter
+from typing import Dict, Iterable, List
+
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt
+from PySide6.QtGui import QColor
+
+from code_compass.frecency import current_frecency
+from code_compass.health import OK
+from code_compass.metadata import ProjectMetadata
+from code_compass.project import Project
+from code_compass.vcs import GitStatus
+
+NAME, PATH, LAST_OPENED, FRECENCY = range(4)
+LANGUAGE, SIZE, VENV, PYTHON = range(4, 8)
+GIT = 8
+HEALTH = 9
+
+# Text color of the rows whose path is missing or can't be reached
+UNHEALTHY_COLOR = QColor("gray")
+
+# Metadata attribute shown in each metadata column
+METADATA_FIELDS = {
+    LANGUAGE: "language",
+    SIZE: "size",
+    VENV: "has_venv",
+    PYTHON: "python_version",
+}
+
+
+class ProjectTableModel(QAbstractTableModel):
+    headers = [
+        "Name",
+        "Path",
+        "Days Since Last Access",
+        "Frecency",
+        "Language",
+        "Size",
+        "Venv",
+        "Python",
+        "Git",
+        "Status",
+    ]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Rows are kept as plain (name, path, last_opened, frecency,
+        # category, id) tuples, the view asks only for the cells it actually
+        # shows
+        self.rows: List[tuple] = []
+        # Row of each project id and path, so results arriving for a few
+        # projects don't scan every row
+        self.positions: Dict[int, int] = {}
+        self.path_positions: Dict[str, int] = {}
+        # Metadata by project id, filled in as it's computed
+        self.metadata: Dict[int, ProjectMetadata] = {}
+        # Git status by project path
+        self.git: Dict[str, GitStatus] = {}
+        # Path health by project path, see health.py
+        self.health: Dict[str, str] = {}
+        # Matching contents of search results by project id, shown as
+        # tooltips
+        self.snippets: Dict[int, str] = {}
+        self.now = datetime.now()
+
+    # DATA
+
+    def set_projects(self, projects: List[Project]) -> None:
+        self.beginResetModel()
+        self.now = datetime.now()
+        self.metadata = {}
+        self.snippets = {}
+        self.rows = [_project_row(project) for project in projects]
+        self.update_positions()
+        self.endResetModel()
+
+    def apply_changes(
+        self, projects: Iterable[Project], removed: Iterable[int]
+    ) -> bool:
+        # Row-level update instead of a reset: rows of the removed project
+        # ids are dropped, those of projects are updated in place or
+        # appended. Returns whether rows were appended, they are only in
+        # order once the model is sorted again.
+        drop = sorted(
+            {self.positions[i] for i in removed if i in self.positions}
+        )
+        # Contiguous rows go in one removal, from the bottom up so the
+        # positions of the rows above stay valid
+        end = len(drop)
+        while end:
+            start = end - 1
+            while start and drop[start - 1] == drop[start] - 1:
+                start -= 1
+            self.beginRemoveRows(QModelIndex(), drop[start], drop[end - 1])
+            del self.rows[drop[start] : drop[end - 1] + 1]
+            self.endRemoveRows()
+            end = start
+        if drop:
+            self.update_positions()
+
+        changed = []
+        added = []
+        for project in projects:
+            row = self.positions.get(project.id)
+            if row is None:
+                added.append(_project_row(project))
+            else:
+                self.rows[row] = _project_row(project)
+                changed.append(row)
+        self.rows_changed(changed, 0, len(self.headers) - 1)
+        if added:
+            first = len(self.rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(added) - 1)
+            self.rows.extend(added)
+            self.update_positions()
+            self.endInsertRows()
+        return bool(added)
+
+    def update_positions(self) -> None:
+        self.positions = {row[-1]: i for i, row in enumerate(self.rows)}
+        self.path_positions = {row[PATH]: i for i, row in enumerate(self.rows)}
+
+    def set_metadata(self, metadata: Dict[int, ProjectMetadata]) -> None:
+        # Merge metadata in and repaint only the rows it belongs to
+        self.metadata.update(metadata)
+        self.rows_changed(
+            [self.positions[i] for i in metadata if i in self.positions],
+            LANGUAGE,
+            PYTHON,
+        )
+
+    def rows_changed(self, rows: List[int], first: int, last: int) -> None:
+        # One repaint of the columns first to last over the rows between
+        # the lowest and the highest of rows
+        if rows:
+            self.dataChanged.emit(
+                self.index(min(rows), first), self.index(max(rows), last)
+            )
+
+    def set_snippets(self, snippets: Dict[int, str]) -> None:
+        self.snippets.update(snippets)
+
+    def set_path_health(self, statuses: Dict[str, str]) -> None:
+        self.health.update(statuses)
+        self.rows_changed(self.rows_of(statuses), 0, len(self.headers) - 1)
+
+    def set_git_status(self, statuses: Dict[str, GitStatus]) -> None:
+        self.git.update(statuses)
+        self.rows_changed(self.rows_of(statuses), GIT, GIT)
+
+    def rows_of(self, paths: Iterable[str]) -> List[int]:
+        positions = self.path_positions
+        return [positions[path] for path in paths if path in positions]
+
+    def project_at(self, row: int) -> Project:
+        name, path, last_opened, frecency, category, id_ = self.rows[row]
+        return Project(
+            name=name,
+            path=path,
+            last_opened=last_opened,
+            category=category,
+            id=id_,
+            frecency=frecency,
+        )
+
+    # QAbstractTableModel API
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ToolTipRole:
+            return self.snippets.get(self.rows[index.row()][-1])
+        if role == Qt.ForegroundRole:
+            status = self.health.get(self.rows[index.row()][PATH], OK)
+            return None if status == OK else UNHEALTHY_COLOR
+        if role != Qt.DisplayRole:
+            return None
+        if index.column() in METADATA_FIELDS:
+            return self.metadata_text(index.row(), index.column())
+        if index.column() == GIT:
+            status = self.git.get(self.rows[index.row()][PATH])
+            return status.summary() if status else None
+        if index.column() == HEALTH:
+            status = self.health.get(self.rows[index.row()][PATH], OK)
+            return None if status == OK else status
+        value = self.rows[index.row()][index.column()]
+        if index.column() == LAST_OPENED:
+            return str((self.now - value).days)
+        if index.column() == FRECENCY:
+            return f"{current_frecency(value, self.now):.1f}"
+        return value
+
+    def metadata_text(self, row: int, column: int):
+        metadata = self.metadata.get(self.rows[row][-1])
+        if metadata is None:
+            return None
+        value = getattr(metadata, METADATA_FIELDS[column])
+        if value is None:
+            return None
+        if column == SIZE:
+            return _format_size(value)
+        if column == VENV:
+            return "yes" if value else "no"
+        return value
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.headers[section]
+        return None
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        # Sort the in-memory rows, no need to query the database again.
+        # A negative column keeps the order the rows were given in.
+        if column < 0:
+            return
+        reverse = order == Qt.DescendingOrder
+        if column == LAST_OPENED:
+            # "days since" grows as the timestamp gets older
+            reverse = not reverse
+        if column == NAME:
+            key = _name_key
+        elif column in METADATA_FIELDS:
+            key = self.metadata_key(METADATA_FIELDS[column])
+        elif column == GIT:
+            key = self.git_key
+        elif column == HEALTH:
+            key = self.health_key
+        else:
+            key = itemgetter(column)
+
+        self.layoutAboutToBeChanged.emit()
+        permutation = sorted(
+            range(len(self.rows)),
+            key=lambda i: key(self.rows[i]),
+            reverse=reverse,
+        )
+        new_positions = [0] * len(permutation)
+        for new_row, old_row in enumerate(permutation):
+            new_positions[old_row] = new_row
+        self.rows = [self.rows[i] for i in permutation]
+        self.update_positions()
+
+        # Keep the selection pointing at the same projects
+        persistent = self.persistentIndexList()
+        self.changePersistentIndexList(
+            persistent,
+            [
+                self.index(new_positions[index.row()], index.column())
+                for index in persistent
+            ],
+        )
+        self.layoutChanged.emit()
+
+    def git_key(self, row: tuple):
+        # Repositories first, dirty ones before clean ones, then by branch
+        status = self.git.get(row[PATH])
+        if status is None or status.error:
+            return (True, True, "")
+        return (False, not status.dirty, status.branch or "")
+
+    def health_key(self, row: tuple) -> str:
+        # Unchecked paths count as healthy
+        status = self.health.get(row[PATH], OK)
+        return "" if status == OK else status
+
+    def metadata_key(self, field: str):
+        # Projects without the value (yet) are kept together at one end
+        def key(row: tuple):
+            value = getattr(self.metadata.get(row[-1]), field, None)
+            return (value is None, 0 if value is None else value)
+
+        return key
+
+
+def _project_row(project: Project) -> tuple:
+    return (
+        project.name,
+        project.path,
+        project.last_opened,
+        project.frecency,
+        project.category,
+        project.id,
+    )
+
+
+def _name_key(row: tuple) -> str:
+    return row[NAME].lower()
+
+
+def _format_size(size: float) -> str:
+    if size < 1024:
+        return f"{size:.0f} B"
+    for unit in ("KB", "MB", "GB"):
+        size /= 1024
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+    return f"{size / 1024:.1f} TB"
@@ -0,0 +1,185 @@
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict
+
+from code_compass.config import BASE_DIR
+
+TEMPLATES_DIR = BASE_DIR / "templates"
+
+# cookiecutter's repository abbreviations
+ABBREVIATIONS = {
+    "gh:": "https://github.com/{}.git",
+    "gl:": "https://gitlab.com/{}.git",
+    "bb:": "https://bitbucket.org/{}",
+}
+REMOTE_PREFIXES = (
+    "https://",
+    "http://",
+    "git://",
+    "ssh://",
+    "git@",
+    "file://",
+)
+
+# Seconds a git command may take, a stalled connection fails instead of
+# blocking a project creation or the pre-fetch forever
+DEFAULT_TIMEOUT = 120.0
+
+
+class TemplateCacheError(Exception):
+    pass
+
+
+class TemplateCache:
+    # Local copies of git hosted cookiecutter templates.
+    #
+    # Every source is mirrored once into repos/<hash of the source>.git and
+    # rendered from a checkout stored under checkouts/<commit>, so the same
+    # template content is only ever checked out once. Creating a project
+    # uses whatever is cached and never waits for the network, the mirror
+    # is updated by refresh(), e.g. from the background pre-fetch.
+    #
+    # Mirrors and checkouts are built in temporary directories and renamed
+    # into place, so readers never see half of one and nothing needs a
+    # lock but the fetches into an existing mirror, one at a time per
+    # mirror. A slow remote only holds up the refreshes of its template.
+
+    # Mirror path -> lock of its fetches, shared by the instances of a
+    # process
+    fetch_locks: Dict[Path, threading.Lock] = {}
+    fetch_locks_lock = threading.Lock()
+
+    def __init__(
+        self, root: Path = TEMPLATES_DIR, timeout: float = DEFAULT_TIMEOUT
+    ):
+        self.root = root
+        self.timeout = timeout
+
+    @staticmethod
+    def expand(source: str) -> str:
+        for prefix, url in ABBREVIATIONS.items():
+            if source.startswith(prefix):
+                return url.format(source[len(prefix) :])
+        return source
+
+    @classmethod
+    def is_remote(cls, source: str) -> bool:
+        source = cls.expand(source)
+        return source.startswith(REMOTE_PREFIXES) or source.endswith(".git")
+
+    def repo_path(self, source: str) -> Path:
+        key = hashlib.sha256(self.expand(source).encode()).hexdigest()
+        return self.root / "repos" / f"{key[:16]}.git"
+
+    # UPDATE
+
+    def refresh(self, source: str) -> str:
+        # Fetch the latest template from its remote, returns the commit
+        repo = self.repo_path(source)
+        if repo.is_dir():
+            with self.fetch_lock(repo):
+                self.git("--git-dir", str(repo), "fetch", "--prune", "--quiet")
+        else:
+            repo.parent.mkdir(parents=True, exist_ok=True)
+            tmp = Path(tempfile.mkdtemp(dir=repo.parent))
+            try:
+                self.git(
+                    "clone",
+                    "--mirror",
+                    "--quiet",
+                    self.expand(source),
+                    str(tmp / "repo.git"),
+                )
+                # A clone that finished first is kept
+                _move(tmp / "repo.git", repo)
+            finally:
+                shutil.rmtree(tmp, ignore_errors=True)
+        return self.head(source)
+
+    def fetch_lock(self, repo: Path) -> threading.Lock:
+        with self.fetch_locks_lock:
+            return self.fetch_locks.setdefault(repo, threading.Lock())
+
+    def head(self, source: str) -> str:
+        repo = self.repo_path(source)
+        return self.git("--git-dir", str(repo), "rev-parse", "HEAD").strip()
+
+    # CHECKOUT
+
+    def checkout(self, source: str, offline: bool = False) -> Path:
+        # Local directory to render the template from. The network is only
+        # used if the template was never fetched before.
+        if not self.repo_path(source).is_dir():
+            if offline:
+                raise TemplateCacheError(
+                    f"{source} is not cached yet and offline mode is on"
+                )
+            self.refresh(source)
+
+        commit = self.head(source)
+        dest = self.root / "checkouts" / commit
+        if dest.is_dir():
+            return dest
+
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(dir=dest.parent))
+        try:
+            work_tree = tmp / "template"
+            self.git(
+                "clone",
+                "--quiet",
+                "--no-checkout",
+                str(self.repo_path(source)),
+                str(work_tree),
+            )
+            self.git("-C", str(work_tree), "checkout", "--quiet", commit)
+            shutil.rmtree(work_tree / ".git")
+            _move(work_tree, dest)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        return dest
+
+    def resolve(self, source: str, offline: bool = False) -> str:
+        # What to hand to cookiecutter for the given template source
+        if not self.is_remote(source):
+            return source
+        return str(self.checkout(source, offline=offline))
+
+    def git(self, *args: str) -> str:
+        return _git(*args, timeout=self.timeout)
+
+
+def _git(*args: str, timeout: float = DEFAULT_TIMEOUT) -> str:
+    try:
+        res = subprocess.run(
+            ["git", *args],
+            check=True,
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+            # Fail instead of waiting for credentials nobody can type in
+            env={**os.environ, "GIT_TERMINAL_PROMPT": "0"},
+        )
+    except subprocess.CalledProcessError as e:
+        raise TemplateCacheError(e.stderr.strip() or str(e)) from e
+    except subprocess.TimeoutExpired as e:
+        raise TemplateCacheError(f"git timed out after {timeout:g}s") from e
+    except OSError as e:
+        raise TemplateCacheError(f"git is not available: {e}") from e
+    return res.stdout
+
+
+def _move(src: Path, dest: Path) -> None:
+    # Rename src to dest unless another thread or process got there first,
+    # the copies are the same
+    try:
+        src.rename(dest)
+    except OSError:
+        if not dest.is_dir():
+            raise
@@ -0,0 +1,160 @@
+import atexit
+import functools
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Hot path instrumentation. With CODE_COMPASS_TRACE=<file> set, spans are
+# recorded and written to <file> as a Chrome trace (load it in
+# chrome://tracing or ui.perfetto.dev) when the process exits, and a
+# per-span summary is printed to stderr. Every span counts the SQL
+# statements run inside it.
+#
+# Without the variable traced() and traced_slot() return the function they
+# decorate as is and span() a shared no-op context manager, so
+# instrumented code costs next to nothing.
+
+TRACE_ENV = "CODE_COMPASS_TRACE"
+TRACE_PATH = os.environ.get(TRACE_ENV)
+ENABLED = bool(TRACE_PATH)
+
+SQL_SPAN = "sql"
+
+_NULL_SPAN = nullcontext()
+_started = time.perf_counter()
+_events = []
+_events_lock = threading.Lock()
+_local = threading.local()
+
+
+def traced(name=None):
+    # Decorator recording every call of a function as a span, named after
+    # the function by default
+    def decorator(func):
+        if not ENABLED:
+            return func
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def traced_slot(name=None):
+    # traced() for methods connected to Qt signals. Qt leaves out the
+    # signal arguments a plain method doesn't take, the wrapper does the
+    # same.
+    def decorator(func):
+        if not ENABLED:
+            return func
+        import inspect
+
+        span_name = name or func.__qualname__
+        takes = None
+        if not func.__code__.co_flags & inspect.CO_VARARGS:
+            takes = func.__code__.co_argcount
+
+        @functools.wraps(func)
+        def wrapper(*args):
+            with _span(span_name):
+                return func(*args[:takes])
+
+        return wrapper
+
+    return decorator
+
+
+def span(name: str, **args):
+    if not ENABLED:
+        return _NULL_SPAN
+    return _span(name, **args)
+
+
+def start_span(name: str, **args):
+    # span() ended by calling the function it returns, for spans that end
+    # in the middle of a block, e.g. when a modal dialog is shown
+    context = span(name, **args)
+    context.__enter__()
+    return lambda: context.__exit__(None, None, None)
+
+
+@contextmanager
+def _span(name: str, **args):
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    # A statement span counts itself
+    frame = {"sql": int(name == SQL_SPAN)}
+    stack.append(frame)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        ended = time.perf_counter()
+        stack.pop()
+        if stack:
+            # Statements of nested spans count for the enclosing ones too
+            stack[-1]["sql"] += frame["sql"]
+        event = {
+            "name": name,
+            "ph": "X",
+            "ts": (started - _started) * 1e6,
+            "dur": (ended - started) * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": {"sql": frame["sql"], **args},
+        }
+        with _events_lock:
+            _events.append(event)
+
+
+def summary() -> str:
+    # Calls, total/mean/max duration and SQL statements per span name
+    totals = {}
+    for event in _events:
+        stats = totals.setdefault(event["name"], [0, 0.0, 0.0, 0])
+        stats[0] += 1
+        stats[1] += event["dur"] / 1000
+        stats[2] = max(stats[2], event["dur"] / 1000)
+        stats[3] += event["args"]["sql"]
+
+    lines = [
+        f"{'span':<40}{'calls':>7}{'total ms':>10}{'mean ms':>9}"
+        f"{'max ms':>9}{'sql':>7}"
+    ]
+    for name, (calls, total, longest, sql) in sorted(
+        totals.items(), key=lambda item: -item[1][1]
+    ):
+        lines.append(
+            f"{name[:39]:<40}{calls:>7}{total:>10.2f}{total / calls:>9.2f}"
+            f"{longest:>9.2f}{sql:>7}"
+        )
+    return "\n".join(lines)
+
+
+def write_trace(path: str) -> None:
+    import json
+
+    with _events_lock:
+        events = list(_events)
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+def _on_exit():
+    if not _events:
+        return
+    write_trace(TRACE_PATH)
+    print(summary(), file=sys.stderr)
+    print(f"trace written to {TRACE_PATH}", file=sys.stderr)
+
+
+if ENABLED:
+    atexit.register(_on_exit)
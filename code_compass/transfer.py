@@ -0,0 +1,209 @@
+import csv
+import datetime
+import json
+import math
+import os
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from code_compass.category import Category
+from code_compass.db import DB
+from code_compass.events import RELOADED
+from code_compass.frecency import launch_score
+from code_compass.tracing import traced
+
+# Streaming export and import of the project catalog as JSON Lines or CSV.
+# Every record is a project with the name of its category, a record with
+# an empty path only declares a category, so empty categories survive the
+# round trip. Neither direction holds more than a batch in memory.
+#
+# A project record without last_opened is stored as opened at the time of
+# the import, and with a frecency of 0 unless it has one.
+
+FIELDS = ("category", "name", "path", "last_opened", "frecency")
+FORMATS = ("jsonl", "csv")
+
+# What an import does with a path that is already registered
+SKIP, OVERWRITE, NEWEST = "skip", "overwrite", "newest"
+CONFLICT_POLICIES = (SKIP, OVERWRITE, NEWEST)
+
+BATCH_SIZE = 10_000
+
+# json.loads strips and checks the line around this call
+_decode = json.JSONDecoder().raw_decode
+
+INSERT = """
+    INSERT INTO projects (name, path, last_opened, frecency, category_id)
+    VALUES (?, ?, ?, ?, ?)
+    """
+ON_CONFLICT = {
+    SKIP: "ON CONFLICT (path) DO NOTHING;",
+    OVERWRITE: """
+        ON CONFLICT (path) DO UPDATE SET
+            name = excluded.name,
+            last_opened = excluded.last_opened,
+            frecency = excluded.frecency,
+            category_id = excluded.category_id;
+        """,
+    NEWEST: """
+        ON CONFLICT (path) DO UPDATE SET
+            name = excluded.name,
+            last_opened = excluded.last_opened,
+            frecency = excluded.frecency,
+            category_id = excluded.category_id
+        WHERE excluded.last_opened > COALESCE(projects.last_opened, '');
+        """,
+}
+
+
+class TransferError(ValueError):
+    pass
+
+
+def format_for(filename: str) -> str:
+    return "csv" if filename.lower().endswith(".csv") else "jsonl"
+
+
+# EXPORT
+
+
+def records(db: DB) -> Iterator[dict]:
+    # Timestamps are read as the stored text, converting a million of them
+    # to datetime just to format them again would dominate the export
+    q = """
+        SELECT c.name, p.name, p.path, CAST(p.last_opened AS TEXT),
+            p.frecency
+        FROM categories c
+        LEFT JOIN projects p ON p.category_id = c.id
+        ORDER BY c.name, p.name;
+        """
+    for row in db.cursor().execute(q):
+        yield dict(zip(FIELDS, row))
+
+
+@traced()
+def export(db: DB, out: TextIO, fmt: str) -> int:
+    count = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(out, FIELDS)
+        writer.writeheader()
+        for record in records(db):
+            writer.writerow(record)
+            count += 1
+    else:
+        for record in records(db):
+            out.write(json.dumps(record) + "\n")
+            count += 1
+    return count
+
+
+# IMPORT
+
+
+def read(source: TextIO, fmt: str) -> Iterator[Tuple[int, dict]]:
+    # (line number, record) pairs, errors of the values are reported with
+    # the line they are on
+    if fmt == "csv":
+        reader = csv.DictReader(source)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for number, line in enumerate(source, 1):
+        if not line.strip():
+            continue
+        try:
+            record, _ = _decode(line)
+        except ValueError as e:
+            raise TransferError(f"line {number}: {e}") from None
+        if not isinstance(record, dict):
+            raise TransferError(f"line {number}: not an object")
+        yield number, record
+
+
+def _timestamp(value) -> Optional[str]:
+    # Stored the way sqlite3's datetime adapter stores them, its converter
+    # can't read anything else back, e.g. a time without seconds
+    if not value:
+        return None
+    try:
+        parsed = datetime.datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise TransferError(f"invalid last_opened {value!r}") from None
+    if parsed.tzinfo is not None:
+        # Launches are recorded in local time
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed.isoformat(" ")
+
+
+def _text(record: dict, field: str) -> Optional[str]:
+    value = record.get(field)
+    if value is not None and not isinstance(value, str):
+        raise TransferError(f"invalid {field} {value!r}")
+    return value
+
+
+def _frecency(value, last_opened: Optional[str]) -> float:
+    if value in (None, ""):
+        # Treat the last launch as the only one
+        if not last_opened:
+            return 0.0
+        return launch_score(datetime.datetime.fromisoformat(last_opened))
+    try:
+        frecency = float(value)
+    except (TypeError, ValueError):
+        frecency = math.nan
+    if not math.isfinite(frecency):
+        raise TransferError(f"invalid frecency {value!r}")
+    return frecency
+
+
+@traced()
+def import_records(
+    db: DB, source: Iterable[Tuple[int, dict]], on_conflict: str = SKIP
+) -> int:
+    # Insert (line number, record) pairs of read() in batches of BATCH_SIZE
+    # rows, all in one transaction. Returns the number of project records
+    # read.
+    q = INSERT + ON_CONFLICT[on_conflict]
+    imported_at = datetime.datetime.now().isoformat(" ")
+    category_ids: Dict[str, int] = {
+        category.name: category.id for category in Category.all(db)
+    }
+    count = 0
+    batch: List[tuple] = []
+    with db.transaction():
+        for number, record in source:
+            try:
+                category = _text(record, "category") or "Default"
+                path = _text(record, "path")
+                name = _text(record, "name")
+                if path:
+                    last_opened = _timestamp(record.get("last_opened"))
+                    frecency = _frecency(record.get("frecency"), last_opened)
+            except TransferError as e:
+                raise TransferError(f"line {number}: {e}") from None
+
+            if category not in category_ids:
+                category_ids[category] = Category.create(db, category).id
+            if not path:
+                continue
+            batch.append(
+                (
+                    name or os.path.basename(path.rstrip("/")),
+                    path,
+                    last_opened or imported_at,
+                    frecency,
+                    category_ids[category],
+                )
+            )
+            count += 1
+            if len(batch) >= BATCH_SIZE:
+                db.cur.executemany(q, batch)
+                batch = []
+        if batch:
+            db.cur.executemany(q, batch)
+
+        # Mapped instances may have been overwritten behind their back, and
+        # the rows are announced all at once
+        db.identity.clear()
+        db.notify(RELOADED, None)
+    return count
@@ -0,0 +1,180 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+# Branch, dirty state and ahead/behind counts of the projects that are git
+# repositories. git runs as asyncio subprocesses, several at a time, so
+# hundreds of repositories don't wait for each other. asyncio is imported
+# by the functions that run them, on the worker thread, so importing this
+# module for GitStatus doesn't cost the GUI's startup.
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_TIMEOUT = 5.0
+
+# git rewrites .git/index and .git/HEAD on commits, checkouts, staging and
+# on status itself, but editing a tracked file touches neither. Cached
+# results are therefore also refreshed once they are this old.
+MAX_AGE = 60.0
+
+
+@dataclass
+class GitStatus:
+    branch: Optional[str] = None
+    dirty: bool = False
+    ahead: int = 0
+    behind: int = 0
+    # Set when git failed or timed out, the other fields are then unknown
+    error: Optional[str] = None
+
+    def summary(self) -> str:
+        if self.error:
+            return "?"
+        text = self.branch or "(detached)"
+        if self.dirty:
+            text += " *"
+        if self.ahead:
+            text += f" ↑{self.ahead}"
+        if self.behind:
+            text += f" ↓{self.behind}"
+        return text
+
+
+def parse_status(output: str) -> GitStatus:
+    # Output of git status --porcelain=v2 --branch
+    status = GitStatus()
+    for line in output.splitlines():
+        if line.startswith("# branch.head "):
+            head = line[len("# branch.head ") :]
+            status.branch = None if head == "(detached)" else head
+        elif line.startswith("# branch.ab "):
+            ahead, behind = line[len("# branch.ab ") :].split()
+            status.ahead = int(ahead)
+            status.behind = -int(behind)
+        elif line and not line.startswith("#"):
+            status.dirty = True
+    return status
+
+
+def git_stamp(path: str) -> Optional[Tuple[int, int]]:
+    # mtimes of .git/index and .git/HEAD, None if path is not a repository
+    git_dir = os.path.join(path, ".git")
+    try:
+        head = os.stat(os.path.join(git_dir, "HEAD")).st_mtime_ns
+    except OSError:
+        # Worktrees and submodules have a .git file instead of a directory,
+        # they can't be stamped and are always refreshed
+        return (0, 0) if os.path.isfile(git_dir) else None
+    try:
+        index = os.stat(os.path.join(git_dir, "index")).st_mtime_ns
+    except OSError:
+        # No commit or staged file yet
+        index = 0
+    return (index, head)
+
+
+async def git_status(path: str, timeout: float) -> GitStatus:
+    import asyncio
+
+    try:
+        process = await asyncio.create_subprocess_exec(
+            "git",
+            "-C",
+            path,
+            "--no-optional-locks",
+            "status",
+            "--porcelain=v2",
+            "--branch",
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+    except OSError as e:
+        return GitStatus(error=str(e))
+
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        return GitStatus(error=f"timed out after {timeout:g}s")
+
+    if process.returncode:
+        return GitStatus(error=stderr.decode(errors="replace").strip())
+    return parse_status(stdout.decode(errors="replace"))
+
+
+class VcsStatusService:
+    # Cached git status of project directories, keyed by path. A result is
+    # reused while the stamp of the repository is unchanged and it's not
+    # older than MAX_AGE.
+
+    def __init__(
+        self,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        timeout: float = DEFAULT_TIMEOUT,
+    ):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        # path -> (stamp, time of the check, status)
+        self.cache: Dict[str, Tuple[Tuple[int, int], float, GitStatus]] = {}
+        self.lock = threading.Lock()
+
+    def cached(self, path: str) -> Optional[GitStatus]:
+        with self.lock:
+            entry = self.cache.get(path)
+        return entry[2] if entry else None
+
+    def is_fresh(self, path: str, stamp: Tuple[int, int]) -> bool:
+        with self.lock:
+            entry = self.cache.get(path)
+        return (
+            entry is not None
+            and entry[0] == stamp
+            and stamp != (0, 0)
+            and time.monotonic() - entry[1] < MAX_AGE
+        )
+
+    async def refresh(
+        self,
+        paths: Iterable[str],
+        on_result: Optional[Callable[[str, GitStatus], None]] = None,
+        stop: Optional[threading.Event] = None,
+    ) -> Dict[str, GitStatus]:
+        # Status of the repositories among paths, git is run only for the
+        # ones that changed. on_result is called as soon as each one is
+        # known, in the order they finish. Setting stop skips the ones that
+        # have not started yet.
+        import asyncio
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = {}
+
+        async def check(path: str, stamp: Tuple[int, int]) -> None:
+            async with semaphore:
+                if stop is not None and stop.is_set():
+                    return
+                status = await git_status(path, self.timeout)
+            with self.lock:
+                self.cache[path] = (stamp, time.monotonic(), status)
+            results[path] = status
+            if on_result is not None:
+                on_result(path, status)
+
+        checks = []
+        for path in dict.fromkeys(paths):
+            stamp = git_stamp(path)
+            if stamp is None:
+                continue
+            if self.is_fresh(path, stamp):
+                results[path] = self.cached(path)
+                continue
+            checks.append(check(path, stamp))
+        await asyncio.gather(*checks)
+        return results
+
+    def refresh_sync(self, paths: Iterable[str]) -> Dict[str, GitStatus]:
+        import asyncio
+
+        return asyncio.run(self.refresh(paths))
@@ -0,0 +1,140 @@
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable, List
+
+from code_compass.config import BASE_DIR
+
+VENVS_DIR = BASE_DIR / "venvs"
+
+# Linux ioctl cloning a whole file into another one (copy-on-write)
+FICLONE = 0x40049409
+
+BIN_DIR = "Scripts" if os.name == "nt" else "bin"
+
+
+def reflink(src: str, dst: str) -> None:
+    import fcntl
+
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+    shutil.copystat(src, dst)
+
+
+def hardlink(src: str, dst: str) -> None:
+    os.link(src, dst)
+
+
+def copy(src: str, dst: str) -> None:
+    shutil.copy2(src, dst)
+
+
+# Cheapest first
+COPY_METHODS: List[Callable[[str, str], None]] = [reflink, hardlink, copy]
+
+
+class Copier:
+    # copytree copy function that sticks to the cheapest method the
+    # filesystem supports, falling back to the next one on errors
+
+    def __init__(self):
+        self.position = 0 if sys.platform == "linux" else 1
+
+    @property
+    def method(self) -> str:
+        return COPY_METHODS[self.position].__name__
+
+    def __call__(self, src: str, dst: str) -> None:
+        while True:
+            try:
+                COPY_METHODS[self.position](src, dst)
+                return
+            except OSError:
+                if self.position == len(COPY_METHODS) - 1:
+                    raise
+                if os.path.lexists(dst):
+                    os.unlink(dst)
+                self.position += 1
+
+
+class VenvProvisioner:
+    # Creates project virtual environments by cloning a prepared base
+    # environment instead of running venv + ensurepip every time.
+    #
+    # One base environment with pip is kept per interpreter version under
+    # VENVS_DIR. Cloning uses reflinks or hardlinks when the filesystem
+    # supports them, and the base path is rewritten in the few files that
+    # contain it (activation scripts, script shebangs, pyvenv.cfg).
+
+    lock = threading.Lock()
+
+    def __init__(self, root: Path = VENVS_DIR):
+        self.root = root
+
+    @property
+    def base_path(self) -> Path:
+        version = "{}.{}".format(*sys.version_info[:2])
+        implementation = platform.python_implementation().lower()
+        return self.root / f"{implementation}{version}"
+
+    def ensure_base(self) -> Path:
+        import venv
+
+        base = self.base_path
+        with self.lock:
+            if (base / "pyvenv.cfg").is_file():
+                return base
+
+            # Build next to the final location, so an interrupted build is
+            # never mistaken for a ready one
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp = Path(tempfile.mkdtemp(dir=self.root))
+            try:
+                venv.create(tmp / "venv", with_pip=True)
+                _rewrite_paths(tmp / "venv", str(tmp / "venv"), str(base))
+                (tmp / "venv").rename(base)
+            finally:
+                shutil.rmtree(tmp, ignore_errors=True)
+            return base
+
+    def clone(self, dest: Path) -> str:
+        # Returns the copy method that was used in the end
+        base = self.ensure_base()
+        copier = Copier()
+        shutil.copytree(base, dest, symlinks=True, copy_function=copier)
+        _rewrite_paths(dest, str(base), str(dest))
+        return copier.method
+
+
+def _rewrite_paths(venv_path: Path, old: str, new: str) -> None:
+    # The activation scripts, the shebangs of the installed scripts,
+    # pyvenv.cfg, and in site-packages the .pth files and the
+    # direct_url.json of packages installed from a directory carry the
+    # absolute path of the environment. The files are replaced rather than
+    # modified, they may be links to the base ones.
+    old_bytes, new_bytes = old.encode(), new.encode()
+    candidates = [venv_path / "pyvenv.cfg"]
+    candidates.extend((venv_path / BIN_DIR).iterdir())
+    for site_packages in _site_packages(venv_path):
+        candidates.extend(site_packages.glob("*.pth"))
+        candidates.extend(site_packages.glob("*.dist-info/direct_url.json"))
+    for path in candidates:
+        if path.is_symlink() or not path.is_file():
+            continue
+        content = path.read_bytes()
+        if old_bytes not in content:
+            continue
+        mode = path.stat().st_mode
+        path.unlink()
+        path.write_bytes(content.replace(old_bytes, new_bytes))
+        path.chmod(mode)
+
+
+def _site_packages(venv_path: Path) -> List[Path]:
+    if os.name == "nt":
+        return [venv_path / "Lib" / "site-packages"]
+    return list(venv_path.glob("lib/python*/site-packages"))
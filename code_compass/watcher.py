@@ -0,0 +1,129 @@
+import os
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from code_compass.metadata import directory_mtime
+
+# Keeps registered projects in sync with renames and moves of their
+# directories. Watching every project would take one inotify watch per
+# project, so only the directories containing projects (and
+# projects_path) are watched: a rename or move shows up as a change of
+# the parent. The changed parents are listed again and the project
+# directories that disappeared from them are looked for by (device,
+# inode), which a rename or a move within a file system keeps.
+#
+# The GUI watches with QFileSystemWatcher and polls the directories it
+# can't watch, the detection below runs on a worker thread since listing
+# a directory on a network mount can block.
+
+# (st_dev, st_ino) of a directory
+Identity = Tuple[int, int]
+
+
+def parent_directories(paths: Iterable[str]) -> Set[str]:
+    parents = set()
+    for path in paths:
+        parent = os.path.dirname(path.rstrip(os.sep))
+        if parent:
+            parents.add(parent)
+    return parents
+
+
+def identity(path: str) -> Optional[Identity]:
+    try:
+        info = os.stat(path)
+    except OSError:
+        return None
+    return info.st_dev, info.st_ino
+
+
+def subdirectories(directory: str) -> Optional[Dict[Identity, str]]:
+    # {identity: path} of the directories in directory, None if it can't
+    # be listed
+    result = {}
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        info = entry.stat(follow_symlinks=False)
+                        result[info.st_dev, info.st_ino] = entry.path
+                except OSError:
+                    continue
+    except OSError:
+        return None
+    return result
+
+
+class CatalogWatch:
+    # What the watched directories looked like the last time, only to be
+    # used from one thread at a time
+
+    def __init__(self):
+        # Identity of every registered project directory that exists
+        self.identities: Dict[str, Identity] = {}
+        # Modification times of the polled directories
+        self.mtimes: Dict[str, Optional[int]] = {}
+
+    def track(self, paths: Iterable[str]) -> None:
+        # Follow exactly these project paths from now on
+        paths = set(paths)
+        for path in self.identities.keys() - paths:
+            del self.identities[path]
+        for path in paths - self.identities.keys():
+            found = identity(path)
+            if found is not None:
+                self.identities[path] = found
+
+    def poll(self, directories: Iterable[str]) -> List[str]:
+        # The directories whose entries changed since the last poll. A
+        # directory's mtime changes whenever an entry is added, removed or
+        # renamed. Directories seen for the first time don't count.
+        directories = set(directories)
+        for directory in self.mtimes.keys() - directories:
+            del self.mtimes[directory]
+        changed = []
+        for directory in directories:
+            mtime = directory_mtime(directory)
+            if directory in self.mtimes and self.mtimes[directory] != mtime:
+                changed.append(directory)
+            self.mtimes[directory] = mtime
+        return changed
+
+    def detect(
+        self, directories: Iterable[str]
+    ) -> Tuple[Dict[str, str], List[str]]:
+        # Projects that were in the changed directories and are not there
+        # any more: {old path: new path} of the ones found again in one of
+        # them, and the paths of the others. Directories that can't be
+        # listed are left alone, their projects may still be there.
+        listings = {}
+        for directory in set(directories):
+            listing = subdirectories(directory)
+            if listing is not None:
+                listings[directory] = listing
+        found: Dict[Identity, str] = {}
+        for listing in listings.values():
+            found.update(listing)
+
+        moved = {}
+        vanished = []
+        for path, known in list(self.identities.items()):
+            parent = os.path.dirname(path.rstrip(os.sep))
+            listing = listings.get(parent)
+            if listing is None or listing.get(known) == path:
+                continue
+            current = identity(path)
+            if current is not None:
+                # Replaced by another directory, e.g. cloned again
+                self.identities[path] = current
+                continue
+            new_path = found.get(known)
+            if new_path is not None and new_path not in self.identities:
+                moved[path] = new_path
+            else:
+                vanished.append(path)
+                del self.identities[path]
+
+        for old_path, new_path in moved.items():
+            self.identities[new_path] = self.identities.pop(old_path)
+        return moved, vanished
@@ -0,0 +1,376 @@
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from PySide6.QtCore import QObject, QRunnable, Signal
+
+from code_compass import fingerprints
+from code_compass.contents import Stamp, changes
+from code_compass.creator import CreationCancelled, ProjectCreation
+from code_compass.db import DB
+from code_compass.health import PathHealthService
+from code_compass.metadata import compute, directory_mtime
+from code_compass.project import Project
+from code_compass.scan import scan_projects
+from code_compass.search import SearchIndex
+from code_compass.templates import TemplateCache, TemplateCacheError
+from code_compass.vcs import VcsStatusService
+from code_compass.watcher import CatalogWatch
+
+
+class CreateProjectSignals(QObject):
+    progress = Signal(str)
+    finished = Signal()
+    cancelled = Signal()
+    failed = Signal(str)
+
+
+class CreateProjectTask(QRunnable):
+    # Runs a ProjectCreation on the thread pool, the signals are delivered
+    # on the GUI thread
+
+    def __init__(self, creation: ProjectCreation):
+        super().__init__()
+        self.creation = creation
+        self.signals = CreateProjectSignals()
+
+    def run(self):
+        try:
+            self.creation.run(self.signals.progress.emit)
+        except CreationCancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            self.signals.failed.emit(str(e) or type(e).__name__)
+        else:
+            self.signals.finished.emit()
+
+
+class PrefetchTemplateTask(QRunnable):
+    # Updates the cached cookiecutter template in the background, so
+    # creating a project doesn't have to wait for the network
+
+    def __init__(self, template_cache: TemplateCache, source: str):
+        super().__init__()
+        self.template_cache = template_cache
+        self.source = source
+
+    def run(self):
+        try:
+            self.template_cache.refresh(self.source)
+        except TemplateCacheError:
+            # Offline or unreachable, the cached copy is used as is
+            pass
+
+
+class ScanSignals(QObject):
+    found = Signal(list)
+    finished = Signal()
+
+
+class ScanTask(QRunnable):
+    # Streams the project roots found under a directory to the GUI thread,
+    # batched so a large tree doesn't flood the event loop
+
+    batch_interval = 0.1
+
+    def __init__(self, root: str, max_depth: int):
+        super().__init__()
+        self.root = root
+        self.max_depth = max_depth
+        self.stop = threading.Event()
+        self.signals = ScanSignals()
+
+    def run(self):
+        batch = []
+        last_emit = time.monotonic()
+        for path in scan_projects(
+            self.root, max_depth=self.max_depth, stop=self.stop
+        ):
+            batch.append(path)
+            if time.monotonic() - last_emit >= self.batch_interval:
+                self.signals.found.emit(batch)
+                batch = []
+                last_emit = time.monotonic()
+        if batch:
+            self.signals.found.emit(batch)
+        self.signals.finished.emit()
+
+
+class EnrichSignals(QObject):
+    # Lists of (project id, directory mtime, ProjectMetadata, fingerprints)
+    enriched = Signal(list)
+
+
+class EnrichTask(QRunnable):
+    # Computes the metadata of a batch of projects, skipping the ones whose
+    # directory didn't change since the stored metadata was computed. The
+    # database is only written on the GUI thread.
+
+    batch_interval = 0.1
+
+    def __init__(
+        self,
+        projects: List[Tuple[int, str, Optional[int]]],
+        stop: threading.Event,
+        git_timeout: float = fingerprints.DEFAULT_GIT_TIMEOUT,
+    ):
+        # projects are (id, path, mtime of the stored metadata) triples
+        super().__init__()
+        self.projects = projects
+        self.stop = stop
+        self.git_timeout = git_timeout
+        self.signals = EnrichSignals()
+
+    def run(self):
+        batch = []
+        last_emit = time.monotonic()
+        for project_id, path, known_mtime in self.projects:
+            if self.stop.is_set():
+                break
+            mtime = directory_mtime(path)
+            if mtime is None or mtime == known_mtime:
+                continue
+            batch.append(
+                (
+                    project_id,
+                    mtime,
+                    compute(path),
+                    fingerprints.compute(path, self.git_timeout),
+                )
+            )
+            if time.monotonic() - last_emit >= self.batch_interval:
+                self.signals.enriched.emit(batch)
+                batch = []
+                last_emit = time.monotonic()
+        if batch:
+            self.signals.enriched.emit(batch)
+
+
+class SearchIndexSignals(QObject):
+    # (build number, SearchIndex)
+    built = Signal(int, object)
+
+
+class BuildSearchIndexTask(QRunnable):
+    # Loads every project on a connection of its own and indexes them, the
+    # GUI thread only swaps the finished index in
+
+    def __init__(self, db_path: Path, build: int):
+        super().__init__()
+        self.db_path = db_path
+        self.build = build
+        self.signals = SearchIndexSignals()
+
+    def run(self):
+        db = DB(self.db_path)
+        try:
+            projects = Project.all(db)
+        finally:
+            db.close()
+        index = SearchIndex()
+        index.rebuild(projects)
+        self.signals.built.emit(self.build, index)
+
+
+class IndexContentsSignals(QObject):
+    # Lists of (project id, updated files, removed files), see
+    # contents.changes
+    indexed = Signal(list)
+
+
+class IndexContentsTask(QRunnable):
+    # Reads the indexed files of projects that changed since their stamps
+    # were stored. Like EnrichTask it leaves writing to the GUI thread.
+
+    batch_interval = 0.5
+
+    def __init__(
+        self,
+        projects: List[Tuple[int, str, Dict[str, Stamp]]],
+        stop: threading.Event,
+    ):
+        # projects are (id, path, stamps of the indexed files) triples
+        super().__init__()
+        self.projects = projects
+        self.stop = stop
+        self.signals = IndexContentsSignals()
+
+    def run(self):
+        batch = []
+        last_emit = time.monotonic()
+        for project_id, path, known in self.projects:
+            if self.stop.is_set():
+                break
+            updated, removed = changes(path, known)
+            if not (updated or removed):
+                continue
+            batch.append((project_id, updated, removed))
+            if time.monotonic() - last_emit >= self.batch_interval:
+                self.signals.indexed.emit(batch)
+                batch = []
+                last_emit = time.monotonic()
+        if batch:
+            self.signals.indexed.emit(batch)
+
+
+class GitStatusSignals(QObject):
+    # Dicts of {path: GitStatus}
+    updated = Signal(dict)
+    finished = Signal()
+
+
+class GitStatusTask(QRunnable):
+    # Runs the git status checks of a list of project paths on an event
+    # loop of its own, batching the results for the GUI thread
+
+    batch_interval = 0.1
+
+    def __init__(
+        self,
+        service: VcsStatusService,
+        paths: List[str],
+        stop: threading.Event,
+    ):
+        super().__init__()
+        self.service = service
+        self.paths = paths
+        self.stop = stop
+        self.signals = GitStatusSignals()
+
+    def run(self):
+        import asyncio
+
+        batch = {}
+        last_emit = time.monotonic()
+
+        def on_result(path, status):
+            nonlocal batch, last_emit
+            batch[path] = status
+            if time.monotonic() - last_emit >= self.batch_interval:
+                self.signals.updated.emit(batch)
+                batch = {}
+                last_emit = time.monotonic()
+
+        asyncio.run(self.service.refresh(self.paths, on_result, self.stop))
+        if batch:
+            self.signals.updated.emit(batch)
+        self.signals.finished.emit()
+
+
+class PathHealthSignals(QObject):
+    # Dicts of {path: status}, see health.py
+    checked = Signal(dict)
+
+
+class PathHealthTask(QRunnable):
+    # Checks project paths on the threads of a PathHealthService, batching
+    # the results for the GUI thread
+
+    batch_interval = 0.1
+
+    def __init__(
+        self,
+        service: PathHealthService,
+        paths: List[str],
+        stop: threading.Event,
+    ):
+        super().__init__()
+        self.service = service
+        self.paths = paths
+        self.stop = stop
+        self.signals = PathHealthSignals()
+
+    def run(self):
+        batch = {}
+        last_emit = time.monotonic()
+
+        def on_result(path, status):
+            nonlocal batch, last_emit
+            batch[path] = status
+            if time.monotonic() - last_emit >= self.batch_interval:
+                self.signals.checked.emit(batch)
+                batch = {}
+                last_emit = time.monotonic()
+
+        self.service.refresh(self.paths, on_result, self.stop)
+        if batch:
+            self.signals.checked.emit(batch)
+
+
+class RelocateSignals(QObject):
+    # The {id: path} of the missing projects looked for and the (path,
+    # fingerprints) of the project roots that could be them
+    found = Signal(dict, list)
+
+
+class RelocateTask(QRunnable):
+    # Lists and fingerprints the unregistered projects under a directory,
+    # matching them with the missing projects is left to the GUI thread
+
+    def __init__(
+        self,
+        missing: Dict[int, str],
+        root: str,
+        registered: Set[str],
+        git_timeout: float,
+        stop: threading.Event,
+    ):
+        super().__init__()
+        self.missing = missing
+        self.root = root
+        self.registered = registered
+        self.git_timeout = git_timeout
+        self.stop = stop
+        self.signals = RelocateSignals()
+
+    def run(self):
+        found = fingerprints.candidates(
+            self.root,
+            self.registered,
+            git_timeout=self.git_timeout,
+            stop=self.stop,
+        )
+        if found and not self.stop.is_set():
+            self.signals.found.emit(self.missing, found)
+
+
+class WatchSignals(QObject):
+    # {old path: new path} of the moved projects, paths of the vanished
+    # ones
+    detected = Signal(dict, list)
+    finished = Signal()
+
+
+class WatchTask(QRunnable):
+    # Updates a CatalogWatch with the registered projects (if paths is
+    # given), polls the directories that aren't watched and looks for
+    # moved projects in the ones that changed. The watch isn't thread-safe,
+    # these tasks run on a pool of one thread.
+
+    def __init__(
+        self,
+        watch: CatalogWatch,
+        paths: Optional[List[str]],
+        polled: List[str],
+        changed: List[str],
+    ):
+        super().__init__()
+        self.watch = watch
+        self.paths = paths
+        self.polled = polled
+        self.changed = changed
+        self.signals = WatchSignals()
+
+    def run(self):
+        try:
+            if self.paths is not None:
+                self.watch.track(self.paths)
+            changed = set(self.changed)
+            changed.update(self.watch.poll(self.polled))
+            if changed:
+                moved, vanished = self.watch.detect(changed)
+                if moved or vanished:
+                    self.signals.detected.emit(moved, vanished)
+        finally:
+            self.signals.finished.emit()
@@ -0,0 +1,28 @@
+import pytest
+
+from code_compass import tracing
+from code_compass.db import DB
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    # A fresh database whose statements are recorded, see count_statements
+    monkeypatch.setattr(tracing, "ENABLED", True)
+    db = DB(tmp_path / "data.db")
+    yield db
+    db.close()
+    tracing._events.clear()
+
+
+@pytest.fixture
+def count_statements(db):
+    # count_statements(func, *args) runs func and returns the number of SQL
+    # statements it executed through the traced cursor
+    def count(func, *args, **kwargs):
+        tracing._events.clear()
+        func(*args, **kwargs)
+        return sum(
+            event["name"] == tracing.SQL_SPAN for event in tracing._events
+        )
+
+    return count
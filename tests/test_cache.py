@@ -0,0 +1,38 @@
+from code_compass import fingerprints
+from code_compass.cache import GenerationCache
+from code_compass.category import Category
+from code_compass.frecency import AccessLog
+from code_compass.metadata import ProjectMetadata
+from code_compass.project import Project
+
+
+def test_derived_data_keeps_cached_projects(db):
+    category = Category.create(db, "Work")
+    projects = Project.insert_many(db, ["/p/a", "/p/b"], category)
+    cache = GenerationCache(db)
+    cache.set("Work", projects)
+
+    ProjectMetadata.save_many(
+        db, [(project.id, 1, ProjectMetadata()) for project in projects]
+    )
+    fingerprints.save(db, [(projects[0].id, {fingerprints.NAME: "a"})])
+    AccessLog.record(db, projects[:1])
+    assert cache.get("Work") is projects
+
+
+def test_project_changes_invalidate_cached_projects(db):
+    category = Category.create(db, "Work")
+    projects = Project.insert_many(db, ["/p/a", "/p/b"], category)
+    cache = GenerationCache(db)
+
+    cache.set("Work", projects)
+    projects[0].save(db)
+    assert cache.get("Work") is None
+
+    cache.set("Work", projects)
+    Project.delete_many(db, projects[1:])
+    assert cache.get("Work") is None
+
+    cache.set("Work", projects)
+    Category.create(db, "Home")
+    assert cache.get("Work") is None
@@ -0,0 +1,32 @@
+from code_compass.category import Category
+
+
+def active_names(db):
+    db.cur.execute("SELECT name FROM categories WHERE is_active;")
+    return [name for name, in db.cur.fetchall()]
+
+
+def test_one_active_category(db):
+    default = Category.create(db, "Default")
+    Category.create(db, "Other")
+    assert active_names(db) == ["Default"]
+
+    Category.resolve(db, "Other").set_active(db)
+    assert active_names(db) == ["Other"]
+    assert not default.is_active
+
+
+def test_saving_existing_category_keeps_its_flag(db):
+    Category.create(db, "Default")
+    other = Category.create(db, "Other")
+    other.set_active(db)
+
+    # A category given by name, as in the add and create dialogs
+    Category(id=None, name="Default").save(db)
+    assert active_names(db) == ["Other"]
+
+    saved = Category(id=None, name="Other", is_active=False)
+    saved.save(db)
+    assert saved.id == other.id
+    assert saved.is_active
+    assert active_names(db) == ["Other"]
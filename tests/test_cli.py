@@ -0,0 +1,90 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from benchmarks import cli as cli_benchmark
+from benchmarks.synthetic import fill, home_db_path
+from code_compass import catalog
+from code_compass.category import Category
+from code_compass.project import Project
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Modules the commands of benchmarks/cli.py are kept from importing, see
+# catalog.py
+SLOW_IMPORTS = ("dataclasses", "inspect", "json")
+
+
+def test_listing(db):
+    work = Category.create(db, "Work")
+    archive = Category.create(db, "Archive")
+    Project.insert_many(db, ["/p/b", "/p/a"], work)
+    Project.insert_many(db, ["/p/c"], archive)
+    assert catalog.listing(db) == "a\t/p/a\nb\t/p/b\nc\t/p/c\n"
+    assert catalog.listing(db, "Work") == "a\t/p/a\nb\t/p/b\n"
+    Category.create(db, "Empty")
+    assert catalog.listing(db, "Empty") == ""
+    assert catalog.listing(db, "Nothing") is None
+
+
+def test_find_paths_ranks_like_find(db):
+    work = Category.create(db, "Work")
+    Project.insert_many(
+        db, ["/p/app-tools", "/p/my-app", "/p/app", "/app/x"], work
+    )
+    found = [project.path for project in Project.find(db, "app")]
+    assert catalog.find_paths(db, "app") == found
+    assert found[:2] == ["/p/app", "/p/app-tools"]
+    assert catalog.find_paths(db, "100%") == []
+
+
+@pytest.fixture(scope="module")
+def env(tmp_path_factory):
+    # A throwaway HOME with a small catalog made like the one of
+    # benchmarks/cli.py
+    home = tmp_path_factory.mktemp("home")
+    fill(home_db_path(home), 5000, cli_benchmark.DEFAULT_CATEGORIES)
+    return dict(os.environ, HOME=str(home), PYTHONPATH=str(ROOT))
+
+
+def run(env, *argv, code=cli_benchmark.ENTRY_POINT):
+    return subprocess.run(
+        [sys.executable, "-c", code, *argv],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+
+
+def test_commands_skip_slow_imports(env):
+    code = (
+        "import sys\n"
+        "try:\n"
+        f"    {cli_benchmark.ENTRY_POINT}\n"
+        "finally:\n"
+        f"    slow = sorted(set({SLOW_IMPORTS!r}) & set(sys.modules))\n"
+        "    print('slow imports:', *slow, file=sys.stderr)\n"
+    )
+    for command in cli_benchmark.COMMANDS:
+        result = run(env, *command, code=code)
+        assert "slow imports:" in result.stderr.splitlines(), command
+
+
+def test_commands_print_their_results(env):
+    result = run(env, "open", "--print", "project-4242")
+    assert result.stdout == "/synthetic/projects/project-4242\n"
+    result = run(env, "ls", "--category", "category-7")
+    assert result.returncode == 0
+    assert all(line.count("\t") == 1 for line in result.stdout.splitlines())
+    result = run(env, "ls", "--category", "nothing")
+    assert result.stderr == "No category named 'nothing'\n"
+
+
+@pytest.mark.parametrize("option", ["-h", "--help"])
+def test_help_is_printed_instead_of_opening_the_window(env, option):
+    result = run(env, option)
+    assert result.returncode == 0
+    assert result.stdout.startswith("usage: code-compass")
@@ -0,0 +1,79 @@
+import pytest
+
+from code_compass import contents
+from code_compass.category import Category
+from code_compass.project import Project
+
+FILLER = "Lorem ipsum dolor sit amet. " * 200
+
+
+@pytest.fixture
+def make_project(db, tmp_path):
+    category = Category.create(db, "Work")
+
+    def make(name, files):
+        path = tmp_path / name
+        for file, text in files.items():
+            (path / file).parent.mkdir(parents=True, exist_ok=True)
+            (path / file).write_text(text)
+        (project,) = Project.insert_many(db, [str(path)], category)
+        contents.index(db, [(project.id, project.path)])
+        return project
+
+    return make
+
+
+def names(matches):
+    return [match.project.name for match in matches]
+
+
+def test_description_and_docstrings_are_indexed(make_project, db):
+    make_project(
+        "described",
+        {"pyproject.toml": '[project]\nname = "x"\ndescription = "Orbit"\n'},
+    )
+    make_project(
+        "documented",
+        {"src/pkg/__init__.py": '"""Orbit tracking."""\nORBITAL = 1\n'},
+    )
+    make_project("code", {"main.py": "orbit = 1\n"})
+    matches = contents.search(db, "orbit")
+    assert sorted(names(matches)) == ["described", "documented"]
+    assert {match.file for match in matches} == {
+        "pyproject.toml",
+        "src/pkg/__init__.py",
+    }
+
+
+def test_words_match_as_prefixes(make_project, db):
+    make_project("deploy", {"README.md": "Deployment scripts"})
+    (match,) = contents.search(db, "deploy scr")
+    assert match.snippet == "[Deployment] [scripts]"
+
+
+def test_short_description_ranks_above_long_readme(make_project, db):
+    make_project("readme", {"README.md": f"{FILLER} telescope {FILLER}"})
+    make_project(
+        "description",
+        {"setup.cfg": "[metadata]\ndescription = Telescope control\n"},
+    )
+    make_project(
+        "docstring", {"telescope.py": '"""Telescope and telescope mounts."""'}
+    )
+    assert names(contents.search(db, "telescope")) == [
+        "docstring",
+        "description",
+        "readme",
+    ]
+
+
+def test_one_result_per_project_from_its_best_file(make_project, db):
+    make_project(
+        "both",
+        {
+            "README.md": f"{FILLER} comet {FILLER}",
+            "comet.py": '"""Comet catalog."""',
+        },
+    )
+    (match,) = contents.search(db, "comet")
+    assert match.file == "comet.py"
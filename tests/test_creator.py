@@ -0,0 +1,87 @@
+import subprocess
+
+import pytest
+
+from code_compass.creator import (
+    PIP,
+    TEMPLATE,
+    VENV,
+    CreationCancelled,
+    ProjectCreation,
+)
+
+
+class Creation(ProjectCreation):
+    # Renders a stand-in for the template, and fails or is cancelled at a
+    # given stage
+    def __init__(self, path, fail_at=None, cancel_at=None):
+        super().__init__(path, path.name, "template")
+        self.fail_at = fail_at
+        self.cancel_at = cancel_at
+
+    def render_template(self):
+        self.path.mkdir(exist_ok=True)
+        (self.path / "README.md").write_text(self.name)
+        self.stage_done(TEMPLATE)
+
+    def create_venv(self):
+        self.venv_path.mkdir()
+        (self.venv_path / "pyvenv.cfg").touch()
+        self.stage_done(VENV)
+
+    def bootstrap_pip(self):
+        self.stage_done(PIP)
+
+    def stage_done(self, stage):
+        if stage == self.cancel_at:
+            self.cancel()
+        if stage == self.fail_at:
+            raise subprocess.CalledProcessError(1, ["ensurepip"])
+
+
+def run(creation):
+    stages = []
+    creation.run(stages.append)
+    return stages
+
+
+def test_creation(tmp_path):
+    creation = Creation(tmp_path / "app")
+    assert run(creation) == [TEMPLATE, VENV, PIP]
+    assert (creation.path / "README.md").is_file()
+    assert (creation.venv_path / "pyvenv.cfg").is_file()
+
+
+@pytest.mark.parametrize("stage", [TEMPLATE, VENV, PIP])
+def test_failed_creation_removes_the_project(tmp_path, stage):
+    creation = Creation(tmp_path / "app", fail_at=stage)
+    with pytest.raises(subprocess.CalledProcessError):
+        run(creation)
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize("stage", [TEMPLATE, VENV, PIP])
+def test_cancelled_creation_removes_the_project(tmp_path, stage):
+    creation = Creation(tmp_path / "app", cancel_at=stage)
+    with pytest.raises(CreationCancelled):
+        run(creation)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_cancelled_before_it_starts(tmp_path):
+    creation = Creation(tmp_path / "app")
+    creation.cancel()
+    with pytest.raises(CreationCancelled):
+        run(creation)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_existing_directory_is_kept(tmp_path):
+    path = tmp_path / "app"
+    path.mkdir()
+    (path / "notes.txt").write_text("mine")
+    creation = Creation(path, fail_at=PIP)
+    with pytest.raises(subprocess.CalledProcessError):
+        run(creation)
+    assert (path / "notes.txt").read_text() == "mine"
+    assert not creation.venv_path.exists()
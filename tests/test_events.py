@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+
+from code_compass.events import (
+    CATEGORY_DELETED,
+    CATEGORY_SAVED,
+    DELETED,
+    INSERTED,
+    MOVED,
+    RELOADED,
+    UPDATED,
+    ChangeSet,
+)
+
+
+def project(project_id, name="app"):
+    return SimpleNamespace(id=project_id, name=name)
+
+
+def changes(*events):
+    changes = ChangeSet()
+    for action, obj in events:
+        changes.add(action, obj)
+    return changes
+
+
+def test_empty():
+    assert not ChangeSet()
+    assert len(ChangeSet()) == 0
+
+
+def test_latest_state_per_project():
+    latest = project(1, "renamed")
+    result = changes((UPDATED, project(1)), (MOVED, latest))
+    assert result.projects == {1: latest}
+    assert result.inserted == set()
+    assert len(result) == 1
+
+
+def test_inserted_then_updated_is_inserted():
+    result = changes((INSERTED, project(1)), (UPDATED, project(1)))
+    assert result.inserted == {1}
+
+
+def test_inserted_then_deleted_is_nothing():
+    result = changes((INSERTED, project(1)), (DELETED, project(1)))
+    assert not result
+    assert result.deleted == set()
+
+
+def test_updated_then_deleted_is_deleted():
+    result = changes((UPDATED, project(1)), (DELETED, project(1)))
+    assert result.projects == {}
+    assert result.deleted == {1}
+    assert result.existing == set()
+
+
+def test_deleted_then_inserted_again():
+    again = project(1)
+    result = changes((DELETED, project(1)), (INSERTED, again))
+    assert result.deleted == set()
+    assert result.projects == {1: again}
+
+
+def test_category_changes():
+    result = changes(
+        (CATEGORY_SAVED, SimpleNamespace(id=1)),
+        (CATEGORY_DELETED, SimpleNamespace(id=2)),
+    )
+    assert result
+    assert result.categories_changed
+    assert result.deleted_categories == {2}
+    assert len(result) == 0
+
+
+def test_reloaded():
+    result = changes((UPDATED, project(1)), (RELOADED, None))
+    assert result.reloaded
+    assert not changes((RELOADED, None)).projects
+    assert changes((RELOADED, None))
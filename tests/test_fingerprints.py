@@ -0,0 +1,44 @@
+import pytest
+
+from code_compass import fingerprints
+from code_compass.category import Category
+from code_compass.fingerprints import GIT, INODE, NAME
+from code_compass.project import Project
+
+OLD = "/projects/old"
+NEW = "/projects/new"
+
+
+@pytest.fixture
+def missing(db):
+    category = Category.create(db, "Work")
+    (project,) = Project.insert_many(db, [OLD], category)
+    fingerprints.save(
+        db, [(project.id, {GIT: "root-a", INODE: "1:2", NAME: "tool"})]
+    )
+    return {project.id: OLD}
+
+
+def test_match_by_git_across_file_systems(db, missing):
+    found = [(NEW, {GIT: "root-a", INODE: "3:4", NAME: "tool"})]
+    assert fingerprints.match(db, missing, found) == {OLD: NEW}
+
+
+def test_match_by_inode_without_git(db, missing):
+    found = [(NEW, {INODE: "1:2"})]
+    assert fingerprints.match(db, missing, found) == {OLD: NEW}
+
+
+def test_reused_inode_of_another_repository_is_no_match(db, missing):
+    found = [(NEW, {GIT: "root-b", INODE: "1:2"})]
+    assert fingerprints.match(db, missing, found) == {}
+
+
+def test_same_name_with_another_root_commit_is_no_match(db, missing):
+    found = [(NEW, {GIT: "root-b", INODE: "3:4", NAME: "tool"})]
+    assert fingerprints.match(db, missing, found) == {}
+
+
+def test_same_name_without_git_matches(db, missing):
+    found = [(NEW, {INODE: "3:4", NAME: "tool"})]
+    assert fingerprints.match(db, missing, found) == {OLD: NEW}
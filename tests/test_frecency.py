@@ -0,0 +1,106 @@
+import datetime
+import math
+
+import pytest
+
+from code_compass.category import Category
+from code_compass.db import logaddexp
+from code_compass.frecency import (
+    HALF_LIFE_DAYS,
+    LOG_RETENTION,
+    AccessLog,
+    current_frecency,
+    launch_score,
+)
+from code_compass.project import Project
+
+NOW = datetime.datetime(2024, 6, 1, 12)
+
+
+def days_ago(days):
+    return NOW - datetime.timedelta(days=days)
+
+
+def test_launches_decay_by_half_every_half_life():
+    assert current_frecency(launch_score(NOW), NOW) == pytest.approx(1.0)
+    score = launch_score(days_ago(HALF_LIFE_DAYS))
+    assert current_frecency(score, NOW) == pytest.approx(0.5)
+    two = logaddexp(launch_score(NOW), launch_score(NOW))
+    assert current_frecency(two, NOW) == pytest.approx(2.0)
+
+
+def test_frequent_old_launches_against_one_recent_launch():
+    recent = launch_score(NOW)
+    # Three launches two half-lives ago are worth 3/4 of one now
+    old = -math.inf
+    for _ in range(3):
+        old = logaddexp(old, launch_score(days_ago(2 * HALF_LIFE_DAYS)))
+    assert old < recent
+    # Five of them are worth more
+    for _ in range(2):
+        old = logaddexp(old, launch_score(days_ago(2 * HALF_LIFE_DAYS)))
+    assert old > recent
+
+
+@pytest.mark.parametrize(
+    "a, b, expected",
+    [
+        (0.0, 0.0, math.log(2)),
+        (1000.0, 1000.0, 1000.0 + math.log(2)),
+        (-math.inf, 5.0, 5.0),
+        (5.0, -math.inf, 5.0),
+        (-math.inf, -math.inf, -math.inf),
+    ],
+)
+def test_sql_logaddexp(db, a, b, expected):
+    (result,) = db.con.execute("SELECT logaddexp(?, ?);", (a, b)).fetchone()
+    assert result == pytest.approx(expected)
+    assert logaddexp(a, b) == pytest.approx(expected)
+
+
+@pytest.fixture
+def projects(db):
+    category = Category.create(db, "Work")
+    return Project.insert_many(db, ["/p/a", "/p/b"], category)
+
+
+def test_launches_order_projects_by_frecency(db, projects):
+    a, b = projects
+    AccessLog.record(db, [a, a, a], days_ago(2 * HALF_LIFE_DAYS))
+    AccessLog.record(db, [b], NOW)
+    assert [p.path for p in Project.all(db, order_by="frecency")] == [
+        "/p/b",
+        "/p/a",
+    ]
+    AccessLog.record(db, [a, a], days_ago(2 * HALF_LIFE_DAYS))
+    assert [p.path for p in Project.all(db, order_by="frecency")] == [
+        "/p/a",
+        "/p/b",
+    ]
+    stored = db.con.execute(
+        "SELECT frecency FROM projects WHERE id = ?;", (b.id,)
+    ).fetchone()[0]
+    assert stored == b.frecency
+    assert stored == pytest.approx(logaddexp(0.0, launch_score(NOW)))
+
+
+def logged(db):
+    return db.con.execute(
+        "SELECT opened_at FROM access_log ORDER BY opened_at;"
+    ).fetchall()
+
+
+def test_old_launches_are_compacted_once_a_day(db, projects):
+    (a, _) = projects
+    old = NOW - LOG_RETENTION - datetime.timedelta(days=1)
+    AccessLog.record(db, [a], old)
+    AccessLog.record(db, [a], NOW)
+    assert logged(db) == [(NOW,)]
+
+    # Not compacted again within a day, the score keeps every launch
+    AccessLog.record(db, [a], old)
+    AccessLog.record(db, [a], NOW + datetime.timedelta(hours=1))
+    assert len(logged(db)) == 3
+    AccessLog.record(db, [a], NOW + datetime.timedelta(days=2))
+    assert len(logged(db)) == 3
+    assert old not in [opened_at for opened_at, in logged(db)]
@@ -0,0 +1,118 @@
+import threading
+import time
+
+import pytest
+
+from code_compass.health import (
+    MISSING,
+    OK,
+    TIMED_OUT,
+    UNREACHABLE,
+    PathHealthService,
+    check_path,
+)
+
+TIMEOUT = 0.2
+
+
+@pytest.fixture
+def hung():
+    # Paths starting with /hung block until the event is set, like a
+    # stat() on a dead mount
+    release = threading.Event()
+    yield release
+    release.set()
+
+
+@pytest.fixture
+def service(hung):
+    def check(path):
+        if path.startswith("/hung"):
+            hung.wait()
+        return OK
+
+    return PathHealthService(timeout=TIMEOUT, check=check, max_threads=8)
+
+
+def test_check_path(tmp_path):
+    (tmp_path / "file").write_text("")
+    assert check_path(str(tmp_path)) == OK
+    assert check_path(str(tmp_path / "file")) == MISSING
+    assert check_path(str(tmp_path / "gone")) == MISSING
+
+
+def test_hung_paths_time_out_without_holding_up_others(service):
+    paths = [f"/hung/{i}" for i in range(3)] + ["/a", "/b"]
+    reported = []
+    started = time.monotonic()
+    results = service.refresh(paths, lambda path, _: reported.append(path))
+    elapsed = time.monotonic() - started
+
+    assert results == {
+        **{path: TIMED_OUT for path in paths[:3]},
+        "/a": OK,
+        "/b": OK,
+    }
+    assert reported[:2] == ["/a", "/b"]
+    assert TIMEOUT <= elapsed < TIMEOUT * 3
+
+
+def test_late_result_replaces_timed_out(service, hung):
+    assert service.refresh(["/hung"]) == {"/hung": TIMED_OUT}
+    assert service.cached("/hung") == TIMED_OUT
+    hung.set()
+    deadline = time.monotonic() + 5
+    while service.cached("/hung") != OK and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert service.cached("/hung") == OK
+
+
+def test_hung_path_is_not_checked_twice(hung):
+    calls = []
+
+    def check(path):
+        calls.append(path)
+        hung.wait()
+        return OK
+
+    service = PathHealthService(timeout=TIMEOUT, ttl=0, check=check)
+    service.refresh(["/hung"])
+    service.refresh(["/hung"])
+    assert calls == ["/hung"]
+
+
+def test_threads_are_bounded_and_reused(service):
+    before = threading.active_count()
+    results = service.refresh([f"/p{i}" for i in range(200)])
+    assert set(results.values()) == {OK}
+    assert service.threads <= service.max_threads
+    assert threading.active_count() - before <= service.max_threads
+
+
+def test_checks_wait_for_a_thread_when_all_are_hung(service, hung):
+    hung_paths = [f"/hung/{i}" for i in range(service.max_threads)]
+    service.refresh(hung_paths)
+    assert service.threads == service.max_threads
+
+    # No thread is free, the check times out without starting
+    assert service.refresh(["/a"]) == {"/a": TIMED_OUT}
+    assert service.threads == service.max_threads
+
+    # Once the mount is back, the waiting check runs
+    hung.set()
+    assert service.refresh(["/b"]) == {"/b": OK}
+
+
+def test_failed_check_is_unreachable_and_keeps_the_thread():
+    def check(path):
+        if path == "/broken":
+            raise ValueError(path)
+        return OK
+
+    service = PathHealthService(timeout=TIMEOUT, check=check, max_threads=1)
+    assert service.refresh(["/broken", "/a"]) == {
+        "/broken": UNREACHABLE,
+        "/a": OK,
+    }
+    assert service.cached("/broken") == UNREACHABLE
+    assert service.threads == 1
@@ -0,0 +1,128 @@
+import datetime
+
+import pytest
+
+from code_compass.category import Category
+from code_compass.db import DB
+from code_compass.project import Project
+
+
+@pytest.fixture
+def categories(db):
+    return Category.create(db, "Work"), Category.create(db, "Archive")
+
+
+@pytest.fixture
+def project(db, categories):
+    (project,) = Project.insert_many(db, ["/projects/app"], categories[0])
+    return Project.get(db, project.path)
+
+
+def rename_elsewhere(db, project):
+    # A write the connection doesn't know about, like one of another
+    # process
+    other = DB(db.path)
+    try:
+        other.con.execute(
+            "UPDATE projects SET name = 'renamed' WHERE id = ?;",
+            (project.id,),
+        )
+        other.con.commit()
+    finally:
+        other.close()
+
+
+def test_rollback_drops_unsaved_changes_from_the_map(db, project):
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            project.name = "renamed"
+            project.save(db)
+            raise RuntimeError
+
+    loaded = Project.get(db, project.path)
+    assert loaded is not project
+    assert loaded.name == "app"
+
+
+def test_rolled_back_move_is_undone(db, project, categories):
+    work, archive = categories
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            Project.move_many(db, [project], archive)
+            assert Project.get(db, project.path).category.id == archive.id
+            raise RuntimeError
+
+    assert Project.get(db, project.path).category.id == work.id
+
+
+def test_move_copies_unmapped_projects(db, project, categories):
+    _, archive = categories
+    row = Project(
+        name=project.name,
+        path=project.path,
+        last_opened=datetime.datetime(2000, 1, 1),
+        category=project.category,
+        id=project.id,
+    )
+    db.identity.clear()
+    Project.move_many(db, [row], archive)
+
+    assert row.category.name == "Work"
+    assert Project.get(db, project.path).category.id == archive.id
+
+
+def test_move_updates_the_mapped_instance(db, project, categories):
+    _, archive = categories
+    copy = Project.from_row(
+        (
+            project.name,
+            project.path,
+            project.last_opened,
+            project.category.id,
+            project.category.name,
+            project.category.is_active,
+            project.id,
+            project.frecency,
+        )
+    )
+    Project.move_many(db, [copy], archive)
+
+    assert copy.category.name == "Work"
+    assert project.category.id == archive.id
+    assert Project.get(db, project.path) is project
+
+
+def test_saving_a_copy_updates_the_mapped_instance(db, project):
+    copy = Project(
+        name="renamed",
+        path=project.path,
+        last_opened=project.last_opened,
+        category=Category(id=None, name="Archive"),
+    )
+    copy.save(db)
+
+    assert copy.id == project.id
+    assert project.name == "renamed"
+    assert project.category.name == "Archive"
+    assert Project.get(db, project.path) is project
+    assert db.identity.get("project", ("id", project.id)) is project
+
+
+def test_write_of_another_connection_refreshes_loaded_instances(db, project):
+    rename_elsewhere(db, project)
+
+    # Lookups by key are served from the map until it is cleared, queries
+    # update the mapped instances from their rows
+    assert Project.get(db, project.path).name == "app"
+    (loaded,) = Project.all(db)
+    assert loaded is project
+    assert project.name == "renamed"
+
+
+def test_clearing_the_map_invalidates_mapped_instances(db, project):
+    rename_elsewhere(db, project)
+
+    db.identity.clear()
+    loaded = Project.get(db, project.path)
+    assert loaded is not project
+    assert loaded.name == "renamed"
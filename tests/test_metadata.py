@@ -0,0 +1,68 @@
+import pytest
+
+from code_compass.category import Category
+from code_compass.metadata import ProjectMetadata, compute, python_version
+from code_compass.project import Project
+
+
+def write(path, text=""):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def test_compute(tmp_path):
+    write(tmp_path / "app" / "main.py", "x = 1\n" * 100)
+    write(tmp_path / "app" / "ui.js", "x;\n")
+    # Ignored directories count for the size but not for the language
+    write(tmp_path / "node_modules" / "dep" / "index.js", "x;\n" * 1000)
+    write(tmp_path / ".venv" / "pyvenv.cfg")
+
+    metadata = compute(str(tmp_path))
+    assert metadata.language == "Python"
+    assert metadata.size > 0
+    assert metadata.has_venv
+    assert metadata.python_version is None
+
+
+def test_compute_empty_directory(tmp_path):
+    assert compute(str(tmp_path)) == ProjectMetadata(
+        language=None, size=0, has_venv=False, python_version=None
+    )
+
+
+@pytest.mark.parametrize(
+    "pyproject, expected",
+    [
+        ('[project]\nrequires-python = ">=3.8"\n', ">=3.8"),
+        ('[tool.poetry.dependencies]\npython = "^3.10"\n', "^3.10"),
+        ('[project]\nname = "app"\n', None),
+        ('project = "app"\n', None),
+        ('tool = 1\n[project]\nname = "app"\n', None),
+        ('[tool]\npoetry = "app"\n', None),
+        ('[tool.poetry]\ndependencies = ["python"]\n', None),
+        ("[project]\nrequires-python = 3\n", None),
+        ("[project\n", None),
+    ],
+)
+def test_python_version(tmp_path, pyproject, expected):
+    write(tmp_path / "pyproject.toml", pyproject)
+    assert python_version(str(tmp_path)) == expected
+
+
+def test_python_version_without_pyproject(tmp_path):
+    assert python_version(str(tmp_path)) is None
+
+
+def test_stored_metadata(db):
+    category = Category.create(db, "Work")
+    a, b = Project.insert_many(db, ["/p/a", "/p/b"], category)
+    metadata = ProjectMetadata("Python", 4096, True, ">=3.8")
+    ProjectMetadata.save_many(db, [(a.id, 1, metadata), (-1, 1, metadata)])
+    assert ProjectMetadata.get_many(db, [a.id, b.id, -1]) == {
+        a.id: (1, metadata)
+    }
+
+    ProjectMetadata.save_many(db, [(a.id, 2, ProjectMetadata())])
+    assert ProjectMetadata.get_many(db, [a.id]) == {
+        a.id: (2, ProjectMetadata())
+    }
@@ -0,0 +1,78 @@
+import datetime
+import sqlite3
+
+import pytest
+
+from code_compass import migrations
+from code_compass.db import DB
+from code_compass.frecency import launch_score
+from code_compass.project import Project
+
+
+def baseline_db(path):
+    # data.db as it was before migrations existed
+    con = sqlite3.connect(path)
+    migrations.initial_schema(con)
+    con.executemany(
+        "INSERT INTO categories (name, is_active) VALUES (?, ?);",
+        [("Work", 1), ("Archive", 0)],
+    )
+    con.executemany(
+        "INSERT INTO projects (name, path, last_opened, category_id) "
+        "VALUES (?, ?, ?, ?);",
+        [
+            ("app", "/p/app", "2024-05-01 10:00:00", 1),
+            ("old", "/p/old", None, 2),
+            # Of a category deleted long ago, it was never shown
+            ("lost", "/p/lost", None, 9),
+        ],
+    )
+    con.commit()
+    con.close()
+
+
+def test_baseline_database_is_upgraded_in_place(tmp_path):
+    path = tmp_path / "data.db"
+    baseline_db(path)
+    db = DB(path)
+    try:
+        assert migrations.get_version(db.con) == migrations.SCHEMA_VERSION
+        projects = {project.path: project for project in Project.all(db)}
+        assert sorted(projects) == ["/p/app", "/p/old"]
+
+        app = projects["/p/app"]
+        assert app.category.name == "Work"
+        assert app.last_opened == datetime.datetime(2024, 5, 1, 10)
+        assert app.frecency == pytest.approx(launch_score(app.last_opened))
+        # Undated projects are dated by the migration that does it
+        assert isinstance(projects["/p/old"].last_opened, datetime.datetime)
+        assert projects["/p/old"].category.name == "Archive"
+    finally:
+        db.close()
+
+
+def test_failed_migration_is_rolled_back(tmp_path, monkeypatch):
+    path = tmp_path / "data.db"
+    baseline_db(path)
+    con = sqlite3.connect(path)
+    migrations.migrate(con)
+
+    def broken(con):
+        con.execute("CREATE TABLE half_done (id INTEGER);")
+        con.execute("DELETE FROM projects;")
+        raise sqlite3.OperationalError("broken")
+
+    monkeypatch.setattr(
+        migrations, "MIGRATIONS", [*migrations.MIGRATIONS, broken]
+    )
+    monkeypatch.setattr(
+        migrations, "SCHEMA_VERSION", migrations.SCHEMA_VERSION + 1
+    )
+    with pytest.raises(sqlite3.OperationalError):
+        migrations.migrate(con)
+
+    assert migrations.get_version(con) == migrations.SCHEMA_VERSION - 1
+    tables = {name for name, in con.execute("SELECT name FROM sqlite_master")}
+    assert "half_done" not in tables
+    assert con.execute("SELECT count(*) FROM projects;").fetchone() == (2,)
+    con.close()
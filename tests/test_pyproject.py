@@ -0,0 +1,33 @@
+import re
+import sys
+
+import pytest
+
+from code_compass.pyproject import field
+
+KEYS = (("project", "name"), ("tool", "poetry", "name"))
+NAME = re.compile(r"""^\s*name\s*=\s*["']([^"'\n]+)["']""", re.MULTILINE)
+
+
+@pytest.mark.parametrize(
+    "content, expected",
+    [
+        ('[project]\nname = "app"\n', "app"),
+        ('[tool.poetry]\nname = "app"\n', "app"),
+        ('[project]\nname = 1\n[tool.poetry]\nname = "app"\n', "app"),
+        ('project = "app"\n', None),
+        ("[tool]\npoetry = []\n", None),
+        ("[project\n", None),
+        ("", None),
+    ],
+)
+def test_field(content, expected):
+    pytest.importorskip("tomllib")
+    assert field(content, KEYS, NAME) == expected
+
+
+def test_field_without_tomllib(monkeypatch):
+    # Python 3.10
+    monkeypatch.setitem(sys.modules, "tomllib", None)
+    assert field('[tool.poetry]\nname = "app"\n', KEYS, NAME) == "app"
+    assert field("[project]\n", KEYS, NAME) is None
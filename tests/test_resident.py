@@ -0,0 +1,29 @@
+import socket
+
+import pytest
+
+from code_compass import resident
+
+
+@pytest.fixture
+def socket_path(tmp_path, monkeypatch):
+    path = tmp_path / "code_compass.sock"
+    monkeypatch.setattr(resident, "SOCKET_PATH", path)
+    return path
+
+
+def test_running_instance_is_detected(socket_path):
+    assert not resident.is_running()
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        server.bind(str(socket_path))
+        server.listen()
+        assert resident.is_running()
+
+
+def test_stale_socket_is_not_running(socket_path):
+    # The file a crashed instance leaves behind refuses connections
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        server.bind(str(socket_path))
+    assert socket_path.exists()
+    assert not resident.is_running()
+    assert not resident.request_show()
@@ -0,0 +1,82 @@
+import os
+import threading
+
+import pytest
+
+from code_compass import scan
+from code_compass.scan import scan_projects
+
+
+def project(path, marker="pyproject.toml"):
+    path.mkdir(parents=True, exist_ok=True)
+    (path / marker).touch()
+    return str(path)
+
+
+def found(root, **kwargs):
+    return sorted(scan_projects(str(root), **kwargs))
+
+
+def test_finds_project_roots_without_descending_into_them(tmp_path):
+    a = project(tmp_path / "a", ".git")
+    project(tmp_path / "a" / "vendored")
+    b = project(tmp_path / "group" / "b", "package.json")
+    project(tmp_path / "node_modules" / "dep")
+    project(tmp_path / ".hidden" / "c")
+    assert found(tmp_path) == [a, b]
+
+
+def test_max_depth(tmp_path):
+    shallow = project(tmp_path / "a")
+    deep = project(tmp_path / "x" / "y" / "b")
+    assert found(tmp_path, max_depth=1) == [shallow]
+    assert found(tmp_path, max_depth=2) == [shallow]
+    assert found(tmp_path, max_depth=3) == [shallow, deep]
+
+
+def test_stop(tmp_path):
+    for i in range(20):
+        project(tmp_path / f"group{i}" / "p")
+    stop = threading.Event()
+    stop.set()
+    assert found(tmp_path, stop=stop) == []
+
+    stop.clear()
+    projects = scan_projects(str(tmp_path), stop=stop)
+    next(projects)
+    stop.set()
+    assert list(projects) == []
+
+
+def test_symlink_loops_are_not_followed(tmp_path):
+    a = project(tmp_path / "a")
+    (tmp_path / "x").mkdir()
+    os.symlink(tmp_path, tmp_path / "x" / "loop")
+    os.symlink(tmp_path / "a", tmp_path / "x" / "link")
+    assert found(tmp_path, max_depth=10) == [a]
+
+
+def test_unreadable_directories_are_skipped(tmp_path, monkeypatch):
+    a = project(tmp_path / "a")
+    project(tmp_path / "locked" / "b")
+    scandir = os.scandir
+
+    def locked_scandir(path):
+        if os.path.basename(path) == "locked":
+            raise PermissionError(path)
+        return scandir(path)
+
+    monkeypatch.setattr(scan.os, "scandir", locked_scandir)
+    assert found(tmp_path) == [a]
+
+
+def test_missing_root(tmp_path):
+    assert found(tmp_path / "nothing") == []
+
+
+@pytest.mark.parametrize("root", ["~", "."])
+def test_root_is_expanded(tmp_path, monkeypatch, root):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.chdir(tmp_path)
+    a = project(tmp_path / "a")
+    assert found(root) == [a]
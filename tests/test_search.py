@@ -0,0 +1,47 @@
+import datetime
+
+from code_compass.category import Category
+from code_compass.project import Project
+from code_compass.search import MAX_VERIFIED, SearchIndex
+
+
+def make_projects(names):
+    category = Category(name="Work", id=1)
+    start = datetime.datetime(2024, 1, 1)
+    return [
+        Project(
+            name=name,
+            path=f"/projects/{name}",
+            last_opened=start + datetime.timedelta(minutes=i),
+            category=category,
+            id=i + 1,
+        )
+        for i, name in enumerate(names)
+    ]
+
+
+def names(projects):
+    return [project.name for project in projects]
+
+
+def test_fuzzy_finds_typos():
+    index = SearchIndex()
+    index.rebuild(make_projects(["compass", "charm", "runner"]))
+    assert names(index.search("compase")) == ["compass"]
+    assert names(index.search("zzzzz")) == []
+
+
+def test_fuzzy_ranks_most_shared_trigrams_first():
+    index = SearchIndex()
+    index.rebuild(make_projects(["projection", "project-tools", "protect"]))
+    assert names(index.search("projetcion"))[0] == "projection"
+
+
+def test_fuzzy_counts_the_most_recent_candidates_only():
+    # The oldest project shares the most trigrams with the query but is
+    # past MAX_VERIFIED more recent candidates
+    recent = [f"compas-{i}" for i in range(MAX_VERIFIED * 2)]
+    index = SearchIndex()
+    index.rebuild(make_projects(["compas-ase", *recent]))
+    found = names(index.search("compase", limit=3))
+    assert found == recent[:-4:-1]
@@ -0,0 +1,91 @@
+import datetime
+
+import pytest
+
+from code_compass.category import Category
+from code_compass.events import DELETED
+from code_compass.project import Project
+
+# Statements executed per model operation. Every one of these must stay
+# constant whatever the number of projects involved.
+
+PROJECTS = 50
+
+
+@pytest.fixture
+def category(db):
+    return Category.create(db, "Work")
+
+
+@pytest.fixture
+def projects(db, category):
+    paths = [f"/projects/project-{i}" for i in range(PROJECTS)]
+    projects = Project.insert_many(db, paths, category)
+    db.identity.clear()
+    return projects
+
+
+def new_project(category, i):
+    return Project(
+        name=f"new-{i}",
+        path=f"/projects/new-{i}",
+        last_opened=datetime.datetime.now(),
+        category=category,
+    )
+
+
+def test_save_is_one_upsert(db, category, count_statements):
+    project = new_project(category, 0)
+    assert count_statements(project.save, db) == 1
+    assert count_statements(project.save, db) == 1
+
+
+def test_save_many_is_one_upsert_per_project(db, category, count_statements):
+    projects = [new_project(category, i) for i in range(20)]
+    assert count_statements(Project.save_many, db, projects) == 20
+
+
+def test_save_many_resolves_each_category_name_once(db, count_statements):
+    Category.create(db, "Work")
+    db.identity.clear()
+    projects = [
+        new_project(Category(id=None, name="Work"), i) for i in range(20)
+    ]
+    assert count_statements(Project.save_many, db, projects) == 21
+
+
+def test_get_many(db, projects, count_statements):
+    ids = [project.id for project in projects]
+    assert count_statements(Project.get_many, db, ids) == 1
+    # Mapped now
+    assert count_statements(Project.get_many, db, ids) == 0
+
+
+def test_delete_many(db, projects, count_statements):
+    assert count_statements(Project.delete_many, db, projects) == 1
+    assert Project.ids_and_paths(db) == []
+
+
+def test_delete_many_announces_only_deleted_projects(db, projects):
+    projects[0].delete(db)
+    events = []
+    db.listeners.append(lambda action, obj: events.append((action, obj)))
+    Project.delete_many(db, projects)
+    assert events == [(DELETED, project) for project in projects[1:]]
+
+
+def test_all_by_category_is_one_join(db, category, projects, count_statements):
+    assert count_statements(Project.all_by_category, db, category) == 1
+    assert count_statements(Project.all, db) == 1
+    loaded = Project.all_by_category(db, category)
+    assert len(loaded) == PROJECTS
+    assert {project.category.name for project in loaded} == {"Work"}
+
+
+def test_category_load(db, category, count_statements):
+    Category.create(db, "Home")
+    db.identity.clear()
+    assert count_statements(Category.all, db) == 1
+    # Every category is mapped after Category.all
+    assert count_statements(Category.get_by_name, db, "Home") == 0
+    assert count_statements(Category.get_by_name, db, "Missing") == 0
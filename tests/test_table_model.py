@@ -0,0 +1,113 @@
+import datetime
+
+import pytest
+
+pytest.importorskip("PySide6")
+
+from PySide6.QtCore import (  # noqa: E402
+    QCoreApplication,
+    QPersistentModelIndex,
+    Qt,
+)
+
+from code_compass.category import Category  # noqa: E402
+from code_compass.frecency import launch_score  # noqa: E402
+from code_compass.metadata import ProjectMetadata  # noqa: E402
+from code_compass.project import Project  # noqa: E402
+from code_compass.table_model import (  # noqa: E402
+    FRECENCY,
+    LAST_OPENED,
+    NAME,
+    PATH,
+    SIZE,
+    ProjectTableModel,
+)
+
+NOW = datetime.datetime.now()
+WORK = Category(id=1, name="Work")
+
+
+@pytest.fixture(scope="module", autouse=True)
+def app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+def project(project_id, name, days=0):
+    return Project(
+        name=name,
+        path=f"/p/{name}",
+        last_opened=NOW - datetime.timedelta(days=days),
+        category=WORK,
+        id=project_id,
+        frecency=launch_score(NOW),
+    )
+
+
+@pytest.fixture
+def model():
+    model = ProjectTableModel()
+    model.set_projects(
+        [project(1, "b", days=3), project(2, "A", days=1), project(3, "c")]
+    )
+    return model
+
+
+def column(model, column):
+    return [
+        model.data(model.index(row, column)) for row in range(model.rowCount())
+    ]
+
+
+def test_data(model):
+    assert model.rowCount() == 3
+    assert model.columnCount() == len(ProjectTableModel.headers)
+    assert column(model, NAME) == ["b", "A", "c"]
+    assert column(model, PATH) == ["/p/b", "/p/A", "/p/c"]
+    assert column(model, LAST_OPENED) == ["3", "1", "0"]
+    assert column(model, FRECENCY) == ["1.0", "1.0", "1.0"]
+
+
+def test_sort(model):
+    model.sort(NAME)
+    assert column(model, NAME) == ["A", "b", "c"]
+    model.sort(NAME, Qt.DescendingOrder)
+    assert column(model, NAME) == ["c", "b", "A"]
+    # Fewest days since the last access first
+    model.sort(LAST_OPENED)
+    assert column(model, NAME) == ["c", "A", "b"]
+
+
+def test_sort_keeps_the_selection(model):
+    selected = QPersistentModelIndex(model.index(0, NAME))
+    model.sort(NAME)
+    assert selected.row() == 1
+    assert model.data(model.index(selected.row(), NAME)) == "b"
+
+
+def test_incremental_changes(model):
+    model.sort(NAME)
+    renamed = project(1, "d")
+    assert not model.apply_changes([renamed], [])
+    assert column(model, NAME) == ["A", "d", "c"]
+
+    assert model.apply_changes([project(4, "B")], [3])
+    assert model.rowCount() == 3
+    assert column(model, NAME) == ["A", "d", "B"]
+    assert model.project_at(2).id == 4
+
+    model.sort(NAME)
+    assert column(model, NAME) == ["A", "B", "d"]
+    assert model.positions == {2: 0, 4: 1, 1: 2}
+    assert model.path_positions["/p/d"] == 2
+
+
+def test_metadata(model):
+    model.set_metadata(
+        {1: ProjectMetadata(size=2048), 3: ProjectMetadata(size=100)}
+    )
+    assert column(model, SIZE) == ["2.0 KB", None, "100 B"]
+    # Projects without the value go last
+    model.sort(SIZE)
+    assert column(model, NAME) == ["c", "b", "A"]
+    model.set_projects([project(5, "e")])
+    assert column(model, SIZE) == [None]
@@ -0,0 +1,120 @@
+import os
+import subprocess
+import threading
+
+import pytest
+
+from code_compass.templates import TemplateCache, TemplateCacheError
+
+
+def git(*args):
+    subprocess.run(
+        ["git", *args],
+        check=True,
+        capture_output=True,
+        env={
+            **os.environ,
+            "GIT_AUTHOR_NAME": "test",
+            "GIT_AUTHOR_EMAIL": "test@example.com",
+            "GIT_COMMITTER_NAME": "test",
+            "GIT_COMMITTER_EMAIL": "test@example.com",
+        },
+    )
+
+
+@pytest.fixture
+def work(tmp_path):
+    # Where the template is edited, pushed to the bare repository origin
+    path = tmp_path / "work"
+    path.mkdir()
+    git("-C", str(path), "init", "-q", "-b", "main")
+    (path / "cookiecutter.json").write_text('{"name": "app"}')
+    git("-C", str(path), "add", "cookiecutter.json")
+    git("-C", str(path), "commit", "-q", "-m", "first")
+    return path
+
+
+@pytest.fixture
+def origin(tmp_path, work):
+    path = tmp_path / "origin.git"
+    git("clone", "-q", "--bare", str(work), str(path))
+    git("-C", str(work), "remote", "add", "origin", str(path))
+    return str(path)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return TemplateCache(tmp_path / "cache")
+
+
+def push(work, content):
+    (work / "cookiecutter.json").write_text(content)
+    git("-C", str(work), "commit", "-q", "-am", "change")
+    git("-C", str(work), "push", "-q", "origin", "main")
+
+
+def test_offline_checkout_needs_a_cached_template(cache, origin):
+    with pytest.raises(TemplateCacheError, match="not cached yet"):
+        cache.checkout(origin, offline=True)
+    assert not cache.repo_path(origin).exists()
+
+
+def test_checkout_is_cached(cache, origin, tmp_path):
+    dest = cache.checkout(origin)
+    assert (dest / "cookiecutter.json").read_text() == '{"name": "app"}'
+    assert not (dest / ".git").exists()
+
+    # Served from the mirror without the remote
+    os.rename(origin, tmp_path / "gone.git")
+    assert cache.checkout(origin, offline=True) == dest
+    assert cache.checkout(origin) == dest
+    assert list((cache.root / "checkouts").iterdir()) == [dest]
+
+
+def test_refresh_moves_to_the_new_head(cache, origin, work):
+    first = cache.checkout(origin)
+    push(work, '{"name": "service"}')
+
+    # Until refreshed, the cached commit is used
+    assert cache.checkout(origin) == first
+
+    commit = cache.refresh(origin)
+    assert (
+        commit
+        == subprocess.run(
+            ["git", "-C", str(work), "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    )
+    second = cache.checkout(origin)
+    assert second.name == commit
+    assert (second / "cookiecutter.json").read_text() == '{"name": "service"}'
+    assert (first / "cookiecutter.json").read_text() == '{"name": "app"}'
+
+
+def test_unreachable_remote(cache, tmp_path):
+    with pytest.raises(TemplateCacheError):
+        cache.refresh(str(tmp_path / "missing.git"))
+    assert not cache.repo_path(str(tmp_path / "missing.git")).exists()
+
+
+def test_git_times_out(origin, tmp_path):
+    cache = TemplateCache(tmp_path / "cache", timeout=0.001)
+    with pytest.raises(TemplateCacheError, match="timed out"):
+        cache.refresh(origin)
+
+
+def test_concurrent_checkouts_share_one_copy(cache, origin):
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.checkout(origin)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 4
+    assert len(set(results)) == 1
+    assert (results[0] / "cookiecutter.json").is_file()
@@ -0,0 +1,110 @@
+import datetime
+import io
+
+import pytest
+
+from code_compass import migrations, transfer
+from code_compass.events import CATEGORY_SAVED, RELOADED
+from code_compass.migrations import dated_projects
+from code_compass.project import Project
+from code_compass.search import SearchIndex
+
+
+def import_text(db, text, fmt="jsonl", on_conflict=transfer.SKIP):
+    records = transfer.read(io.StringIO(text), fmt)
+    return transfer.import_records(db, records, on_conflict)
+
+
+def test_round_trip(db):
+    text = (
+        '{"category": "Work", "name": "app", "path": "/p/app", '
+        '"last_opened": "2024-05-01 10:00:00", "frecency": 1.5}\n'
+        '{"category": "Empty", "path": ""}\n'
+    )
+    assert import_text(db, text) == 1
+    out = io.StringIO()
+    transfer.export(db, out, "jsonl")
+    assert out.getvalue() == (
+        '{"category": "Empty", "name": null, "path": null, '
+        '"last_opened": null, "frecency": null}\n'
+        '{"category": "Work", "name": "app", "path": "/p/app", '
+        '"last_opened": "2024-05-01 10:00:00", "frecency": 1.5}\n'
+    )
+
+
+def test_records_without_last_opened_are_dated_at_import(db):
+    before = datetime.datetime.now()
+    import_text(db, "category,name,path\nWork,app,/p/app\n", "csv")
+    (project,) = Project.all(db)
+    assert before <= project.last_opened <= datetime.datetime.now()
+    assert project.frecency == 0.0
+
+    # What crashed on NULL timestamps before
+    index = SearchIndex()
+    index.rebuild(Project.all(db))
+    assert index.search("app") == [project]
+
+
+@pytest.mark.parametrize("frecency", ["high", "nan", "inf"])
+def test_invalid_frecency_is_reported_with_its_line(db, frecency):
+    text = (
+        '{"path": "/p/a"}\n'
+        "\n"
+        f'{{"path": "/p/b", "frecency": "{frecency}"}}\n'
+    )
+    with pytest.raises(transfer.TransferError) as e:
+        import_text(db, text)
+    assert str(e.value) == f"line 3: invalid frecency {frecency!r}"
+    assert Project.all(db) == []
+
+
+def test_invalid_csv_values_are_reported_with_their_line(db):
+    text = "path,frecency\n/p/a,1\n/p/b,x\n"
+    with pytest.raises(transfer.TransferError, match="^line 3: invalid"):
+        import_text(db, text, "csv")
+
+    text = "path,last_opened\n/p/a,yesterday\n"
+    with pytest.raises(transfer.TransferError, match="^line 2: invalid"):
+        import_text(db, text, "csv")
+
+
+def test_timestamps_are_stored_with_seconds(db):
+    text = (
+        '{"path": "/p/a", "last_opened": "2024-01-01 10:00"}\n'
+        '{"path": "/p/b", "last_opened": "2024-01-01T10:00:00+00:00"}\n'
+    )
+    import_text(db, text)
+    assert [project.last_opened.minute for project in Project.all(db)] == [
+        0,
+        0,
+    ]
+
+
+@pytest.mark.parametrize("field", ["category", "name", "path"])
+def test_non_text_values_are_reported_with_their_line(db, field):
+    text = f'{{"path": "/p/a", "{field}": 7}}\n'
+    with pytest.raises(transfer.TransferError) as e:
+        import_text(db, text)
+    assert str(e.value) == f"line 1: invalid {field} 7"
+
+
+def test_import_is_announced_once_committed(db):
+    events = []
+    db.listeners.append(lambda action, obj: events.append(action))
+    import_text(db, '{"category": "Work", "path": "/p/a"}\n')
+    assert events == [CATEGORY_SAVED, RELOADED]
+
+
+def test_migration_dates_projects_imported_before(db):
+    db.con.execute("INSERT INTO categories (name) VALUES ('Work');")
+    db.con.execute(
+        "INSERT INTO projects (name, path, category_id) "
+        "VALUES ('app', '/p/app', 1);"
+    )
+    db.con.execute(
+        f"PRAGMA user_version = {migrations.MIGRATIONS.index(dated_projects)};"
+    )
+    db.con.commit()
+    migrations.migrate(db.con)
+    (project,) = Project.all(db)
+    assert isinstance(project.last_opened, datetime.datetime)
@@ -0,0 +1,111 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from code_compass.vcs import GitStatus, VcsStatusService, parse_status
+
+
+def git(path, *args):
+    subprocess.run(
+        ["git", "-C", str(path), *args],
+        check=True,
+        capture_output=True,
+        env={
+            **os.environ,
+            "GIT_AUTHOR_NAME": "test",
+            "GIT_AUTHOR_EMAIL": "test@example.com",
+            "GIT_COMMITTER_NAME": "test",
+            "GIT_COMMITTER_EMAIL": "test@example.com",
+            "GIT_CONFIG_NOSYSTEM": "1",
+            "HOME": str(path),
+        },
+    )
+
+
+@pytest.fixture
+def repo(tmp_path):
+    path = tmp_path / "repo"
+    path.mkdir()
+    git(path, "init", "-q", "-b", "main")
+    (path / "README.md").write_text("hello\n")
+    git(path, "add", "README.md")
+    git(path, "commit", "-q", "-m", "first")
+    return path
+
+
+def test_vcs_does_not_import_asyncio():
+    code = "import code_compass.vcs, sys; print('asyncio' in sys.modules)"
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True
+    )
+    assert result.stdout.strip() == "False"
+
+
+def test_clean_repository(repo):
+    status = VcsStatusService().refresh_sync([str(repo)])[str(repo)]
+    assert status == GitStatus(branch="main")
+    assert status.summary() == "main"
+
+
+def test_dirty_repository(repo):
+    (repo / "README.md").write_text("changed\n")
+    status = VcsStatusService().refresh_sync([str(repo)])[str(repo)]
+    assert status.dirty
+    assert status.summary() == "main *"
+
+
+def test_ahead_and_behind(repo, tmp_path):
+    clone = tmp_path / "clone"
+    git(tmp_path, "clone", "-q", str(repo), str(clone))
+    (clone / "a").write_text("")
+    git(clone, "add", "a")
+    git(clone, "commit", "-q", "-m", "ahead")
+    (repo / "b").write_text("")
+    git(repo, "add", "b")
+    git(repo, "commit", "-q", "-m", "behind")
+    git(clone, "fetch", "-q")
+
+    status = VcsStatusService().refresh_sync([str(clone)])[str(clone)]
+    assert (status.ahead, status.behind) == (1, 1)
+    assert status.summary() == "main ↑1 ↓1"
+
+
+def test_directories_that_are_not_repositories_are_skipped(tmp_path):
+    assert VcsStatusService().refresh_sync([str(tmp_path)]) == {}
+
+
+def test_unchanged_repository_is_not_checked_again(repo):
+    service = VcsStatusService()
+    service.refresh_sync([str(repo)])
+    checked = service.cache[str(repo)][1]
+    service.refresh_sync([str(repo)])
+    assert service.cache[str(repo)][1] == checked
+
+    # Staging rewrites the index, which changes the stamp
+    (repo / "new").write_text("")
+    git(repo, "add", "new")
+    status = service.refresh_sync([str(repo)])[str(repo)]
+    assert status.dirty
+    assert service.cache[str(repo)][1] > checked
+
+
+def test_detached_head(repo):
+    git(repo, "checkout", "-q", "--detach")
+    status = VcsStatusService().refresh_sync([str(repo)])[str(repo)]
+    assert status.branch is None
+    assert status.summary() == "(detached)"
+
+
+def test_parse_status():
+    output = (
+        "# branch.oid 0123\n"
+        "# branch.head feature\n"
+        "# branch.upstream origin/feature\n"
+        "# branch.ab +2 -3\n"
+        "? untracked\n"
+    )
+    assert parse_status(output) == GitStatus(
+        branch="feature", dirty=True, ahead=2, behind=3
+    )
@@ -0,0 +1,95 @@
+import os
+import sys
+
+import pytest
+
+from code_compass import venvs
+from code_compass.venvs import BIN_DIR, Copier, _rewrite_paths
+
+OLD = "/home/user/.code_compass/venvs/cpython3.11"
+NEW = "/home/user/projects/app/.venv"
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    # The copy methods tried, reflinks and hardlinks always fail after
+    # leaving a partial destination behind
+    calls = []
+
+    def failing(name):
+        def method(src, dst):
+            calls.append(name)
+            open(dst, "w").close()
+            raise OSError(name)
+
+        method.__name__ = name
+        return method
+
+    def copy(src, dst):
+        calls.append("copy")
+        venvs.copy(src, dst)
+
+    monkeypatch.setattr(
+        venvs, "COPY_METHODS", [failing("reflink"), failing("hardlink"), copy]
+    )
+    return calls
+
+
+def test_copier_falls_back_and_sticks_to_what_works(tmp_path, calls):
+    for name in "ab":
+        (tmp_path / name).write_text(name)
+    copier = Copier()
+    copier.position = 0
+
+    copier(str(tmp_path / "a"), str(tmp_path / "a2"))
+    assert calls == ["reflink", "hardlink", "copy"]
+    assert (tmp_path / "a2").read_text() == "a"
+
+    copier(str(tmp_path / "b"), str(tmp_path / "b2"))
+    assert calls[3:] == ["copy"]
+    assert copier.method == "copy"
+
+
+def test_copier_raises_when_nothing_works(tmp_path, calls):
+    copier = Copier()
+    copier.position = 0
+    with pytest.raises(OSError):
+        copier(str(tmp_path / "missing"), str(tmp_path / "copy"))
+    assert calls == ["reflink", "hardlink", "copy"]
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return path
+
+
+@pytest.mark.skipif(os.name == "nt", reason="POSIX environment layout")
+def test_rewrite_paths(tmp_path):
+    venv = tmp_path / "venv"
+    version = "python{}.{}".format(*sys.version_info[:2])
+    site_packages = venv / "lib" / version / "site-packages"
+    cfg = write(venv / "pyvenv.cfg", f"command = python -m venv {OLD}\n")
+    activate = write(venv / BIN_DIR / "activate", f'VIRTUAL_ENV="{OLD}"\n')
+    script = write(venv / BIN_DIR / "pip", f"#!{OLD}/bin/python\n")
+    (venv / BIN_DIR / "python").symlink_to(sys.executable)
+    pth = write(site_packages / "app.pth", f"{OLD}/src\n")
+    direct_url = write(
+        site_packages / "app-1.0.dist-info" / "direct_url.json",
+        f'{{"url": "file://{OLD}/src", "dir_info": {{"editable": true}}}}',
+    )
+    record = write(site_packages / "app-1.0.dist-info" / "RECORD", OLD)
+    script.chmod(0o755)
+    # A hardlink to the base environment is replaced, not written through
+    base_script = tmp_path / "base-pip"
+    os.link(script, base_script)
+
+    _rewrite_paths(venv, OLD, NEW)
+
+    for path in (cfg, activate, script, pth, direct_url):
+        assert OLD not in path.read_text(), path
+        assert NEW in path.read_text(), path
+    assert record.read_text() == OLD
+    assert base_script.read_text() == f"#!{OLD}/bin/python\n"
+    assert os.access(script, os.X_OK)
+    assert (venv / BIN_DIR / "python").is_symlink()
@@ -0,0 +1,88 @@
+import os
+import shutil
+
+import pytest
+
+from code_compass.watcher import CatalogWatch, parent_directories
+
+
+@pytest.fixture
+def tree(tmp_path):
+    # Two project directories under work, one under home
+    for path in ("work/a", "work/b", "home/c"):
+        (tmp_path / path).mkdir(parents=True)
+    return tmp_path
+
+
+@pytest.fixture
+def watch(tree):
+    watch = CatalogWatch()
+    watch.track(str(tree / path) for path in ("work/a", "work/b", "home/c"))
+    return watch
+
+
+def test_parent_directories():
+    assert parent_directories(["/p/a", "/p/b/", "/q/c", "/"]) == {"/p", "/q"}
+
+
+def test_poll_reports_changed_directories(tree):
+    watch = CatalogWatch()
+    work, home = str(tree / "work"), str(tree / "home")
+    # Seen for the first time
+    assert watch.poll([work, home]) == []
+    os.utime(work, ns=(0, 1))
+    assert watch.poll([work, home]) == [work]
+    assert watch.poll([work, home]) == []
+
+    # A directory that is no longer polled is forgotten
+    watch.poll([home])
+    os.utime(work, ns=(0, 2))
+    assert watch.poll([work, home]) == []
+
+
+def test_track(tree, watch):
+    watch.track([str(tree / "work" / "a"), str(tree / "missing")])
+    assert list(watch.identities) == [str(tree / "work" / "a")]
+
+
+def test_renamed_project_is_moved(tree, watch):
+    os.rename(tree / "work" / "a", tree / "work" / "a2")
+    moved, vanished = watch.detect([str(tree / "work")])
+    assert moved == {str(tree / "work" / "a"): str(tree / "work" / "a2")}
+    assert vanished == []
+    assert str(tree / "work" / "a2") in watch.identities
+    # Nothing changed since
+    assert watch.detect([str(tree / "work")]) == ({}, [])
+
+
+def test_project_moved_to_another_watched_directory(tree, watch):
+    os.rename(tree / "work" / "b", tree / "home" / "b")
+    moved, vanished = watch.detect([str(tree / "work"), str(tree / "home")])
+    assert moved == {str(tree / "work" / "b"): str(tree / "home" / "b")}
+    assert vanished == []
+
+
+def test_deleted_project_vanishes(tree, watch):
+    shutil.rmtree(tree / "work" / "a")
+    moved, vanished = watch.detect([str(tree / "work")])
+    assert moved == {}
+    assert vanished == [str(tree / "work" / "a")]
+    assert str(tree / "work" / "a") not in watch.identities
+
+
+def test_replaced_project_is_kept(tree, watch):
+    # Deleted and cloned again under the same path
+    shutil.rmtree(tree / "work" / "a")
+    (tree / "work" / "a").mkdir()
+    assert watch.detect([str(tree / "work")]) == ({}, [])
+    assert watch.identities[str(tree / "work" / "a")] == (
+        os.stat(tree / "work" / "a").st_dev,
+        os.stat(tree / "work" / "a").st_ino,
+    )
+
+
+def test_unlisted_directories_are_left_alone(tree, watch):
+    shutil.rmtree(tree / "home")
+    # home can't be listed, work didn't lose anything
+    assert watch.detect([str(tree / "home"), str(tree / "work")]) == ({}, [])
+    assert str(tree / "home" / "c") in watch.identities